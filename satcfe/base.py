@@ -21,10 +21,15 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import collections
+import contextlib
 import ctypes
+import os
 import random
+import struct
+import threading
 import warnings
 
+from concurrent.futures import ThreadPoolExecutor
 from ctypes import c_int
 from ctypes import c_char_p
 
@@ -32,6 +37,26 @@ import six
 
 from satcomum import constantes
 
+from . import instrumentacao
+from .entidades import Entidade
+from .excecoes import ErroEquipamentoSuspeito
+from .excecoes import ErroTempoEsgotado
+from .util import RetornoBytes
+
+try:
+    from time import monotonic as _relogio
+except ImportError:
+    # Python 2 não possui um relógio monotônico na biblioteca padrão
+    from time import time as _relogio
+
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
 
 class _Prototype(object):
     __slots__ = ('argtypes', 'restype')
@@ -86,6 +111,7 @@ class BibliotecaSAT(object):
 
     def __init__(self, caminho, convencao=None):
         self._libsat = None
+        self._funcoes = {}
         self._caminho = caminho
         self._convencao = convencao
         self._carregar()
@@ -93,7 +119,9 @@ class BibliotecaSAT(object):
     def _carregar(self):
         """Carrega (ou recarrega) a biblioteca SAT. Se a convenção de chamada
         ainda não tiver sido definida, será determinada pela extensão do
-        arquivo da biblioteca.
+        arquivo da biblioteca. As funções SAT descritas em
+        :attr:`FUNCTION_PROTOTYPES` são vinculadas e tipadas uma única vez,
+        durante a carga da biblioteca.
 
         :raises ValueError: Se a convenção de chamada não puder ser determinada
             ou se não for um valor válido.
@@ -116,6 +144,45 @@ class BibliotecaSAT(object):
                 ).format(self._convencao))
 
         self._libsat = loader(self._caminho)
+        self._funcoes = self._vincular_funcoes()
+
+    def _vincular_funcoes(self):
+        funcoes = {}
+        for funcname, proto in FUNCTION_PROTOTYPES.items():
+            try:
+                # (!) obtém um ponteiro de função exclusivo, ao invés daquele
+                #     mantido em cache pela própria instância CDLL/WinDLL, de
+                #     modo que os tipos dos argumentos e do retorno não sejam
+                #     alterados por quem mais acessar a biblioteca
+                fptr = self._libsat[funcname]
+            except AttributeError:
+                # a biblioteca do fabricante pode não implementar todas as
+                # funções (eg. bibliotecas de versões anteriores da ER SAT)
+                continue
+            fptr.argtypes = proto.argtypes
+            fptr.restype = proto.restype
+            funcoes[funcname] = fptr
+        return funcoes
+
+    def funcao(self, funcname):
+        """Obtém o ponteiro para a função SAT, já vinculado e tipado conforme
+        o protótipo da função.
+
+        :param str funcname: Nome da função SAT (eg. ``'ConsultarSAT'``).
+
+        :raises ValueError: Se não houver um protótipo para a função.
+        :raises AttributeError: Se a biblioteca SAT não implementar a função.
+        """
+        try:
+            return self._funcoes[funcname]
+        except KeyError:
+            if funcname not in FUNCTION_PROTOTYPES:
+                raise ValueError((
+                        'There is no function prototype named: {!r}'
+                    ).format(funcname))
+            raise AttributeError((
+                    'Biblioteca SAT {!r} nao implementa a funcao {!r}'
+                ).format(self._caminho, funcname))
 
     @property
     def ref(self):
@@ -136,6 +203,280 @@ class BibliotecaSAT(object):
         return self._convencao
 
 
+PRAZOS_SUGERIDOS = dict(
+        ConsultarSAT=10,
+        ConsultarStatusOperacional=15,
+        ConsultarNumeroSessao=15,
+        ConsultarUltimaSessaoFiscal=15,
+        EnviarDadosVenda=60,
+        CancelarUltimaVenda=60,
+        TesteFimAFim=60,
+        ExtrairLogs=300,
+        AtualizarSoftwareSAT=900,
+    )
+"""Sugestão de prazos, em segundos, para as funções SAT (veja
+:class:`DespachanteSAT`). Funções de consulta devem responder rapidamente,
+enquanto a extração dos logs e a atualização do software do equipamento SAT
+podem levar vários minutos.
+"""
+
+
+class DespachanteSAT(object):
+    """Serializa as invocações às funções da biblioteca SAT, permitindo que um
+    mesmo equipamento seja compartilhado entre várias *threads*.
+
+    As bibliotecas dos fabricantes normalmente resultam ponteiros para áreas
+    de memória estáticas (veja, por exemplo, ``tests/mockup/mockupsat.c``),
+    que serão sobrescritas pela próxima invocação. O despachante garante que
+    apenas uma função seja invocada por vez e que a resposta seja copiada
+    antes que a próxima invocação seja liberada.
+
+    Para compartilhar um equipamento SAT entre vários clientes (eg. várias
+    instâncias de :class:`~satcfe.clientelocal.ClienteSATLocal`), informe o
+    mesmo despachante para todos eles, ao invés da :class:`BibliotecaSAT`.
+
+    Opcionalmente, podem ser definidos prazos para as invocações. Se o prazo
+    de uma invocação esgotar, seja aguardando pelo equipamento ou aguardando
+    a resposta da função SAT, será lançada a exceção
+    :exc:`~satcfe.excecoes.ErroTempoEsgotado`. Uma função que não responder
+    dentro do prazo não pode ser interrompida; o equipamento permanecerá
+    ocupado até que ela retorne e passará a ser considerado suspeito. A
+    próxima invocação irá, antes, sondar o equipamento através da função
+    ``ConsultarSAT``, enquanto as demais invocações aguardam. Se a sondagem
+    não for respondida dentro do prazo, será lançada a exceção
+    :exc:`~satcfe.excecoes.ErroEquipamentoSuspeito`.
+
+    :param biblioteca: Uma instância de :class:`BibliotecaSAT`.
+
+    :param dict prazos: Opcional. Prazos, em segundos, para cada uma das
+        funções SAT, indexados pelo nome da função (eg. ``'ConsultarSAT'``).
+        Veja :attr:`PRAZOS_SUGERIDOS`.
+
+    :param float prazo_padrao: Opcional. Prazo, em segundos, para as funções
+        que não estejam relacionadas em ``prazos``. Se não for informado, as
+        invocações destas funções aguardarão indefinidamente.
+
+    :param numerador_sessao: Opcional. Um ``callable`` que gera os números de
+        sessão para a sondagem do equipamento. Veja :class:`FuncoesSAT`.
+    """
+
+    def __init__(
+            self,
+            biblioteca,
+            prazos=None,
+            prazo_padrao=None,
+            numerador_sessao=None):
+        self._biblioteca = biblioteca
+        self._prazos = dict(prazos or {})
+        self._prazo_padrao = prazo_padrao
+        self._numerador_sessao = numerador_sessao or NumeroSessaoMemoria()
+        self._condicao = threading.Condition(threading.Lock())
+        self._ocupado = False
+        self._suspeito = False
+        self._aguardando = 0
+        self._invocacoes = 0
+        self._tempos_esgotados = 0
+        self._espera_total = 0.0
+        self._espera_maxima = 0.0
+
+    @property
+    def biblioteca(self):
+        """A :class:`BibliotecaSAT` à qual as invocações são despachadas."""
+        return self._biblioteca
+
+    @property
+    def suspeito(self):
+        """Indica se o equipamento SAT está sob suspeita, isto é, se a última
+        invocação não respondeu dentro do prazo e o equipamento ainda não foi
+        sondado com sucesso.
+        """
+        return self._suspeito
+
+    @property
+    def aguardando(self):
+        """Número de invocações aguardando pelo equipamento SAT."""
+        return self._aguardando
+
+    @property
+    def invocacoes(self):
+        """Número de invocações despachadas até o momento."""
+        return self._invocacoes
+
+    @property
+    def tempos_esgotados(self):
+        """Número de invocações cujas funções SAT não responderam dentro do
+        prazo.
+        """
+        return self._tempos_esgotados
+
+    @property
+    def espera_total(self):
+        """Tempo total, em segundos, que as invocações aguardaram até que
+        fossem efetivamente despachadas.
+        """
+        return self._espera_total
+
+    @property
+    def espera_maxima(self):
+        """Maior tempo, em segundos, que uma invocação aguardou até que fosse
+        efetivamente despachada.
+        """
+        return self._espera_maxima
+
+    @property
+    def espera_media(self):
+        """Tempo médio, em segundos, que as invocações aguardaram até que
+        fossem efetivamente despachadas.
+        """
+        with self._condicao:
+            if not self._invocacoes:
+                return 0.0
+            return self._espera_total / self._invocacoes
+
+    def prazo(self, funcname):
+        """Prazo, em segundos, para a função SAT ou ``None``."""
+        return self._prazos.get(funcname, self._prazo_padrao)
+
+    def invocar(self, funcname, *args, **kwargs):
+        """Invoca a função SAT, aguardando que quaisquer outras invocações em
+        andamento terminem.
+
+        :param str funcname: Nome da função SAT (eg. ``'ConsultarSAT'``).
+
+        :return: Uma cópia da resposta da função SAT, como ``bytes``.
+        :rtype: bytes
+
+        :raises ErroTempoEsgotado: Se o prazo da função esgotar.
+
+        :raises ErroEquipamentoSuspeito: Se o equipamento estiver sob
+            suspeita e não responder à sondagem. Neste caso, a função SAT não
+            chegou a ser invocada.
+        """
+        fptr = self._biblioteca.funcao(funcname)
+        prazo = self.prazo(funcname)
+        limite = None if prazo is None else _relogio() + prazo
+
+        self._ocupar(funcname, prazo, limite)
+
+        posse = {'transferida': False}
+        try:
+            if self._suspeito:
+                self._sondar(funcname, posse)
+            return self._executar(
+                    funcname, prazo, limite, posse, fptr, args, kwargs)
+        finally:
+            if not posse['transferida']:
+                self._liberar()
+
+    def _ocupar(self, funcname, prazo, limite):
+        inicio = _relogio()
+        with self._condicao:
+            self._aguardando += 1
+            try:
+                while self._ocupado:
+                    if limite is None:
+                        self._condicao.wait()
+                        continue
+                    restante = limite - _relogio()
+                    if restante <= 0:
+                        if self._suspeito:
+                            raise ErroEquipamentoSuspeito(funcname, prazo)
+                        raise ErroTempoEsgotado(funcname, prazo)
+                    self._condicao.wait(restante)
+                self._ocupado = True
+            finally:
+                self._aguardando -= 1
+
+            espera = _relogio() - inicio
+            self._invocacoes += 1
+            self._espera_total += espera
+            self._espera_maxima = max(self._espera_maxima, espera)
+
+    def _liberar(self):
+        with self._condicao:
+            self._ocupado = False
+            self._condicao.notify_all()
+
+    def _sondar(self, funcname, posse):
+        prazo = self.prazo('ConsultarSAT')
+        limite = None if prazo is None else _relogio() + prazo
+        fptr = self._biblioteca.funcao('ConsultarSAT')
+        args = (self._numerador_sessao(),)
+        try:
+            self._executar(
+                    'ConsultarSAT', prazo, limite, posse, fptr, args, {})
+        except ErroTempoEsgotado:
+            if posse['transferida']:
+                raise ErroEquipamentoSuspeito(funcname, prazo)
+            raise
+        with self._condicao:
+            self._suspeito = False
+
+    def _executar(self, funcname, prazo, limite, posse, fptr, args, kwargs):
+        # (!) o tipo de retorno c_char_p faz com que ctypes copie a resposta
+        #     (terminada em nulo) para um objeto bytes ainda durante a
+        #     invocação e, portanto, antes que o equipamento seja liberado
+        if limite is None:
+            return fptr(*args, **kwargs)
+
+        estado = {'concluido': False, 'abandonado': False}
+
+        def _alvo():
+            try:
+                estado['resposta'] = fptr(*args, **kwargs)
+            except BaseException as ex:
+                estado['erro'] = ex
+            finally:
+                with self._condicao:
+                    estado['concluido'] = True
+                    if estado['abandonado']:
+                        # a invocação foi abandonada pelo prazo; libera o
+                        # equipamento agora que a função SAT retornou
+                        self._ocupado = False
+                    self._condicao.notify_all()
+
+        watchdog = threading.Thread(
+                target=_alvo,
+                name='satcfe-{}'.format(funcname))
+        watchdog.daemon = True
+        watchdog.start()
+
+        with self._condicao:
+            while not estado['concluido']:
+                restante = limite - _relogio()
+                if restante <= 0:
+                    estado['abandonado'] = True
+                    posse['transferida'] = True
+                    self._suspeito = True
+                    self._tempos_esgotados += 1
+                    raise ErroTempoEsgotado(funcname, prazo)
+                self._condicao.wait(restante)
+
+        if 'erro' in estado:
+            raise estado['erro']
+
+        return estado['resposta']
+
+
+@contextlib.contextmanager
+def _travar_arquivo(fd):
+    # bloqueio exclusivo do arquivo, entre processos
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
 class NumeroSessaoMemoria(object):
     """Implementa um numerador de sessão simples, baseado em memória, não
     persistente, que irá gerar um número de sessão (seis dígitos) diferente
@@ -146,20 +487,169 @@ class NumeroSessaoMemoria(object):
     def __init__(self, tamanho=100):
         super(NumeroSessaoMemoria, self).__init__()
         self._tamanho = tamanho
-        self._memoria = collections.deque(maxlen=tamanho)
+        self._anel = collections.deque(maxlen=tamanho)
+        self._memoria = set()
+        self._trava = threading.Lock()
 
     def __contains__(self, item):
         return item in self._memoria
 
     def __call__(self, *args, **kwargs):
-        while True:
-            numero = random.randint(100000, 999999)
-            if numero not in self._memoria:
-                self._memoria.append(numero)
-                break
+        with self._trava:
+            while True:
+                numero = random.randint(100000, 999999)
+                if numero not in self._memoria:
+                    break
+            if len(self._anel) == self._tamanho:
+                self._memoria.discard(self._anel[0])
+            self._anel.append(numero)
+            self._memoria.add(numero)
         return numero
 
 
+class NumeroSessaoArquivo(object):
+    """Implementa um numerador de sessão persistente, que mantém os ``n``
+    últimos números de sessão gerados em um arquivo, de modo que os números
+    não se repitam mesmo após o reinício da aplicação ou quando vários
+    processos compartilham o mesmo equipamento SAT (basta que todos usem o
+    mesmo arquivo).
+
+    O arquivo contém um cabeçalho e um anel de tamanho fixo com os últimos
+    números gerados. O acesso é serializado através de um bloqueio exclusivo
+    do arquivo e o anel somente é relido quando outro processo tiver gerado
+    um número desde a última leitura.
+
+    .. sourcecode:: python
+
+        cliente = ClienteSATLocal(
+                BibliotecaSAT('/opt/fabricante/libsat.so'),
+                codigo_ativacao='12345678',
+                numerador_sessao=NumeroSessaoArquivo('/var/lib/pdv/sessao'))
+
+    :param str caminho: Caminho do arquivo. Será criado se não existir.
+
+    :param int tamanho: Quantidade de números de sessão que não devem se
+        repetir. Usado apenas na criação do arquivo; para um arquivo existente
+        prevalece o tamanho registrado no próprio arquivo.
+
+    """
+
+    _ASSINATURA = b'SATN'
+
+    _CABECALHO = struct.Struct(str('<4sIQ'))
+
+    _REGISTRO = struct.Struct(str('<I'))
+
+    def __init__(self, caminho, tamanho=100):
+        super(NumeroSessaoArquivo, self).__init__()
+        self._caminho = caminho
+        self._tamanho = tamanho
+        self._contador = None
+        self._anel = []
+        self._memoria = set()
+        self._trava = threading.Lock()
+        self._fd = os.open(
+                caminho,
+                os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0),
+                0o644)
+        with self._trava, _travar_arquivo(self._fd):
+            self._sincronizar()
+
+    @property
+    def caminho(self):
+        return self._caminho
+
+    def __contains__(self, item):
+        with self._trava, _travar_arquivo(self._fd):
+            self._sincronizar()
+            return item in self._memoria
+
+    def __call__(self, *args, **kwargs):
+        with self._trava, _travar_arquivo(self._fd):
+            self._sincronizar()
+            while True:
+                numero = random.randint(100000, 999999)
+                if numero not in self._memoria:
+                    break
+
+            posicao = self._contador % self._tamanho
+            self._memoria.discard(self._anel[posicao])
+            self._anel[posicao] = numero
+            self._memoria.add(numero)
+            self._contador += 1
+
+            self._escrever(
+                    self._CABECALHO.size + posicao * self._REGISTRO.size,
+                    self._REGISTRO.pack(numero))
+            self._escrever(0, self._cabecalho())
+            os.fsync(self._fd)
+
+        return numero
+
+    def fechar(self):
+        """Fecha o arquivo. O numerador não poderá mais ser usado."""
+        with self._trava:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def _cabecalho(self):
+        return self._CABECALHO.pack(
+                self._ASSINATURA,
+                self._tamanho,
+                self._contador)
+
+    def _ler(self, posicao, tamanho):
+        os.lseek(self._fd, posicao, os.SEEK_SET)
+        dados = b''
+        while len(dados) < tamanho:
+            bloco = os.read(self._fd, tamanho - len(dados))
+            if not bloco:
+                break
+            dados += bloco
+        return dados
+
+    def _escrever(self, posicao, dados):
+        os.lseek(self._fd, posicao, os.SEEK_SET)
+        while dados:
+            dados = dados[os.write(self._fd, dados):]
+
+    def _sincronizar(self):
+        cabecalho = self._ler(0, self._CABECALHO.size)
+        if not cabecalho:
+            # arquivo recém criado
+            self._contador = 0
+            self._anel = [0] * self._tamanho
+            self._memoria = set()
+            self._escrever(0, self._cabecalho() + (
+                    self._REGISTRO.pack(0) * self._tamanho))
+            os.fsync(self._fd)
+            return
+
+        if len(cabecalho) == self._CABECALHO.size:
+            assinatura, tamanho, contador = self._CABECALHO.unpack(cabecalho)
+        else:
+            assinatura, tamanho, contador = None, 0, 0
+
+        if assinatura != self._ASSINATURA or tamanho < 1:
+            raise ValueError(
+                    'Arquivo de numeracao de sessao invalido: {!r}'.format(
+                            self._caminho))
+
+        if contador == self._contador and tamanho == self._tamanho:
+            # nenhum outro processo gerou números desde a última leitura
+            return
+
+        dados = self._ler(self._CABECALHO.size, tamanho * self._REGISTRO.size)
+        dados = dados.ljust(tamanho * self._REGISTRO.size, b'\0')
+        self._tamanho = tamanho
+        self._contador = contador
+        self._anel = [
+                self._REGISTRO.unpack_from(dados, i * self._REGISTRO.size)[0]
+                for i in range(tamanho)]
+        self._memoria = set(n for n in self._anel if n)
+
+
 class FuncoesSAT(object):
     """Estabelece a interface básica para acesso às funções da biblioteca SAT.
 
@@ -206,7 +696,9 @@ class FuncoesSAT(object):
     | 6.1.16  | ``ConsultarUltimaSessaoFiscal``   | :meth:`consultar_ultima_sessao_fiscal`  |
     +---------+-----------------------------------+-----------------------------------------+
 
-    :param biblioteca: Uma instância de :class:`BibliotecaSAT`.
+    :param biblioteca: Uma instância de :class:`BibliotecaSAT` ou de
+        :class:`DespachanteSAT`. Se for informada uma biblioteca, será criado
+        um despachante exclusivo para esta instância.
 
     :param string codigo_ativacao: Código de ativação. Senha definida pelo
         contribuinte no software de ativação, conforme item 2.1.1 da ER SAT.
@@ -216,27 +708,53 @@ class FuncoesSAT(object):
         Equipamento SAT", da ER SAT. Se não for especificado, será utilizado
         um :class:`NumeroSessaoMemoria`.
 
+    :param bool modo_bytes: Opcional. Se ``True``, os retornos das funções
+        SAT não são decodificados, resultando em um
+        :class:`~satcfe.util.RetornoBytes`. Isso evita cópias desnecessárias
+        quando as respostas trazem grandes massas de dados em Base64 (eg.
+        ``ExtrairLogs``). Padrão é ``False``.
+
+    Cada uma das funções possui também uma versão não bloqueante, prefixada
+    com ``submit_`` (eg. :meth:`submit_enviar_dados_venda`), que resulta em
+    um :class:`~concurrent.futures.Future`. As invocações submetidas são
+    executadas, na ordem em que foram submetidas, por um *worker* dedicado,
+    criado na primeira submissão (veja também o método :meth:`encerrar`).
+
     """  # noqa: E501
 
+    _executor = None
+    _trava_executor = threading.Lock()
+
     def __init__(
             self,
             biblioteca,
             codigo_ativacao=None,
             numerador_sessao=None,
             encoding='utf-8',
-            encoding_errors='strict'):
+            encoding_errors='strict',
+            modo_bytes=False):
         """
         TODO: documentar os parâmetros aqui
         """
-        self._biblioteca = biblioteca
         self._codigo_ativacao = codigo_ativacao
         self._numerador_sessao = numerador_sessao or NumeroSessaoMemoria()
+        if isinstance(biblioteca, DespachanteSAT):
+            self._despachante = biblioteca
+        else:
+            self._despachante = DespachanteSAT(
+                    biblioteca,
+                    numerador_sessao=self._numerador_sessao)
         self._encoding = encoding
         self._encoding_errors = encoding_errors
+        self._modo_bytes = modo_bytes
 
     @property
     def biblioteca(self):
-        return self._biblioteca
+        return self._despachante.biblioteca
+
+    @property
+    def despachante(self):
+        return self._despachante
 
     @property
     def codigo_ativacao(self):
@@ -250,17 +768,70 @@ class FuncoesSAT(object):
     def encoding_errors(self):
         return self._encoding_errors
 
-    def _invocar(self, funcname, *args, **kwargs):
-        if funcname not in FUNCTION_PROTOTYPES:
-            raise ValueError((
-                    'There is no function prototype named: {!r}'
-                ).format(funcname))
-
-        proto = FUNCTION_PROTOTYPES[funcname]
-        fptr = getattr(self._biblioteca.ref, funcname)
-        fptr.argtypes = proto.argtypes
-        fptr.restype = proto.restype
+    @property
+    def modo_bytes(self):
+        return self._modo_bytes
 
+    def _invocar(self, funcname, *args, **kwargs):
+        if instrumentacao.ativa():
+            return self._invocar_instrumentado(funcname, *args, **kwargs)
+
+        raw_response = self._despachante.invocar(
+                funcname,
+                *self._codificar(args),
+                **kwargs)
+
+        return self._decodificar(raw_response)
+
+    def _invocar_instrumentado(self, funcname, *args, **kwargs):
+        numero_sessao = args[0] if args else None
+
+        inicio = instrumentacao.relogio()
+        encoded_args = self._codificar(args)
+        tamanho_envio = sum(
+                len(a) for a in encoded_args if isinstance(a, bytes))
+        instrumentacao.emitir(
+                instrumentacao.CODIFICAR,
+                funcname,
+                instrumentacao.relogio() - inicio,
+                tamanho_envio=tamanho_envio,
+                numero_sessao=numero_sessao)
+
+        inicio = instrumentacao.relogio()
+        try:
+            raw_response = self._despachante.invocar(
+                    funcname,
+                    *encoded_args,
+                    **kwargs)
+        except Exception as ex:
+            instrumentacao.emitir(
+                    instrumentacao.INVOCAR,
+                    funcname,
+                    instrumentacao.relogio() - inicio,
+                    tamanho_envio=tamanho_envio,
+                    numero_sessao=numero_sessao,
+                    erro=ex)
+            raise
+        instrumentacao.emitir(
+                instrumentacao.INVOCAR,
+                funcname,
+                instrumentacao.relogio() - inicio,
+                tamanho_envio=tamanho_envio,
+                tamanho_retorno=len(raw_response),
+                numero_sessao=numero_sessao)
+
+        inicio = instrumentacao.relogio()
+        response = self._decodificar(raw_response)
+        instrumentacao.emitir(
+                instrumentacao.DECODIFICAR,
+                funcname,
+                instrumentacao.relogio() - inicio,
+                tamanho_retorno=len(raw_response),
+                numero_sessao=numero_sessao)
+
+        return response
+
+    def _codificar(self, args):
         encoded_args = []
 
         for argument in args:
@@ -270,8 +841,14 @@ class FuncoesSAT(object):
                         errors=self.encoding_errors)
             encoded_args.append(argument)
 
-        raw_response = fptr(*encoded_args, **kwargs)
+        return encoded_args
 
+    def _decodificar(self, raw_response):
+        if self._modo_bytes:
+            return RetornoBytes(
+                    raw_response,
+                    encoding=self.encoding,
+                    encoding_errors=self.encoding_errors)
         return raw_response.decode(
                 encoding=self.encoding,
                 errors=self.encoding_errors)
@@ -636,6 +1213,199 @@ class FuncoesSAT(object):
                 self._codigo_ativacao)
         return resposta
 
+    def _obter_executor(self):
+        if self._executor is None:
+            with FuncoesSAT._trava_executor:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor
+
+    def _submeter(self, metodo, *args, **kwargs):
+        return self._obter_executor().submit(metodo, *args, **kwargs)
+
+    def encerrar(self, wait=True):
+        """Encerra o *worker* dedicado às invocações submetidas através dos
+        métodos ``submit_*``, se houver. Invocações submetidas posteriormente
+        irão criar um novo *worker*.
+
+        :param bool wait: Se deverá aguardar pela conclusão das invocações
+            pendentes. Veja :meth:`concurrent.futures.Executor.shutdown`.
+        """
+        with FuncoesSAT._trava_executor:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def submit_ativar_sat(self, tipo_certificado, cnpj, codigo_uf):
+        """Versão não bloqueante de :meth:`ativar_sat`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`ativar_sat`.
+        """
+        return self._submeter(
+                self.ativar_sat,
+                tipo_certificado,
+                cnpj,
+                codigo_uf)
+
+    def submit_comunicar_certificado_icpbrasil(self, certificado):
+        """Versão não bloqueante de :meth:`comunicar_certificado_icpbrasil`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`comunicar_certificado_icpbrasil`.
+        """
+        return self._submeter(
+                self.comunicar_certificado_icpbrasil,
+                certificado)
+
+    def submit_enviar_dados_venda(self, dados_venda, *args, **kwargs):
+        """Versão não bloqueante de :meth:`enviar_dados_venda`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`enviar_dados_venda`.
+        """
+        return self._submeter(
+                self.enviar_dados_venda,
+                dados_venda,
+                *args,
+                **kwargs)
+
+    def submit_cancelar_ultima_venda(
+            self,
+            chave_cfe,
+            dados_cancelamento,
+            *args,
+            **kwargs):
+        """Versão não bloqueante de :meth:`cancelar_ultima_venda`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`cancelar_ultima_venda`.
+        """
+        return self._submeter(
+                self.cancelar_ultima_venda,
+                chave_cfe,
+                dados_cancelamento,
+                *args,
+                **kwargs)
+
+    def submit_consultar_sat(self):
+        """Versão não bloqueante de :meth:`consultar_sat`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`consultar_sat`.
+        """
+        return self._submeter(self.consultar_sat)
+
+    def submit_teste_fim_a_fim(self, dados_venda, *args, **kwargs):
+        """Versão não bloqueante de :meth:`teste_fim_a_fim`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`teste_fim_a_fim`.
+        """
+        return self._submeter(
+                self.teste_fim_a_fim,
+                dados_venda,
+                *args,
+                **kwargs)
+
+    def submit_consultar_status_operacional(self):
+        """Versão não bloqueante de :meth:`consultar_status_operacional`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`consultar_status_operacional`.
+        """
+        return self._submeter(self.consultar_status_operacional)
+
+    def submit_consultar_numero_sessao(self, numero_sessao):
+        """Versão não bloqueante de :meth:`consultar_numero_sessao`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`consultar_numero_sessao`.
+        """
+        return self._submeter(self.consultar_numero_sessao, numero_sessao)
+
+    def submit_configurar_interface_de_rede(
+            self,
+            configuracao,
+            *args,
+            **kwargs):
+        """Versão não bloqueante de :meth:`configurar_interface_de_rede`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`configurar_interface_de_rede`.
+        """
+        return self._submeter(
+                self.configurar_interface_de_rede,
+                configuracao,
+                *args,
+                **kwargs)
+
+    def submit_associar_assinatura(self, sequencia_cnpj, assinatura_ac):
+        """Versão não bloqueante de :meth:`associar_assinatura`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`associar_assinatura`.
+        """
+        return self._submeter(
+                self.associar_assinatura,
+                sequencia_cnpj,
+                assinatura_ac)
+
+    def submit_atualizar_software_sat(self):
+        """Versão não bloqueante de :meth:`atualizar_software_sat`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`atualizar_software_sat`.
+        """
+        return self._submeter(self.atualizar_software_sat)
+
+    def submit_extrair_logs(self):
+        """Versão não bloqueante de :meth:`extrair_logs`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`extrair_logs`.
+        """
+        return self._submeter(self.extrair_logs)
+
+    def submit_bloquear_sat(self):
+        """Versão não bloqueante de :meth:`bloquear_sat`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`bloquear_sat`.
+        """
+        return self._submeter(self.bloquear_sat)
+
+    def submit_desbloquear_sat(self):
+        """Versão não bloqueante de :meth:`desbloquear_sat`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`desbloquear_sat`.
+        """
+        return self._submeter(self.desbloquear_sat)
+
+    def submit_trocar_codigo_de_ativacao(
+            self, novo_codigo_ativacao,
+            opcao=constantes.CODIGO_ATIVACAO_REGULAR,
+            codigo_emergencia=None):
+        """Versão não bloqueante de :meth:`trocar_codigo_de_ativacao`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`trocar_codigo_de_ativacao`.
+        """
+        return self._submeter(
+                self.trocar_codigo_de_ativacao,
+                novo_codigo_ativacao,
+                opcao=opcao,
+                codigo_emergencia=codigo_emergencia)
+
+    def submit_consultar_ultima_sessao_fiscal(self):
+        """Versão não bloqueante de :meth:`consultar_ultima_sessao_fiscal`.
+
+        :return: Um :class:`~concurrent.futures.Future` que irá resultar no
+            mesmo retorno do método :meth:`consultar_ultima_sessao_fiscal`.
+        """
+        return self._submeter(self.consultar_ultima_sessao_fiscal)
+
 
 def resolver_documento(dados, *args, **kwargs):
     if isinstance(dados, six.string_types):
@@ -652,7 +1422,13 @@ def resolver_documento(dados, *args, **kwargs):
                     category=UserWarning,
                     stacklevel=3)
     else:
-        if hasattr(dados, 'documento') \
+        if isinstance(dados, Entidade):
+            # a escrita direta resulta no mesmo documento, porém mais rápido
+            # (as entidades que redefinem apenas a construção do elemento via
+            # ElementTree continuam sendo construídas através dele)
+            kwargs.setdefault('direto', True)
+            conteudo = dados.documento(*args, **kwargs)
+        elif hasattr(dados, 'documento') \
                 and callable(dados.documento):
             conteudo = dados.documento(*args, **kwargs)
         else:
@@ -0,0 +1,495 @@
+# -*- coding: utf-8 -*-
+#
+# satcfe/clienteasync.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Clientes assíncronos (:mod:`asyncio`) para acesso ao equipamento SAT.
+
+Os métodos destes clientes são corrotinas que resultam nos mesmos objetos de
+resposta de :class:`~satcfe.clientelocal.ClienteSATLocal` e de
+:class:`~satcfe.clientesathub.ClienteSATHub`.
+
+.. note::
+
+    Este módulo requer Python 3.6 ou superior e não é instalado em Python 2
+    (veja ``setup.py``). O cliente SATHub assíncrono requer ainda a
+    biblioteca `aiohttp <https://docs.aiohttp.org/>`_.
+
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import asyncio
+
+try:
+    import aiohttp
+    _aiohttp_disponivel = True
+except ImportError:
+    # biblioteca aiohttp é opcional
+    _aiohttp_disponivel = False
+
+from satcomum import constantes
+
+import satcfe
+
+from . import instrumentacao
+from .base import resolver_documento
+from .clientelocal import ClienteSATLocal
+
+from .resposta import RespostaAssociarAssinatura
+from .resposta import RespostaAtivarSAT
+from .resposta import RespostaCancelarUltimaVenda
+from .resposta import RespostaConsultarNumeroSessao
+from .resposta import RespostaConsultarStatusOperacional
+from .resposta import RespostaConsultarUltimaSessaoFiscal
+from .resposta import RespostaEnviarDadosVenda
+from .resposta import RespostaExtrairLogs
+from .resposta import RespostaSAT
+from .resposta import RespostaTesteFimAFim
+
+
+class ClienteSATAsync(object):
+    """Fornece acesso assíncrono ao equipamento SAT conectado na máquina
+    local. Os argumentos são os mesmos de
+    :class:`~satcfe.clientelocal.ClienteSATLocal`.
+
+    As funções da biblioteca SAT são invocadas pelo *worker* dedicado do
+    cliente local (veja :meth:`~satcfe.base.FuncoesSAT.submit_consultar_sat`,
+    por exemplo), uma de cada vez, sem bloquear o *loop* de eventos. Para
+    compartilhar o equipamento com outros clientes, informe um
+    :class:`~satcfe.base.DespachanteSAT` ao invés da biblioteca SAT.
+
+    .. sourcecode:: python
+
+        cliente = ClienteSATAsync(
+                BibliotecaSAT('/opt/fabricante/libsat.so'),
+                codigo_ativacao='12345678')
+
+        resposta = await cliente.consultar_sat()
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._cliente = ClienteSATLocal(*args, **kwargs)
+
+    @property
+    def cliente(self):
+        """O :class:`~satcfe.clientelocal.ClienteSATLocal` subjacente."""
+        return self._cliente
+
+    def encerrar(self, wait=True):
+        """Encerra o *worker* dedicado do cliente local subjacente. Veja
+        :meth:`~satcfe.base.FuncoesSAT.encerrar`.
+        """
+        self._cliente.encerrar(wait=wait)
+
+    async def ativar_sat(self, tipo_certificado, cnpj, codigo_uf):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.ativar_sat`.
+        """
+        return await asyncio.wrap_future(
+                self._cliente.submit_ativar_sat(
+                        tipo_certificado,
+                        cnpj,
+                        codigo_uf))
+
+    async def comunicar_certificado_icpbrasil(self, certificado):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.comunicar_certificado_icpbrasil`.
+        """  # noqa: E501
+        return await asyncio.wrap_future(
+                self._cliente.submit_comunicar_certificado_icpbrasil(
+                        certificado))
+
+    async def enviar_dados_venda(self, dados_venda, *args, **kwargs):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.enviar_dados_venda`.
+        """
+        return await asyncio.wrap_future(
+                self._cliente.submit_enviar_dados_venda(
+                        dados_venda,
+                        *args,
+                        **kwargs))
+
+    async def cancelar_ultima_venda(
+            self,
+            chave_cfe,
+            dados_cancelamento,
+            *args,
+            **kwargs):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.cancelar_ultima_venda`.
+        """
+        return await asyncio.wrap_future(
+                self._cliente.submit_cancelar_ultima_venda(
+                        chave_cfe,
+                        dados_cancelamento,
+                        *args,
+                        **kwargs))
+
+    async def consultar_sat(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.consultar_sat`.
+        """
+        return await asyncio.wrap_future(self._cliente.submit_consultar_sat())
+
+    async def teste_fim_a_fim(self, dados_venda, *args, **kwargs):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.teste_fim_a_fim`.
+        """
+        return await asyncio.wrap_future(
+                self._cliente.submit_teste_fim_a_fim(
+                        dados_venda,
+                        *args,
+                        **kwargs))
+
+    async def consultar_status_operacional(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.consultar_status_operacional`.
+        """  # noqa: E501
+        return await asyncio.wrap_future(
+                self._cliente.submit_consultar_status_operacional())
+
+    async def consultar_numero_sessao(self, numero_sessao):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.consultar_numero_sessao`.
+        """
+        return await asyncio.wrap_future(
+                self._cliente.submit_consultar_numero_sessao(
+                        numero_sessao))
+
+    async def configurar_interface_de_rede(
+            self,
+            configuracao,
+            *args,
+            **kwargs):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.configurar_interface_de_rede`.
+        """  # noqa: E501
+        return await asyncio.wrap_future(
+                self._cliente.submit_configurar_interface_de_rede(
+                        configuracao,
+                        *args,
+                        **kwargs))
+
+    async def associar_assinatura(self, sequencia_cnpj, assinatura_ac):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.associar_assinatura`.
+        """
+        return await asyncio.wrap_future(
+                self._cliente.submit_associar_assinatura(
+                        sequencia_cnpj,
+                        assinatura_ac))
+
+    async def atualizar_software_sat(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.atualizar_software_sat`.
+        """
+        return await asyncio.wrap_future(
+                self._cliente.submit_atualizar_software_sat())
+
+    async def extrair_logs(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.extrair_logs`.
+        """
+        return await asyncio.wrap_future(self._cliente.submit_extrair_logs())
+
+    async def bloquear_sat(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.bloquear_sat`.
+        """
+        return await asyncio.wrap_future(self._cliente.submit_bloquear_sat())
+
+    async def desbloquear_sat(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.desbloquear_sat`.
+        """
+        return await asyncio.wrap_future(
+                self._cliente.submit_desbloquear_sat())
+
+    async def trocar_codigo_de_ativacao(
+            self,
+            novo_codigo_ativacao,
+            opcao=constantes.CODIGO_ATIVACAO_REGULAR,
+            codigo_emergencia=None):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.trocar_codigo_de_ativacao`.
+        """
+        return await asyncio.wrap_future(
+                self._cliente.submit_trocar_codigo_de_ativacao(
+                        novo_codigo_ativacao,
+                        opcao=opcao,
+                        codigo_emergencia=codigo_emergencia))
+
+    async def consultar_ultima_sessao_fiscal(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientelocal.ClienteSATLocal.consultar_ultima_sessao_fiscal`.
+        """  # noqa: E501
+        return await asyncio.wrap_future(
+                self._cliente.submit_consultar_ultima_sessao_fiscal())
+
+
+class ClienteSATHubAsync(object):
+    """Fornece acesso assíncrono a um equipamento SAT remoto, através da API
+    RESTful `SATHub`_. Os argumentos ``host``, ``port``, ``numero_caixa`` e
+    ``baseurl`` são os mesmos de :class:`~satcfe.clientesathub.ClienteSATHub`.
+
+    As requisições HTTP são feitas através de uma sessão
+    :class:`aiohttp.ClientSession`, que mantém e reaproveita as conexões com o
+    servidor SATHub. Vários clientes (eg. um para cada caixa) podem
+    compartilhar a mesma sessão, informada através do argumento ``sessao``.
+
+    :param sessao: Opcional. Uma instância de :class:`aiohttp.ClientSession`.
+        Se não for informada, o cliente irá criar a sua própria sessão, que
+        deverá ser fechada através do método :meth:`fechar`.
+
+    .. _`SATHub`: https://github.com/base4sistemas/sathub
+
+    """
+
+    def __init__(
+            self,
+            host,
+            port,
+            numero_caixa=1,
+            baseurl='/hub/v1',
+            sessao=None):
+        self._host = host
+        self._port = port
+        self._numero_caixa = numero_caixa
+        self._baseurl = baseurl
+        self._sessao = sessao
+        self._sessao_propria = sessao is None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.fechar()
+
+    async def fechar(self):
+        """Fecha a sessão HTTP, caso tenha sido criada pelo próprio cliente."""
+        if self._sessao_propria and self._sessao is not None:
+            await self._sessao.close()
+            self._sessao = None
+
+    def _request_headers(self):
+        headers = {
+                'user-agent': 'satcfe/{}/ER-{}'.format(
+                        satcfe.__version__, satcfe.VERSAO_ER),
+            }
+        return headers
+
+    def _url(self, metodo):
+        return 'http://{}:{}/{}/{}'.format(
+                self._host,
+                self._port,
+                self._baseurl.strip('/'), metodo)
+
+    def _obter_sessao(self):
+        if self._sessao is None:
+            self._sessao = aiohttp.ClientSession()
+        return self._sessao
+
+    async def _http_post(self, metodo, **payload):
+        if not _aiohttp_disponivel:
+            raise RuntimeError(
+                    'Biblioteca \'aiohttp\' [1] necessaria para invocar '
+                    'funcoes do equipamento SAT atraves de um cliente SATHub '
+                    'assincrono. [1] https://docs.aiohttp.org/'
+                )
+        if 'numero_caixa' not in payload:
+            payload.update({'numero_caixa': self._numero_caixa})
+        # assim como em requests, campos sem valor não são enviados
+        dados = {k: str(v) for k, v in payload.items() if v is not None}
+        sessao = self._obter_sessao()
+        instrumentar = instrumentacao.ativa()
+        if instrumentar:
+            inicio = instrumentacao.relogio()
+        try:
+            async with sessao.post(
+                    self._url(metodo),
+                    data=dados,
+                    headers=self._request_headers()) as resp:
+                resp.raise_for_status()
+                corpo = await resp.read()
+                conteudo = await resp.json(content_type=None)
+        except Exception as ex:
+            if instrumentar:
+                instrumentacao.emitir(
+                        instrumentacao.HTTP,
+                        metodo,
+                        instrumentacao.relogio() - inicio,
+                        erro=ex)
+            raise
+        if instrumentar:
+            instrumentacao.emitir(
+                    instrumentacao.HTTP,
+                    metodo,
+                    instrumentacao.relogio() - inicio,
+                    tamanho_retorno=len(corpo))
+        return conteudo.get('retorno')
+
+    async def ativar_sat(self, tipo_certificado, cnpj, codigo_uf):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.ativar_sat`.
+        """
+        retorno = await self._http_post(
+                'ativarsat',
+                tipo_certificado=tipo_certificado,
+                cnpj=cnpj,
+                codigo_uf=codigo_uf)
+        return RespostaAtivarSAT.analisar(retorno)
+
+    async def comunicar_certificado_icpbrasil(self, certificado):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.comunicar_certificado_icpbrasil`.
+        """  # noqa: E501
+        retorno = await self._http_post(
+                'comunicarcertificadoicpbrasil',
+                certificado=certificado)
+        return RespostaSAT.comunicar_certificado_icpbrasil(retorno)
+
+    async def enviar_dados_venda(self, dados_venda, *args, **kwargs):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.enviar_dados_venda`.
+        """
+        cfe = resolver_documento(dados_venda, *args, **kwargs)
+        retorno = await self._http_post('enviardadosvenda', dados_venda=cfe)
+        return RespostaEnviarDadosVenda.analisar(retorno)
+
+    async def cancelar_ultima_venda(
+            self,
+            chave_cfe,
+            dados_cancelamento,
+            *args,
+            **kwargs):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.cancelar_ultima_venda`.
+        """
+        cfe_canc = resolver_documento(dados_cancelamento, *args, **kwargs)
+        retorno = await self._http_post(
+                'cancelarultimavenda',
+                chave_cfe=chave_cfe,
+                dados_cancelamento=cfe_canc)
+        return RespostaCancelarUltimaVenda.analisar(retorno)
+
+    async def consultar_sat(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.consultar_sat`.
+        """
+        retorno = await self._http_post('consultarsat')
+        return RespostaSAT.consultar_sat(retorno)
+
+    async def teste_fim_a_fim(self, dados_venda, *args, **kwargs):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.teste_fim_a_fim`.
+        """
+        cfe = resolver_documento(dados_venda, *args, **kwargs)
+        retorno = await self._http_post('testefimafim', dados_venda=cfe)
+        return RespostaTesteFimAFim.analisar(retorno)
+
+    async def consultar_status_operacional(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.consultar_status_operacional`.
+        """  # noqa: E501
+        retorno = await self._http_post('consultarstatusoperacional')
+        return RespostaConsultarStatusOperacional.analisar(retorno)
+
+    async def consultar_numero_sessao(self, numero_sessao):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.consultar_numero_sessao`.
+        """
+        retorno = await self._http_post(
+                'consultarnumerosessao',
+                numero_sessao=numero_sessao)
+        return RespostaConsultarNumeroSessao.analisar(retorno)
+
+    async def configurar_interface_de_rede(
+            self,
+            configuracao,
+            *args,
+            **kwargs):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.configurar_interface_de_rede`.
+        """  # noqa: E501
+        conf = resolver_documento(configuracao, *args, **kwargs)
+        retorno = await self._http_post(
+                'configurarinterfacederede',
+                configuracao=conf)
+        return RespostaSAT.configurar_interface_de_rede(retorno)
+
+    async def associar_assinatura(self, sequencia_cnpj, assinatura_ac):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.associar_assinatura`.
+        """
+        retorno = await self._http_post(
+                'associarassinatura',
+                sequencia_cnpj=sequencia_cnpj,
+                assinatura_ac=assinatura_ac)
+        return RespostaAssociarAssinatura.analisar(retorno)
+
+    async def atualizar_software_sat(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.atualizar_software_sat`.
+        """
+        retorno = await self._http_post('atualizarsoftwaresat')
+        return RespostaSAT.atualizar_software_sat(retorno)
+
+    async def extrair_logs(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.extrair_logs`.
+        """
+        retorno = await self._http_post('extrairlogs')
+        return RespostaExtrairLogs.analisar(retorno)
+
+    async def bloquear_sat(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.bloquear_sat`.
+        """
+        retorno = await self._http_post('bloquearsat')
+        return RespostaSAT.bloquear_sat(retorno)
+
+    async def desbloquear_sat(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.desbloquear_sat`.
+        """
+        retorno = await self._http_post('desbloquearsat')
+        return RespostaSAT.desbloquear_sat(retorno)
+
+    async def trocar_codigo_de_ativacao(
+            self,
+            novo_codigo_ativacao,
+            opcao=constantes.CODIGO_ATIVACAO_REGULAR,
+            codigo_emergencia=None):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.trocar_codigo_de_ativacao`.
+        """
+        retorno = await self._http_post(
+                'trocarcodigodeativacao',
+                novo_codigo_ativacao=novo_codigo_ativacao,
+                opcao=opcao,
+                codigo_emergencia=codigo_emergencia)
+        return RespostaSAT.trocar_codigo_de_ativacao(retorno)
+
+    async def consultar_ultima_sessao_fiscal(self):
+        """Versão assíncrona de
+        :meth:`~satcfe.clientesathub.ClienteSATHub.consultar_ultima_sessao_fiscal`.
+        """  # noqa: E501
+        retorno = await self._http_post('consultarultimasessaofiscal')
+        return RespostaConsultarUltimaSessaoFiscal.analisar(retorno)
@@ -31,6 +31,7 @@ from satcomum import constantes
 
 import satcfe
 
+from . import instrumentacao
 from .base import FuncoesSAT
 from .base import resolver_documento
 
@@ -108,8 +109,34 @@ class ClienteSATHub(FuncoesSAT):
         if 'numero_caixa' not in payload:
             payload.update({'numero_caixa': self._numero_caixa})
         headers = self._request_headers()
-        resp = requests.post(self._url(metodo), data=payload, headers=headers)
-        resp.raise_for_status()
+        if not instrumentacao.ativa():
+            resp = requests.post(
+                    self._url(metodo),
+                    data=payload,
+                    headers=headers)
+            resp.raise_for_status()
+            return resp
+
+        inicio = instrumentacao.relogio()
+        try:
+            resp = requests.post(
+                    self._url(metodo),
+                    data=payload,
+                    headers=headers)
+            resp.raise_for_status()
+        except Exception as ex:
+            instrumentacao.emitir(
+                    instrumentacao.HTTP,
+                    metodo,
+                    instrumentacao.relogio() - inicio,
+                    erro=ex)
+            raise
+        instrumentacao.emitir(
+                instrumentacao.HTTP,
+                metodo,
+                instrumentacao.relogio() - inicio,
+                tamanho_envio=len(resp.request.body or b''),
+                tamanho_retorno=len(resp.content))
         return resp
 
     def ativar_sat(self, tipo_certificado, cnpj, codigo_uf):
@@ -217,18 +217,28 @@ Pagamento:
 """
 
 import copy
+import io
 import re
+import threading
+import weakref
 import xml.etree.ElementTree as ET
 
 from decimal import Decimal
+from decimal import InvalidOperation
 
 import cerberus
 
+import six
+
 from unidecode import unidecode
 
 from satcomum import br
 from satcomum import constantes
 
+from . import totais
+from . import validacao
+from .excecoes import ErroTotaisInconsistentes
+
 
 class ExtendedValidator(cerberus.Validator):
     types_mapping = cerberus.Validator.types_mapping.copy()
@@ -236,16 +246,24 @@ class ExtendedValidator(cerberus.Validator):
             'decimal', (Decimal,), ()
         )
 
+    # resultados das verificações de CNPJ e CPF, compartilhados por todos os
+    # validadores (veja satcfe.validacao.MemoVerificacao)
+    memo_cnpj = validacao.MemoVerificacao(
+            lambda numero: br.is_cnpj(numero, estrito=True))
+
+    memo_cpf = validacao.MemoVerificacao(
+            lambda numero: br.is_cpf(numero, estrito=True))
+
     def _check_with_uf(self, field, value):
         if not br.is_uf(value):
             self._error(field, 'UF invalida: {!r}'.format(value))
 
     def _check_with_cnpj(self, field, value):
-        if not br.is_cnpj(value, estrito=True):
+        if not ExtendedValidator.memo_cnpj(value):
             self._error(field, 'CNPJ invalido: {!r}'.format(value))
 
     def _check_with_cpf(self, field, value):
-        if not br.is_cpf(value, estrito=True):
+        if not ExtendedValidator.memo_cpf(value):
             self._error(field, 'CPF invalido: {!r}'.format(value))
 
     def _check_with_assinatura_ac(self, field, value):
@@ -258,11 +276,155 @@ class ExtendedValidator(cerberus.Validator):
             self._error(field, 'Assinatura AC invalida: {!r}'.format(value))
 
     def _check_with_ipv4(self, field, value):
-        octets = [int(b) for b in value.split('.') if int(b) in range(0, 256)]
+        # a verificação é feita mesmo para valores nulos ou de outros tipos
+        # (veja a regra "nullable"), que resultam em erro, assim como os
+        # octetos que não sejam números
+        try:
+            octets = [int(b) for b in value.split('.') if 0 <= int(b) <= 255]
+        except (AttributeError, TypeError, ValueError):
+            octets = []
         if len(octets) != 4:
             self._error(field, 'Endereco IPv4 invalido: {!r}'.format(value))
 
 
+try:
+    _ascii = str.isascii
+except AttributeError:
+    # Python < 3.7
+    def _ascii(texto):
+        try:
+            texto.encode('ascii')
+        except UnicodeError:
+            return False
+        return True
+
+
+class EscritorXML(object):
+    """Escreve um documento XML diretamente em uma lista de strings, sem
+    construir uma árvore de elementos. O resultado é idêntico ao produzido
+    por :func:`xml.etree.ElementTree.tostring` para a mesma estrutura, com
+    o texto e os atributos escapados da mesma maneira e elementos vazios
+    escritos na forma abreviada (eg. ``<total />``).
+
+    :param bool transliterar: Se os textos e os valores dos atributos com
+        caracteres não ASCII devem ser transliterados (via ``unidecode``),
+        tal como :meth:`Entidade.documento` faz com o documento inteiro.
+    """
+
+    def __init__(self, transliterar=True):
+        self._partes = []
+        self._abertos = []
+        self._transliterar = transliterar
+
+    def abrir(self, tag, atributos=()):
+        """Abre o elemento ``tag``. Os elementos e textos escritos em seguida
+        serão filhos deste elemento, até que ele seja fechado.
+
+        :param atributos: Sequência de pares ``(nome, valor)``.
+        """
+        inicio = '<' + tag
+        for nome, valor in atributos:
+            valor = _escapar_atributo(valor)
+            if self._transliterar and not _ascii(valor):
+                valor = unidecode(valor)
+            inicio += ' ' + nome + '="' + valor + '"'
+        self._abertos.append((tag, len(self._partes)))
+        self._partes.append(inicio + '>')
+
+    def fechar(self):
+        """Fecha o último elemento aberto."""
+        tag, posicao = self._abertos.pop()
+        partes = self._partes
+        if posicao == len(partes) - 1:
+            # nenhum filho foi escrito
+            partes[posicao] = partes[posicao][:-1] + ' />'
+        else:
+            partes.append('</' + tag + '>')
+
+    def elemento(self, tag, texto=None):
+        """Escreve um elemento sem filhos, contendo apenas o texto."""
+        if texto:
+            texto = _escapar_texto(texto)
+            if self._transliterar and not _ascii(texto):
+                texto = unidecode(texto)
+            self._partes.append('<' + tag + '>' + texto + '</' + tag + '>')
+        else:
+            self._partes.append('<' + tag + ' />')
+
+    def fragmento(self, xml):
+        """Escreve um fragmento XML já serializado."""
+        if self._transliterar and not _ascii(xml):
+            xml = unidecode(xml)
+        self._partes.append(xml)
+
+    def texto(self):
+        """Resulta no documento escrito até aqui."""
+        return ''.join(self._partes)
+
+
+def _escapar_texto(texto):
+    # o mesmo escape que o ElementTree (Python 3) aplica ao texto dos
+    # elementos, o que garante que o resultado do EscritorXML seja idêntico
+    if '&' in texto:
+        texto = texto.replace('&', '&amp;')
+    if '<' in texto:
+        texto = texto.replace('<', '&lt;')
+    if '>' in texto:
+        texto = texto.replace('>', '&gt;')
+    return texto
+
+
+def _escapar_atributo(valor):
+    # idem, para os valores dos atributos, em que as aspas e as quebras de
+    # linha e tabulações são escritas como referências a entidades
+    valor = _escapar_texto(valor)
+    if '"' in valor:
+        valor = valor.replace('"', '&quot;')
+    if '\r' in valor:
+        valor = valor.replace('\r', '&#13;')
+    if '\n' in valor:
+        valor = valor.replace('\n', '&#10;')
+    if '\t' in valor:
+        valor = valor.replace('\t', '&#09;')
+    return valor
+
+
+def _construir_validador(schema, validator_class, tipo):
+    if tipo == validacao.COMPILADA:
+        try:
+            return validacao.ValidadorCompilado(schema, validator_class)
+        except ValueError:
+            pass  # regras não suportadas; recorre ao Cerberus
+    return validator_class(schema)
+
+
+def _fonte_xml(fonte):
+    # iterparse aceita o nome ou um objeto arquivo; o próprio documento,
+    # como string ou bytes, é lido de um buffer em memória
+    if isinstance(fonte, six.text_type):
+        if fonte.lstrip().startswith('<'):
+            return io.BytesIO(fonte.encode('utf-8'))
+    elif isinstance(fonte, six.binary_type):
+        if fonte.lstrip().startswith(b'<'):
+            return io.BytesIO(fonte)
+    return fonte
+
+
+def _converter(regras, texto):
+    # converte o texto conforme o tipo do atributo no schema; valores que
+    # não possam ser convertidos são mantidos como texto, de modo que sejam
+    # apontados na validação da entidade
+    tipo = regras.get('type')
+    try:
+        if tipo == 'decimal':
+            return Decimal(texto)
+        elif tipo == 'integer':
+            return int(texto)
+    except (InvalidOperation, ValueError):
+        pass
+    return texto
+
+
 class Entidade(object):
     """
     Classe base para todas as classes que representem as entidades da
@@ -271,18 +433,68 @@ class Entidade(object):
     venda ou de cancelamento.
 
     Basicamente, as subclasses precisam sobrescrever a implementação do
-    método ``_construir_elemento_xml``, definir o atributo ``_schema`` e,
-    quando necessário, implementar uma especialização do validador no
-    atributo ``_validator_class``.
+    método ``_construir_elemento_xml``, definir o atributo de classe
+    ``_schema`` e, quando necessário, implementar uma especialização do
+    validador no atributo de classe ``_validator_class``. Opcionalmente, as
+    subclasses podem implementar ``_escrever_elemento_xml``, que escreve o
+    mesmo elemento através de um :class:`EscritorXML` (veja o argumento
+    ``direto`` em :meth:`documento`). Uma especialização que redefina apenas
+    ``_construir_elemento_xml`` (ou ``_xml``) tem o seu elemento construído
+    através do ElementTree também na escrita direta, de modo que a
+    redefinição jamais é ignorada.
+
+    O validador é construído uma única vez para cada classe, na primeira
+    validação, e compartilhado (de maneira segura entre *threads*) por todas
+    as instâncias da classe. Os argumentos ``schema`` e ``validator_class``
+    ainda são aceitos, mas resultam em um validador exclusivo da instância.
+    Veja também :meth:`definir_validacao`.
+
+    Atribuir ou remover um atributo do *schema* notifica as entidades que
+    dependem desta (veja ``_acompanhar``), o que permite que as entidades
+    mantenham partes já serializadas do documento, que são descartadas
+    somente quando há alterações (veja :class:`Detalhamento`).
+
+    As entidades que ocorrem uma vez para cada item da venda (detalhamento,
+    produto e grupos de impostos) declaram ``__slots__`` com as chaves do
+    seu *schema* e, por isso, não possuem um ``__dict__`` por instância nem
+    aceitam os argumentos ``schema`` e ``validator_class``.
 
     """
 
-    def __init__(self, schema={}, validator_class=None, **kwargs):
+    __slots__ = (
+            '_errors',
+            '_dependentes',
+            '_validador_proprio',
+            '__weakref__',
+        )
+
+    _schema = {}
+
+    _validator_class = ExtendedValidator
+
+    _validacao = validacao.CERBERUS
+
+    _validadores = {}
+
+    _trava_validadores = threading.Lock()
+
+    def __init__(self, schema=None, validator_class=None, **kwargs):
         super(Entidade, self).__init__()
-        self._schema = schema
-        self._validator_class = validator_class or ExtendedValidator
-        self._validator = self._validator_class(self._schema)
-        self._errors = {}
+        self._errors = None  # criado apenas na primeira falha de validação
+        self._dependentes = None
+        self._validador_proprio = None
+        if schema is not None or validator_class is not None:
+            if not hasattr(self, '__dict__'):
+                raise TypeError((
+                        '{!r} does not accept a schema or validator_class'
+                    ).format(self.__class__.__name__))
+            if schema is not None:
+                self._schema = schema
+            if validator_class is not None:
+                self._validator_class = validator_class
+            self._validador_proprio = (
+                    self._construir_validador(),
+                    threading.Lock())
 
         # define como atributos e valores desta instância os argumentos
         # nomeados, desde que coincidam com as chaves no schema
@@ -293,13 +505,52 @@ class Entidade(object):
                     ).format(self.__class__.__name__, key))
             setattr(self, key, value)
 
+    def __setattr__(self, nome, valor):
+        super(Entidade, self).__setattr__(nome, valor)
+        if nome in self._schema:
+            self._alterado()
+
+    def __delattr__(self, nome):
+        super(Entidade, self).__delattr__(nome)
+        if nome in self._schema:
+            self._alterado()
+
+    @classmethod
+    def definir_validacao(cls, tipo):
+        """Define como as entidades são validadas. Quando invocado a partir
+        de :class:`Entidade`, define a validação de todas as entidades que não
+        tenham sua própria definição; a partir de uma subclasse, define a
+        validação apenas daquela entidade (e suas subclasses).
+
+        :param str tipo: Uma das constantes :attr:`satcfe.validacao.CERBERUS`
+            ou :attr:`satcfe.validacao.COMPILADA`. Para uma subclasse, use
+            ``None`` para voltar a seguir a definição de :class:`Entidade`.
+
+        A validação compilada (veja :mod:`satcfe.validacao`) produz os mesmos
+        erros que o Cerberus. Entidades cujo *schema* utilize regras que não
+        possam ser compiladas continuam sendo validadas pelo Cerberus.
+        """
+        if tipo is None and cls is not Entidade:
+            if '_validacao' in cls.__dict__:
+                del cls._validacao
+            return
+        if tipo not in validacao.VALIDACOES:
+            raise ValueError('Validacao desconhecida: {!r}'.format(tipo))
+        cls._validacao = tipo
+
     @property
     def erros(self):
-        return copy.deepcopy(self._errors)
+        return copy.deepcopy(self._errors or {})
 
     def validar(self):
-        if not self._validator.validate(self._data()):
-            self._errors[self.__class__.__name__] = self._validator.errors
+        validador, trava = self._validador()
+        with trava:
+            valido = validador.validate(self._data())
+            if not valido:
+                if self._errors is None:
+                    self._errors = {}
+                self._errors[self.__class__.__name__] = validador.errors
+        if not valido:
             raise cerberus.DocumentError((
                     'Entidade {!r} possui atributos invalidos'
                 ).format(self.__class__.__name__))
@@ -308,9 +559,27 @@ class Entidade(object):
         """
         Resulta no documento XML como string, que pode ou não incluir a
         declaração XML no início do documento.
+
+        Se o argumento ``direto`` for ``True``, o documento é escrito
+        diretamente como texto através de um :class:`EscritorXML`, sem a
+        construção da árvore de elementos, e apenas os valores que contenham
+        caracteres não ASCII são transliterados. O resultado é idêntico,
+        inclusive para as entidades que sejam construídas apenas através do
+        ElementTree, cujos elementos são serializados como fragmentos.
         """
         forcar_unicode = kwargs.pop('forcar_unicode', False)
         incluir_xml_decl = kwargs.pop('incluir_xml_decl', True)
+        if kwargs.pop('direto', False):
+            escritor = EscritorXML(transliterar=not forcar_unicode)
+            self._escrever(escritor, *args, **kwargs)
+            doc = escritor.texto()
+            if incluir_xml_decl:
+                doc = '{}\n{}'.format(
+                        constantes.XML_DECL_UNICODE if forcar_unicode
+                        else constantes.XML_DECL,
+                        doc)
+            return doc
+
         doc = ET.tostring(
                 self._xml(*args, **kwargs),
                 encoding='utf-8'
@@ -325,8 +594,79 @@ class Entidade(object):
                 doc = unidecode(doc)
         return doc
 
+    @classmethod
+    def de_xml(cls, fonte):
+        """Constrói a entidade a partir de um documento XML, tal como o
+        resultante de :meth:`documento`, lido de maneira incremental (via
+        :func:`xml.etree.ElementTree.iterparse`).
+
+        :param fonte: O nome do arquivo, um objeto arquivo ou o próprio
+            documento XML (``str`` ou ``bytes``).
+
+        Elementos que não correspondam a atributos da entidade (eg. os
+        elementos acrescentados pelo equipamento SAT ao CF-e autorizado) são
+        ignorados. A entidade não é validada.
+        """
+        elemento = None
+        for _, elemento in ET.iterparse(_fonte_xml(fonte)):
+            pass  # o último elemento é a raiz do documento
+        return cls._de_elemento(elemento)
+
+    @classmethod
+    def _de_elemento(cls, elemento):
+        return cls(**cls._dados_elemento(elemento))
+
+    @classmethod
+    def _dados_elemento(cls, elemento):
+        # valores dos atributos do schema, a partir dos atributos XML e dos
+        # elementos filhos (sem filhos) do elemento
+        schema = cls._schema
+        dados = {}
+        for nome, valor in elemento.attrib.items():
+            if nome in schema:
+                dados[nome] = _converter(schema[nome], valor)
+        for filho in elemento:
+            if filho.tag in schema and len(filho) == 0:
+                dados[filho.tag] = _converter(
+                        schema[filho.tag],
+                        filho.text or '')
+        return dados
+
     def _data(self):
-        return {k: v for k, v in self.__dict__.items() if k in self._schema}
+        dados = {}
+        for chave in self._schema:
+            try:
+                dados[chave] = getattr(self, chave)
+            except AttributeError:
+                pass  # atributo opcional não definido
+        return dados
+
+    def _validador(self):
+        validador = self._validador_proprio
+        if validador is not None:
+            return validador
+
+        return Entidade._validador_compartilhado(
+                (self.__class__, self._validacao),
+                self._construir_validador)
+
+    @staticmethod
+    def _validador_compartilhado(chave, construir):
+        # o validador (e sua trava) para a chave, construído uma única vez
+        validador = Entidade._validadores.get(chave)
+        if validador is None:
+            with Entidade._trava_validadores:
+                validador = Entidade._validadores.get(chave)
+                if validador is None:
+                    validador = (construir(), threading.Lock())
+                    Entidade._validadores[chave] = validador
+        return validador
+
+    def _construir_validador(self):
+        return _construir_validador(
+                self._schema,
+                self._validator_class,
+                self._validacao)
 
     def _xml(self, *args, **kwargs):
         self.validar()
@@ -335,6 +675,89 @@ class Entidade(object):
     def _construir_elemento_xml(self, *args, **kwargs):
         raise NotImplementedError()
 
+    def _escrever(self, escritor, *args, **kwargs):
+        # escreve o elemento através do escritor, a menos que a classe tenha
+        # redefinido a construção do elemento (via ElementTree) sem redefinir
+        # também a escrita direta, caso em que o elemento construído é
+        # serializado e escrito como um fragmento
+        if _escrita_direta(self.__class__):
+            self._escrever_xml(escritor, *args, **kwargs)
+        else:
+            escritor.fragmento(ET.tostring(
+                    self._xml(*args, **kwargs),
+                    encoding='utf-8'
+                ).decode('utf-8'))
+
+    def _escrever_xml(self, escritor, *args, **kwargs):
+        self.validar()
+        self._escrever_elemento_xml(escritor, *args, **kwargs)
+
+    def _acompanhar(self, *entidades):
+        # esta entidade passa a ser notificada (via _alterado) quando houver
+        # alterações nas entidades informadas; as referências são fracas, de
+        # modo que uma entidade compartilhada (eg. o mesmo grupo de PIS em
+        # todos os itens) não mantém vivas as entidades que dependem dela;
+        # no caso mais comum, de um único dependente, basta uma referência
+        # fraca simples, mais compacta do que um WeakSet
+        for entidade in entidades:
+            if entidade is None:
+                continue
+            dependentes = entidade._dependentes
+            if dependentes is None:
+                entidade._dependentes = weakref.ref(self)
+            elif isinstance(dependentes, weakref.WeakSet):
+                dependentes.add(self)
+            else:
+                dependente = dependentes()
+                if dependente is None:
+                    entidade._dependentes = weakref.ref(self)
+                elif dependente is not self:
+                    entidade._dependentes = weakref.WeakSet(
+                            (dependente, self))
+
+    def _alterado(self):
+        dependentes = self._dependentes
+        if dependentes is None:
+            return
+        if isinstance(dependentes, weakref.WeakSet):
+            for dependente in list(dependentes):
+                dependente._alterado()
+        else:
+            dependente = dependentes()
+            if dependente is not None:
+                dependente._alterado()
+
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        raise NotImplementedError()
+
+
+_ESCRITAS_DIRETAS = {}
+
+
+def _definido_em(classe, nomes):
+    # a classe mais especializada (na MRO) que define algum dos métodos
+    for base in classe.__mro__:
+        if any(nome in vars(base) for nome in nomes):
+            return base
+    return None
+
+
+def _escrita_direta(classe):
+    # se a escrita direta da classe é ao menos tão especializada quanto a
+    # construção do elemento através do ElementTree; determinado uma única
+    # vez para cada classe (as operações sobre o dicionário são atômicas)
+    direta = _ESCRITAS_DIRETAS.get(classe)
+    if direta is None:
+        direta = issubclass(
+                _definido_em(classe, (
+                        '_escrever_xml',
+                        '_escrever_elemento_xml')),
+                _definido_em(classe, (
+                        '_xml',
+                        '_construir_elemento_xml')))
+        _ESCRITAS_DIRETAS[classe] = direta
+    return direta
+
 
 class Emitente(Entidade):
     """
@@ -360,38 +783,37 @@ class Emitente(Entidade):
 
     """
 
-    def __init__(self, **kwargs):
-        super(Emitente, self).__init__(schema={
-                'CNPJ': {
-                        'type': 'string',
-                        'check_with': 'cnpj',
-                        'required': True,
-                    },
-                'IE': {
-                        'type': 'string',
-                        'required': True,
-                        'regex': r'^\d{2,12}$'
-                    },
-                'IM': {
-                        'type': 'string',
-                        'required': False,
-                        'regex': r'^\d{1,15}$'
-                    },
-                'cRegTribISSQN': {
-                        'type': 'string',
-                        'required': False,
-                        'allowed': [
-                                v for v, s in constantes.C15_CREGTRIBISSQN_EMIT
-                            ],
-                    },
-                'indRatISSQN': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [
-                                v for v, s in constantes.C16_INDRATISSQN_EMIT
-                            ],
-                    },
-            }, **kwargs)
+    _schema = {
+            'CNPJ': {
+                    'type': 'string',
+                    'check_with': 'cnpj',
+                    'required': True,
+                },
+            'IE': {
+                    'type': 'string',
+                    'required': True,
+                    'regex': r'^\d{2,12}$'
+                },
+            'IM': {
+                    'type': 'string',
+                    'required': False,
+                    'regex': r'^\d{1,15}$'
+                },
+            'cRegTribISSQN': {
+                    'type': 'string',
+                    'required': False,
+                    'allowed': [
+                            v for v, s in constantes.C15_CREGTRIBISSQN_EMIT
+                        ],
+                },
+            'indRatISSQN': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [
+                            v for v, s in constantes.C16_INDRATISSQN_EMIT
+                        ],
+                },
+        }
 
     def _construir_elemento_xml(self, *args, **kwargs):
         emit = ET.Element('emit')
@@ -408,6 +830,20 @@ class Emitente(Entidade):
 
         return emit
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('emit')
+        escritor.elemento('CNPJ', self.CNPJ)
+        escritor.elemento('IE', self.IE)
+
+        if hasattr(self, 'IM'):
+            escritor.elemento('IM', self.IM)
+
+        if hasattr(self, 'cRegTribISSQN'):
+            escritor.elemento('cRegTribISSQN', self.cRegTribISSQN)
+
+        escritor.elemento('indRatISSQN', self.indRatISSQN)
+        escritor.fechar()
+
 
 class Destinatario(Entidade):
     """
@@ -426,27 +862,26 @@ class Destinatario(Entidade):
 
     """
 
-    def __init__(self, **kwargs):
-        super(Destinatario, self).__init__(schema={
-                'CNPJ': {  # E02
-                        'type': 'string',
-                        'check_with': 'cnpj',
-                        'excludes': 'CPF',
-                        'required': False,
-                    },
-                'CPF': {  # E03
-                        'type': 'string',
-                        'check_with': 'cpf',
-                        'excludes': 'CNPJ',
-                        'required': False,
-                    },
-                'xNome': {  # E04
-                        'type': 'string',
-                        'required': False,
-                        'minlength': 2,
-                        'maxlength': 60,
-                    }
-            }, **kwargs)
+    _schema = {
+            'CNPJ': {  # E02
+                    'type': 'string',
+                    'check_with': 'cnpj',
+                    'excludes': 'CPF',
+                    'required': False,
+                },
+            'CPF': {  # E03
+                    'type': 'string',
+                    'check_with': 'cpf',
+                    'excludes': 'CNPJ',
+                    'required': False,
+                },
+            'xNome': {  # E04
+                    'type': 'string',
+                    'required': False,
+                    'minlength': 2,
+                    'maxlength': 60,
+                }
+        }
 
     def _construir_elemento_xml(self, *args, **kwargs):
         is_cancelamento = kwargs.pop('cancelamento', False)
@@ -465,6 +900,23 @@ class Destinatario(Entidade):
 
         return dest
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        is_cancelamento = kwargs.pop('cancelamento', False)
+
+        escritor.abrir('dest')
+
+        if not is_cancelamento:
+            if hasattr(self, 'CNPJ'):
+                escritor.elemento('CNPJ', self.CNPJ)
+
+            if hasattr(self, 'CPF'):
+                escritor.elemento('CPF', self.CPF)
+
+            if hasattr(self, 'xNome'):
+                escritor.elemento('xNome', self.xNome)
+
+        escritor.fechar()
+
 
 class LocalEntrega(Entidade):
     """
@@ -479,44 +931,43 @@ class LocalEntrega(Entidade):
 
     """
 
-    def __init__(self, **kwargs):
-        super(LocalEntrega, self).__init__(schema={
-                'xLgr': {  # G02
-                        'type': 'string',
-                        'required': True,
-                        'minlength': 2,
-                        'maxlength': 60,
-                    },
-                'nro': {  # G03
-                        'type': 'string',
-                        'required': True,
-                        'minlength': 1,
-                        'maxlength': 60,
-                    },
-                'xCpl': {  # G04
-                        'type': 'string',
-                        'required': False,
-                        'minlength': 1,
-                        'maxlength': 60,
-                    },
-                'xBairro': {  # G05
-                        'type': 'string',
-                        'required': True,
-                        'minlength': 1,
-                        'maxlength': 60,
-                    },
-                'xMun': {  # G06
-                        'type': 'string',
-                        'required': True,
-                        'minlength': 2,
-                        'maxlength': 60,
-                    },
-                'UF': {  # G07
-                        'type': 'string',
-                        'check_with': 'uf',
-                        'required': True,
-                    },
-            }, **kwargs)
+    _schema = {
+            'xLgr': {  # G02
+                    'type': 'string',
+                    'required': True,
+                    'minlength': 2,
+                    'maxlength': 60,
+                },
+            'nro': {  # G03
+                    'type': 'string',
+                    'required': True,
+                    'minlength': 1,
+                    'maxlength': 60,
+                },
+            'xCpl': {  # G04
+                    'type': 'string',
+                    'required': False,
+                    'minlength': 1,
+                    'maxlength': 60,
+                },
+            'xBairro': {  # G05
+                    'type': 'string',
+                    'required': True,
+                    'minlength': 1,
+                    'maxlength': 60,
+                },
+            'xMun': {  # G06
+                    'type': 'string',
+                    'required': True,
+                    'minlength': 2,
+                    'maxlength': 60,
+                },
+            'UF': {  # G07
+                    'type': 'string',
+                    'check_with': 'uf',
+                    'required': True,
+                },
+        }
 
     def _construir_elemento_xml(self, *args, **kwargs):
         entrega = ET.Element('entrega')
@@ -532,6 +983,19 @@ class LocalEntrega(Entidade):
 
         return entrega
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('entrega')
+        escritor.elemento('xLgr', self.xLgr)
+        escritor.elemento('nro', self.nro)
+
+        if hasattr(self, 'xCpl'):
+            escritor.elemento('xCpl', self.xCpl)
+
+        escritor.elemento('xBairro', self.xBairro)
+        escritor.elemento('xMun', self.xMun)
+        escritor.elemento('UF', self.UF)
+        escritor.fechar()
+
 
 class Detalhamento(Entidade):
     """
@@ -553,19 +1017,44 @@ class Detalhamento(Entidade):
         atribuído automaticamente, conforme a sua posição na lista de
         :attr:`~CFeVenda.detalhamentos`.
 
+    Na escrita direta do documento (veja :meth:`Entidade.documento`), o
+    conteúdo do item, já validado e serializado, é mantido e reaproveitado
+    até que algum atributo do item, do produto ou dos grupos de impostos
+    seja alterado. Desse modo, gerar novamente o documento de uma venda
+    valida e serializa apenas os itens alterados ou acrescentados.
+
     """
 
+    _schema = {
+            'infAdProd': {  # V01
+                    'type': 'string',
+                    'required': False,
+                    'minlength': 1,
+                    'maxlength': 500,
+                },
+        }
+
+    __slots__ = tuple(_schema) + (
+            '_produto',
+            '_imposto',
+            '_conteudo_xml',
+        )
+
     def __init__(self, produto=None, imposto=None, **kwargs):
         self._produto = produto
         self._imposto = imposto
-        super(Detalhamento, self).__init__(schema={
-               'infAdProd': {  # V01
-                        'type': 'string',
-                        'required': False,
-                        'minlength': 1,
-                        'maxlength': 500,
-                    },
-            }, **kwargs)
+        self._conteudo_xml = None
+        super(Detalhamento, self).__init__(**kwargs)
+        self._acompanhar(produto, imposto)
+
+    @classmethod
+    def _de_elemento(cls, elemento):
+        produto = elemento.find('prod')
+        imposto = elemento.find('imposto')
+        return cls(
+                produto=_de_elemento(ProdutoServico, produto),
+                imposto=_de_elemento(Imposto, imposto),
+                **cls._dados_elemento(elemento))
 
     @property
     def produto(self):
@@ -587,6 +1076,32 @@ class Detalhamento(Entidade):
 
         return det
 
+    def _alterado(self):
+        self._conteudo_xml = None
+        super(Detalhamento, self)._alterado()
+
+    def _escrever_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('det', [('nItem', str(kwargs.pop('nItem')))])
+        escritor.fragmento(self._conteudo())
+        escritor.fechar()
+
+    def _conteudo(self):
+        # conteúdo do elemento "det", sem transliteração, validado e
+        # serializado somente se houve alterações desde a última vez
+        conteudo = self._conteudo_xml
+        if conteudo is None:
+            self.validar()
+            escritor = EscritorXML(transliterar=False)
+            self.produto._escrever(escritor)
+            self.imposto._escrever(escritor)
+
+            if hasattr(self, 'infAdProd'):
+                escritor.elemento('infAdProd', self.infAdProd)
+
+            conteudo = escritor.texto()
+            self._conteudo_xml = conteudo
+        return conteudo
+
 
 class ProdutoServico(Entidade):
     """
@@ -608,64 +1123,80 @@ class ProdutoServico(Entidade):
 
     """
 
+    _schema = {
+            'cProd': {  # I02
+                    'type': 'string',
+                    'required': True,
+                    'minlength': 1,
+                    'maxlength': 60,
+                },
+            'cEAN': {  # I03
+                    'type': 'string',
+                    'required': False,
+                    'regex': r'^(\d{8}|\d{12}|\d{13}|\d{14})$',
+                },
+            'xProd': {  # I04
+                    'type': 'string',
+                    'required': True,
+                    'minlength': 1,
+                    'maxlength': 120,
+                },
+            'NCM': {  # I05
+                    'type': 'string',
+                    'required': False,
+                    'regex': r'^(\d{2}|\d{8})$',
+                },
+            'CFOP': {  # I06
+                    'type': 'string',
+                    'required': True,
+                    'regex': r'^\d{4}$',
+                },
+            'uCom': {  # I07
+                    'type': 'string',
+                    'required': True,
+                    'minlength': 1,
+                    'maxlength': 6,
+                },
+            'qCom': {  # I08
+                    'type': 'decimal',
+                    'required': True,
+                },
+            'vUnCom': {  # I09
+                    'type': 'decimal',
+                    'required': True,
+                },
+            'indRegra': {  # I11
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.I11_INDREGRA],
+                },
+            'vDesc': {  # I12
+                    'type': 'decimal',
+                    'required': False,
+                },
+            'vOutro': {  # I13
+                    'type': 'decimal',
+                    'required': False,
+                },
+        }
+
+    __slots__ = tuple(_schema) + (
+            '_observacoes_fisco',
+        )
+
     def __init__(self, observacoes_fisco=None, **kwargs):
         self._observacoes_fisco = observacoes_fisco
-        super(ProdutoServico, self).__init__(schema={
-                'cProd': {  # I02
-                        'type': 'string',
-                        'required': True,
-                        'minlength': 1,
-                        'maxlength': 60,
-                    },
-                'cEAN': {  # I03
-                        'type': 'string',
-                        'required': False,
-                        'regex': r'^(\d{8}|\d{12}|\d{13}|\d{14})$',
-                    },
-                'xProd': {  # I04
-                        'type': 'string',
-                        'required': True,
-                        'minlength': 1,
-                        'maxlength': 120,
-                    },
-                'NCM': {  # I05
-                        'type': 'string',
-                        'required': False,
-                        'regex': r'^(\d{2}|\d{8})$',
-                    },
-                'CFOP': {  # I06
-                        'type': 'string',
-                        'required': True,
-                        'regex': r'^\d{4}$',
-                    },
-                'uCom': {  # I07
-                        'type': 'string',
-                        'required': True,
-                        'minlength': 1,
-                        'maxlength': 6,
-                    },
-                'qCom': {  # I08
-                        'type': 'decimal',
-                        'required': True,
-                    },
-                'vUnCom': {  # I09
-                        'type': 'decimal',
-                        'required': True,
-                    },
-                'indRegra': {  # I11
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.I11_INDREGRA],
-                    },
-                'vDesc': {  # I12
-                        'type': 'decimal',
-                        'required': False,
-                    },
-                'vOutro': {  # I13
-                        'type': 'decimal',
-                        'required': False,
-                    },
-            }, **kwargs)
+        super(ProdutoServico, self).__init__(**kwargs)
+        self._acompanhar(*(observacoes_fisco or ()))
+
+    @classmethod
+    def _de_elemento(cls, elemento):
+        observacoes = [
+                ObsFiscoDet._de_elemento(obs)
+                for obs in elemento.findall('obsFiscoDet')]
+        return cls(
+                observacoes_fisco=observacoes or None,
+                **cls._dados_elemento(elemento))
 
     @property
     def observacoes_fisco(self):
@@ -701,6 +1232,36 @@ class ProdutoServico(Entidade):
 
         return prod
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('prod')
+        escritor.elemento('cProd', self.cProd)
+
+        if hasattr(self, 'cEAN'):
+            escritor.elemento('cEAN', self.cEAN)
+
+        escritor.elemento('xProd', self.xProd)
+
+        if hasattr(self, 'NCM'):
+            escritor.elemento('NCM', self.NCM)
+
+        escritor.elemento('CFOP', self.CFOP)
+        escritor.elemento('uCom', self.uCom)
+        escritor.elemento('qCom', str(self.qCom))
+        escritor.elemento('vUnCom', str(self.vUnCom))
+        escritor.elemento('indRegra', self.indRegra)
+
+        if hasattr(self, 'vDesc'):
+            escritor.elemento('vDesc', str(self.vDesc))
+
+        if hasattr(self, 'vOutro'):
+            escritor.elemento('vOutro', str(self.vOutro))
+
+        if self.observacoes_fisco:
+            for obs in self.observacoes_fisco:
+                obs._escrever(escritor)
+
+        escritor.fechar()
+
 
 class ObsFiscoDet(Entidade):
     """
@@ -710,21 +1271,22 @@ class ObsFiscoDet(Entidade):
     :param str xTextoDet:
     """
 
-    def __init__(self, **kwargs):
-        super(ObsFiscoDet, self).__init__(schema={
-                'xCampoDet': {
-                        'type': 'string',
-                        'required': True,
-                        'minlength': 1,
-                        'maxlength': 20,
-                    },
-                'xTextoDet': {
-                        'type': 'string',
-                        'required': True,
-                        'minlength': 1,
-                        'maxlength': 60,
-                    },
-            }, **kwargs)
+    _schema = {
+            'xCampoDet': {
+                    'type': 'string',
+                    'required': True,
+                    'minlength': 1,
+                    'maxlength': 20,
+                },
+            'xTextoDet': {
+                    'type': 'string',
+                    'required': True,
+                    'minlength': 1,
+                    'maxlength': 60,
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         obs = ET.Element('obsFiscoDet')
@@ -732,6 +1294,11 @@ class ObsFiscoDet(Entidade):
         ET.SubElement(obs, 'xTextoDet').text = self.xTextoDet
         return obs
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('obsFiscoDet', [('xCampoDet', self.xCampoDet)])
+        escritor.elemento('xTextoDet', self.xTextoDet)
+        escritor.fechar()
+
 
 class ICMS00(Entidade):
     """
@@ -742,23 +1309,24 @@ class ICMS00(Entidade):
     :param Decimal pICMS:
     """
 
-    def __init__(self, **kwargs):
-        super(ICMS00, self).__init__(schema={
-                'Orig': {  # N06
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.N06_ORIG],
-                    },
-                'CST': {  # N07
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.N07_CST_ICMS00],
-                    },
-                'pICMS': {
-                        'type': 'decimal',
-                        'required': True,
-                    },
-            }, **kwargs)
+    _schema = {
+            'Orig': {  # N06
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.N06_ORIG],
+                },
+            'CST': {  # N07
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.N07_CST_ICMS00],
+                },
+            'pICMS': {
+                    'type': 'decimal',
+                    'required': True,
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         icms00 = ET.Element(self.__class__.__name__)
@@ -767,6 +1335,13 @@ class ICMS00(Entidade):
         ET.SubElement(icms00, 'pICMS').text = str(self.pICMS)
         return icms00
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir(self.__class__.__name__)
+        escritor.elemento('Orig', self.Orig)
+        escritor.elemento('CST', self.CST)
+        escritor.elemento('pICMS', str(self.pICMS))
+        escritor.fechar()
+
 
 class ICMS40(Entidade):
     """
@@ -776,19 +1351,20 @@ class ICMS40(Entidade):
     :param str CST:
     """
 
-    def __init__(self, **kwargs):
-        super(ICMS40, self).__init__(schema={
-                'Orig': {  # N06
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.N06_ORIG],
-                    },
-                'CST': {  # N07
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.N07_CST_ICMS40],
-                    },
-            }, **kwargs)
+    _schema = {
+            'Orig': {  # N06
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.N06_ORIG],
+                },
+            'CST': {  # N07
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.N07_CST_ICMS40],
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         icms40 = ET.Element('ICMS40')
@@ -796,6 +1372,12 @@ class ICMS40(Entidade):
         ET.SubElement(icms40, 'CST').text = self.CST
         return icms40
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('ICMS40')
+        escritor.elemento('Orig', self.Orig)
+        escritor.elemento('CST', self.CST)
+        escritor.fechar()
+
 
 class ICMSSN102(Entidade):
     """
@@ -806,21 +1388,22 @@ class ICMSSN102(Entidade):
     :param str CSOSN:
     """
 
-    def __init__(self, **kwargs):
-        super(ICMSSN102, self).__init__(schema={
-                'Orig': {  # N06
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.N06_ORIG],
-                    },
-                'CSOSN': {  # N10
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [
-                                v for v, s in constantes.N10_CSOSN_ICMSSN102
-                            ],
-                    },
-            }, **kwargs)
+    _schema = {
+            'Orig': {  # N06
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.N06_ORIG],
+                },
+            'CSOSN': {  # N10
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [
+                            v for v, s in constantes.N10_CSOSN_ICMSSN102
+                        ],
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         icmssn102 = ET.Element('ICMSSN102')
@@ -828,6 +1411,12 @@ class ICMSSN102(Entidade):
         ET.SubElement(icmssn102, 'CSOSN').text = self.CSOSN
         return icmssn102
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('ICMSSN102')
+        escritor.elemento('Orig', self.Orig)
+        escritor.elemento('CSOSN', self.CSOSN)
+        escritor.fechar()
+
 
 class ICMSSN900(Entidade):
     """
@@ -839,25 +1428,26 @@ class ICMSSN900(Entidade):
     :param Decimal pICMS:
     """
 
-    def __init__(self, **kwargs):
-        super(ICMSSN900, self).__init__(schema={
-                'Orig': {  # N06
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.N06_ORIG],
-                    },
-                'CSOSN': {  # N10
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [
-                                v for v, s in constantes.N10_CSOSN_ICMSSN900
-                            ],
-                    },
-                'pICMS': {
-                        'type': 'decimal',
-                        'required': True,
-                    },
-            }, **kwargs)
+    _schema = {
+            'Orig': {  # N06
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.N06_ORIG],
+                },
+            'CSOSN': {  # N10
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [
+                            v for v, s in constantes.N10_CSOSN_ICMSSN900
+                        ],
+                },
+            'pICMS': {
+                    'type': 'decimal',
+                    'required': True,
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         icmssn900 = ET.Element('ICMSSN900')
@@ -866,6 +1456,13 @@ class ICMSSN900(Entidade):
         ET.SubElement(icmssn900, 'pICMS').text = str(self.pICMS)
         return icmssn900
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('ICMSSN900')
+        escritor.elemento('Orig', self.Orig)
+        escritor.elemento('CSOSN', self.CSOSN)
+        escritor.elemento('pICMS', str(self.pICMS))
+        escritor.fechar()
+
 
 class PISAliq(Entidade):
     """
@@ -877,22 +1474,23 @@ class PISAliq(Entidade):
     :param Decimal pPIS:
     """
 
-    def __init__(self, **kwargs):
-        super(PISAliq, self).__init__(schema={
-                'CST': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.Q07_CST_PISALIQ],
-                    },
-                'vBC': {
-                        'type': 'decimal',
-                        'required': True,
-                    },
-                'pPIS': {
-                        'type': 'decimal',
-                        'required': True,
-                    },
-            }, **kwargs)
+    _schema = {
+            'CST': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.Q07_CST_PISALIQ],
+                },
+            'vBC': {
+                    'type': 'decimal',
+                    'required': True,
+                },
+            'pPIS': {
+                    'type': 'decimal',
+                    'required': True,
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         pisaliq = ET.Element('PISAliq')
@@ -901,6 +1499,13 @@ class PISAliq(Entidade):
         ET.SubElement(pisaliq, 'pPIS').text = str(self.pPIS)
         return pisaliq
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('PISAliq')
+        escritor.elemento('CST', self.CST)
+        escritor.elemento('vBC', str(self.vBC))
+        escritor.elemento('pPIS', str(self.pPIS))
+        escritor.fechar()
+
 
 class PISQtde(Entidade):
     """
@@ -912,22 +1517,23 @@ class PISQtde(Entidade):
     :param Decimal vAliqProd:
     """
 
-    def __init__(self, **kwargs):
-        super(PISQtde, self).__init__(schema={
-                'CST': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.Q07_CST_PISQTDE],
-                    },
-                'qBCProd': {
-                        'type': 'decimal',
-                        'required': True,
-                    },
-                'vAliqProd': {
-                        'type': 'decimal',
-                        'required': True,
-                    },
-            }, **kwargs)
+    _schema = {
+            'CST': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.Q07_CST_PISQTDE],
+                },
+            'qBCProd': {
+                    'type': 'decimal',
+                    'required': True,
+                },
+            'vAliqProd': {
+                    'type': 'decimal',
+                    'required': True,
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         pisqtde = ET.Element('PISQtde')
@@ -936,6 +1542,13 @@ class PISQtde(Entidade):
         ET.SubElement(pisqtde, 'vAliqProd').text = str(self.vAliqProd)
         return pisqtde
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('PISQtde')
+        escritor.elemento('CST', self.CST)
+        escritor.elemento('qBCProd', str(self.qBCProd))
+        escritor.elemento('vAliqProd', str(self.vAliqProd))
+        escritor.fechar()
+
 
 class PISNT(Entidade):
     """
@@ -945,20 +1558,26 @@ class PISNT(Entidade):
     :param str CST:
     """
 
-    def __init__(self, **kwargs):
-        super(PISNT, self).__init__(schema={
-                'CST': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.Q07_CST_PISNT],
-                    },
-            }, **kwargs)
+    _schema = {
+            'CST': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.Q07_CST_PISNT],
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         pisnt = ET.Element('PISNT')
         ET.SubElement(pisnt, 'CST').text = self.CST
         return pisnt
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('PISNT')
+        escritor.elemento('CST', self.CST)
+        escritor.fechar()
+
 
 class PISSN(Entidade):
     """
@@ -968,20 +1587,26 @@ class PISSN(Entidade):
     :param str CST:
     """
 
-    def __init__(self, **kwargs):
-        super(PISSN, self).__init__(schema={
-                'CST': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.Q07_CST_PISSN],
-                    },
-            }, **kwargs)
+    _schema = {
+            'CST': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.Q07_CST_PISSN],
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         pissn = ET.Element('PISSN')
         ET.SubElement(pissn, 'CST').text = self.CST
         return pissn
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('PISSN')
+        escritor.elemento('CST', self.CST)
+        escritor.fechar()
+
 
 class PISOutr(Entidade):
     """
@@ -1008,38 +1633,39 @@ class PISOutr(Entidade):
 
     """
 
-    def __init__(self, **kwargs):
-        super(PISOutr, self).__init__(schema={
-                'CST': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.Q07_CST_PISOUTR],
-                    },
-                'vBC': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'qBCProd',
-                        'dependencies': 'pPIS',
-                    },
-                'pPIS': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'vAliqProd',
-                        'dependencies': 'vBC',
-                    },
-                'qBCProd': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'vBC',
-                        'dependencies': 'vAliqProd',
-                    },
-                'vAliqProd': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'pPIS',
-                        'dependencies': 'qBCProd',
-                    },
-            }, **kwargs)
+    _schema = {
+            'CST': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.Q07_CST_PISOUTR],
+                },
+            'vBC': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'qBCProd',
+                    'dependencies': 'pPIS',
+                },
+            'pPIS': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'vAliqProd',
+                    'dependencies': 'vBC',
+                },
+            'qBCProd': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'vBC',
+                    'dependencies': 'vAliqProd',
+                },
+            'vAliqProd': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'pPIS',
+                    'dependencies': 'qBCProd',
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         pisoutr = ET.Element(self.__class__.__name__)
@@ -1055,6 +1681,20 @@ class PISOutr(Entidade):
 
         return pisoutr
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir(self.__class__.__name__)
+        escritor.elemento('CST', self.CST)
+
+        if hasattr(self, 'vBC'):
+            escritor.elemento('vBC', str(self.vBC))
+            escritor.elemento('pPIS', str(self.pPIS))
+
+        elif hasattr(self, 'qBCProd'):
+            escritor.elemento('qBCProd', str(self.qBCProd))
+            escritor.elemento('vAliqProd', str(self.vAliqProd))
+
+        escritor.fechar()
+
 
 class PISST(Entidade):
     """
@@ -1079,33 +1719,34 @@ class PISST(Entidade):
 
     """
 
-    def __init__(self, **kwargs):
-        super(PISST, self).__init__(schema={
-                'vBC': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'qBCProd',
-                        'dependencies': 'pPIS',
-                    },
-                'pPIS': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'vAliqProd',
-                        'dependencies': 'vBC',
-                    },
-                'qBCProd': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'vBC',
-                        'dependencies': 'vAliqProd',
-                    },
-                'vAliqProd': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'pPIS',
-                        'dependencies': 'qBCProd',
-                    },
-            }, **kwargs)
+    _schema = {
+            'vBC': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'qBCProd',
+                    'dependencies': 'pPIS',
+                },
+            'pPIS': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'vAliqProd',
+                    'dependencies': 'vBC',
+                },
+            'qBCProd': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'vBC',
+                    'dependencies': 'vAliqProd',
+                },
+            'vAliqProd': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'pPIS',
+                    'dependencies': 'qBCProd',
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         pisst = ET.Element(self.__class__.__name__)
@@ -1120,6 +1761,19 @@ class PISST(Entidade):
 
         return pisst
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir(self.__class__.__name__)
+
+        if hasattr(self, 'vBC'):
+            escritor.elemento('vBC', str(self.vBC))
+            escritor.elemento('pPIS', str(self.pPIS))
+
+        elif hasattr(self, 'qBCProd'):
+            escritor.elemento('qBCProd', str(self.qBCProd))
+            escritor.elemento('vAliqProd', str(self.vAliqProd))
+
+        escritor.fechar()
+
 
 class COFINSAliq(Entidade):
     """
@@ -1131,24 +1785,25 @@ class COFINSAliq(Entidade):
     :param Decimal pCOFINS:
     """
 
-    def __init__(self, **kwargs):
-        super(COFINSAliq, self).__init__(schema={
-                'CST': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [
-                                v for v, s in constantes.S07_CST_COFINSALIQ
-                            ],
-                    },
-                'vBC': {
-                        'type': 'decimal',
-                        'required': True,
-                    },
-                'pCOFINS': {
-                        'type': 'decimal',
-                        'required': True,
-                    },
-            }, **kwargs)
+    _schema = {
+            'CST': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [
+                            v for v, s in constantes.S07_CST_COFINSALIQ
+                        ],
+                },
+            'vBC': {
+                    'type': 'decimal',
+                    'required': True,
+                },
+            'pCOFINS': {
+                    'type': 'decimal',
+                    'required': True,
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         cofinsaliq = ET.Element(self.__class__.__name__)
@@ -1157,6 +1812,13 @@ class COFINSAliq(Entidade):
         ET.SubElement(cofinsaliq, 'pCOFINS').text = str(self.pCOFINS)
         return cofinsaliq
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir(self.__class__.__name__)
+        escritor.elemento('CST', self.CST)
+        escritor.elemento('vBC', str(self.vBC))
+        escritor.elemento('pCOFINS', str(self.pCOFINS))
+        escritor.fechar()
+
 
 class COFINSQtde(Entidade):
     """
@@ -1168,24 +1830,25 @@ class COFINSQtde(Entidade):
     :param Decimal vAliqProd:
     """
 
-    def __init__(self, **kwargs):
-        super(COFINSQtde, self).__init__(schema={
-                'CST': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [
-                                v for v, s in constantes.S07_CST_COFINSQTDE
-                            ],
-                    },
-                'qBCProd': {
-                        'type': 'decimal',
-                        'required': True,
-                    },
-                'vAliqProd': {
-                        'type': 'decimal',
-                        'required': True,
-                    },
-            }, **kwargs)
+    _schema = {
+            'CST': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [
+                            v for v, s in constantes.S07_CST_COFINSQTDE
+                        ],
+                },
+            'qBCProd': {
+                    'type': 'decimal',
+                    'required': True,
+                },
+            'vAliqProd': {
+                    'type': 'decimal',
+                    'required': True,
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         cofinsqtde = ET.Element(self.__class__.__name__)
@@ -1194,6 +1857,13 @@ class COFINSQtde(Entidade):
         ET.SubElement(cofinsqtde, 'vAliqProd').text = str(self.vAliqProd)
         return cofinsqtde
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir(self.__class__.__name__)
+        escritor.elemento('CST', self.CST)
+        escritor.elemento('qBCProd', str(self.qBCProd))
+        escritor.elemento('vAliqProd', str(self.vAliqProd))
+        escritor.fechar()
+
 
 class COFINSNT(Entidade):
     """
@@ -1203,20 +1873,26 @@ class COFINSNT(Entidade):
     :param str CST:
     """
 
-    def __init__(self, **kwargs):
-        super(COFINSNT, self).__init__(schema={
-                'CST': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.S07_CST_COFINSNT],
-                    },
-            }, **kwargs)
+    _schema = {
+            'CST': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.S07_CST_COFINSNT],
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         cofinsnt = ET.Element(self.__class__.__name__)
         ET.SubElement(cofinsnt, 'CST').text = self.CST
         return cofinsnt
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir(self.__class__.__name__)
+        escritor.elemento('CST', self.CST)
+        escritor.fechar()
+
 
 class COFINSSN(Entidade):
     """
@@ -1226,20 +1902,26 @@ class COFINSSN(Entidade):
     :param str CST:
     """
 
-    def __init__(self, **kwargs):
-        super(COFINSSN, self).__init__(schema={
-                'CST': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.S07_CST_COFINSSN],
-                    },
-            }, **kwargs)
+    _schema = {
+            'CST': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.S07_CST_COFINSSN],
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         cofinssn = ET.Element(self.__class__.__name__)
         ET.SubElement(cofinssn, 'CST').text = self.CST
         return cofinssn
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir(self.__class__.__name__)
+        escritor.elemento('CST', self.CST)
+        escritor.fechar()
+
 
 class COFINSOutr(Entidade):
     """
@@ -1267,40 +1949,41 @@ class COFINSOutr(Entidade):
 
     """
 
-    def __init__(self, **kwargs):
-        super(COFINSOutr, self).__init__(schema={
-                'CST': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [
-                                v for v, s in constantes.S07_CST_COFINSOUTR
-                            ],
-                    },
-                'vBC': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'qBCProd',
-                        'dependencies': 'pCOFINS',
-                    },
-                'pCOFINS': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'vAliqProd',
-                        'dependencies': 'vBC',
-                    },
-                'qBCProd': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'vBC',
-                        'dependencies': 'vAliqProd',
-                    },
-                'vAliqProd': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'pCOFINS',
-                        'dependencies': 'qBCProd',
-                    },
-            }, **kwargs)
+    _schema = {
+            'CST': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [
+                            v for v, s in constantes.S07_CST_COFINSOUTR
+                        ],
+                },
+            'vBC': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'qBCProd',
+                    'dependencies': 'pCOFINS',
+                },
+            'pCOFINS': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'vAliqProd',
+                    'dependencies': 'vBC',
+                },
+            'qBCProd': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'vBC',
+                    'dependencies': 'vAliqProd',
+                },
+            'vAliqProd': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'pCOFINS',
+                    'dependencies': 'qBCProd',
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         cofinsoutr = ET.Element(self.__class__.__name__)
@@ -1316,6 +1999,20 @@ class COFINSOutr(Entidade):
 
         return cofinsoutr
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir(self.__class__.__name__)
+        escritor.elemento('CST', self.CST)
+
+        if hasattr(self, 'vBC'):
+            escritor.elemento('vBC', str(self.vBC))
+            escritor.elemento('pCOFINS', str(self.pCOFINS))
+
+        elif hasattr(self, 'qBCProd'):
+            escritor.elemento('qBCProd', str(self.qBCProd))
+            escritor.elemento('vAliqProd', str(self.vAliqProd))
+
+        escritor.fechar()
+
 
 class COFINSST(Entidade):
     """
@@ -1340,33 +2037,34 @@ class COFINSST(Entidade):
 
     """
 
-    def __init__(self, **kwargs):
-        super(COFINSST, self).__init__(schema={
-                'vBC': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'qBCProd',
-                        'dependencies': 'pCOFINS',
-                    },
-                'pCOFINS': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'vAliqProd',
-                        'dependencies': 'vBC',
-                    },
-                'qBCProd': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'vBC',
-                        'dependencies': 'vAliqProd',
-                    },
-                'vAliqProd': {
-                        'type': 'decimal',
-                        'required': True,
-                        'excludes': 'pCOFINS',
-                        'dependencies': 'qBCProd',
-                    },
-            }, **kwargs)
+    _schema = {
+            'vBC': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'qBCProd',
+                    'dependencies': 'pCOFINS',
+                },
+            'pCOFINS': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'vAliqProd',
+                    'dependencies': 'vBC',
+                },
+            'qBCProd': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'vBC',
+                    'dependencies': 'vAliqProd',
+                },
+            'vAliqProd': {
+                    'type': 'decimal',
+                    'required': True,
+                    'excludes': 'pCOFINS',
+                    'dependencies': 'qBCProd',
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         pisst = ET.Element(self.__class__.__name__)
@@ -1381,6 +2079,19 @@ class COFINSST(Entidade):
 
         return pisst
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir(self.__class__.__name__)
+
+        if hasattr(self, 'vBC'):
+            escritor.elemento('vBC', str(self.vBC))
+            escritor.elemento('pCOFINS', str(self.pCOFINS))
+
+        elif hasattr(self, 'qBCProd'):
+            escritor.elemento('qBCProd', str(self.qBCProd))
+            escritor.elemento('vAliqProd', str(self.vAliqProd))
+
+        escritor.fechar()
+
 
 class ISSQN(Entidade):
     """
@@ -1395,47 +2106,48 @@ class ISSQN(Entidade):
     :param str indIncFisc:
     """
 
-    def __init__(self, **kwargs):
-        super(ISSQN, self).__init__(schema={
-                'vDeducISSQN': {
-                        'type': 'decimal',
-                        'required': True,
-                    },
-                'vAliq': {
-                        'type': 'decimal',
-                        'required': True,
-                    },
-                'cMunFG': {
-                        'type': 'string',
-                        'required': False,
-                        'regex': r'^\d{7}$',
-                    },
-                'cListServ': {
-                        'type': 'string',
-                        'required': False,
-                        'regex': r'^\d{2}\.\d{2}$',
-                    },
-                'cServTribMun': {
-                        'type': 'string',
-                        'required': False,
-                        'minlength': 20,
-                        'maxlength': 20,
-                    },
-                'cNatOp': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [
-                                v for v, s in constantes.U09_CNATOP_ISSQN
-                            ],
-                    },
-                'indIncFisc': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [
-                                v for v, s in constantes.U10_INDINCFISC_ISSQN
-                            ],
-                    },
-            }, **kwargs)
+    _schema = {
+            'vDeducISSQN': {
+                    'type': 'decimal',
+                    'required': True,
+                },
+            'vAliq': {
+                    'type': 'decimal',
+                    'required': True,
+                },
+            'cMunFG': {
+                    'type': 'string',
+                    'required': False,
+                    'regex': r'^\d{7}$',
+                },
+            'cListServ': {
+                    'type': 'string',
+                    'required': False,
+                    'regex': r'^\d{2}\.\d{2}$',
+                },
+            'cServTribMun': {
+                    'type': 'string',
+                    'required': False,
+                    'minlength': 20,
+                    'maxlength': 20,
+                },
+            'cNatOp': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [
+                            v for v, s in constantes.U09_CNATOP_ISSQN
+                        ],
+                },
+            'indIncFisc': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [
+                            v for v, s in constantes.U10_INDINCFISC_ISSQN
+                        ],
+                },
+        }
+
+    __slots__ = tuple(_schema)
 
     def _construir_elemento_xml(self, *args, **kwargs):
         issqn = ET.Element(self.__class__.__name__)
@@ -1457,6 +2169,55 @@ class ISSQN(Entidade):
 
         return issqn
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir(self.__class__.__name__)
+
+        escritor.elemento('vDeducISSQN', str(self.vDeducISSQN))
+        escritor.elemento('vAliq', str(self.vAliq))
+
+        if hasattr(self, 'cMunFG'):
+            escritor.elemento('cMunFG', self.cMunFG)
+
+        if hasattr(self, 'cListServ'):
+            escritor.elemento('cListServ', self.cListServ)
+
+        if hasattr(self, 'cServTribMun'):
+            escritor.elemento('cServTribMun', self.cServTribMun)
+
+        escritor.elemento('cNatOp', self.cNatOp)
+        escritor.elemento('indIncFisc', self.indIncFisc)
+
+        escritor.fechar()
+
+
+# grupos de tributos do item, pelo nome do elemento XML, e o respectivo
+# argumento de Imposto
+_GRUPOS_IMPOSTO = {
+        'ICMS00': ('icms', ICMS00),
+        'ICMS40': ('icms', ICMS40),
+        'ICMSSN102': ('icms', ICMSSN102),
+        'ICMSSN900': ('icms', ICMSSN900),
+        'PISAliq': ('pis', PISAliq),
+        'PISQtde': ('pis', PISQtde),
+        'PISNT': ('pis', PISNT),
+        'PISSN': ('pis', PISSN),
+        'PISOutr': ('pis', PISOutr),
+        'PISST': ('pisst', PISST),
+        'COFINSAliq': ('cofins', COFINSAliq),
+        'COFINSQtde': ('cofins', COFINSQtde),
+        'COFINSNT': ('cofins', COFINSNT),
+        'COFINSSN': ('cofins', COFINSSN),
+        'COFINSOutr': ('cofins', COFINSOutr),
+        'COFINSST': ('cofinsst', COFINSST),
+        'ISSQN': ('issqn', ISSQN),
+    }
+
+
+def _de_elemento(classe, elemento):
+    if elemento is None:
+        return None
+    return classe._de_elemento(elemento)
+
 
 class Imposto(Entidade):
     """
@@ -1488,6 +2249,22 @@ class Imposto(Entidade):
 
     """
 
+    _schema = {
+            'vItem12741': {  # M02
+                    'type': 'decimal',
+                    'required': False,
+                }
+        }
+
+    __slots__ = tuple(_schema) + (
+            '_icms',
+            '_pis',
+            '_pisst',
+            '_cofins',
+            '_cofinsst',
+            '_issqn',
+        )
+
     def __init__(
             self,
             icms=None,
@@ -1503,12 +2280,22 @@ class Imposto(Entidade):
         self._cofins = cofins
         self._cofinsst = cofinsst
         self._issqn = issqn
-        super(Imposto, self).__init__(schema={
-                'vItem12741': {  # M02
-                        'type': 'decimal',
-                        'required': False,
-                    }
-            }, **kwargs)
+        super(Imposto, self).__init__(**kwargs)
+        self._acompanhar(icms, pis, pisst, cofins, cofinsst, issqn)
+
+    @classmethod
+    def _de_elemento(cls, elemento):
+        grupos = {}
+        for filho in elemento:
+            if filho.tag in ('ICMS', 'PIS', 'COFINS'):
+                if len(filho) == 0:
+                    continue
+                filho = filho[0]
+            if filho.tag in _GRUPOS_IMPOSTO:
+                argumento, classe = _GRUPOS_IMPOSTO[filho.tag]
+                grupos[argumento] = classe._de_elemento(filho)
+        grupos.update(cls._dados_elemento(elemento))
+        return cls(**grupos)
 
     @property
     def icms(self):
@@ -1559,7 +2346,7 @@ class Imposto(Entidade):
         """
         return self._issqn
 
-    def _construir_elemento_xml(self, *args, **kwargs):
+    def _verificar_grupos(self):
         if self.pis is None:
             raise cerberus.DocumentError((
                     '{:s} (grupo M01) atributo "pis" não pode ser None.'
@@ -1570,6 +2357,9 @@ class Imposto(Entidade):
                     '{:s} (grupo M01) atributo "cofins" não pode ser None.'
                 ).format(self.__class__.__name__))
 
+    def _construir_elemento_xml(self, *args, **kwargs):
+        self._verificar_grupos()
+
         imposto = ET.Element('imposto')
 
         if hasattr(self, 'vItem12741'):
@@ -1596,6 +2386,38 @@ class Imposto(Entidade):
 
         return imposto
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        self._verificar_grupos()
+
+        escritor.abrir('imposto')
+
+        if hasattr(self, 'vItem12741'):
+            escritor.elemento('vItem12741', str(self.vItem12741))
+
+        if self.icms is not None:
+            escritor.abrir('ICMS')
+            self.icms._escrever(escritor)
+            escritor.fechar()
+
+        escritor.abrir('PIS')
+        self.pis._escrever(escritor)
+        escritor.fechar()
+
+        if self.pisst is not None:
+            self.pisst._escrever(escritor)
+
+        escritor.abrir('COFINS')
+        self.cofins._escrever(escritor)
+        escritor.fechar()
+
+        if self.cofinsst is not None:
+            self.cofinsst._escrever(escritor)
+
+        if self.issqn is not None:
+            self.issqn._escrever(escritor)
+
+        escritor.fechar()
+
 
 class DescAcrEntr(Entidade):
     """
@@ -1612,19 +2434,18 @@ class DescAcrEntr(Entidade):
 
     """
 
-    def __init__(self, **kwargs):
-        super(DescAcrEntr, self).__init__(schema={
-                'vDescSubtot': {
-                        'type': 'decimal',
-                        'excludes': 'vAcresSubtot',
-                        'required': False,
-                    },
-                'vAcresSubtot': {
-                        'type': 'decimal',
-                        'excludes': 'vDescSubtot',
-                        'required': False,
-                    },
-            }, **kwargs)
+    _schema = {
+            'vDescSubtot': {
+                    'type': 'decimal',
+                    'excludes': 'vAcresSubtot',
+                    'required': False,
+                },
+            'vAcresSubtot': {
+                    'type': 'decimal',
+                    'excludes': 'vDescSubtot',
+                    'required': False,
+                },
+        }
 
     def _construir_elemento_xml(self, *args, **kwargs):
         grupo = ET.Element(self.__class__.__name__)
@@ -1637,6 +2458,17 @@ class DescAcrEntr(Entidade):
 
         return grupo
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir(self.__class__.__name__)
+
+        if hasattr(self, 'vDescSubtot'):
+            escritor.elemento('vDescSubtot', str(self.vDescSubtot))
+
+        if hasattr(self, 'vAcresSubtot'):
+            escritor.elemento('vAcresSubtot', str(self.vAcresSubtot))
+
+        escritor.fechar()
+
 
 class MeioPagamento(Entidade):
     """Meio de pagamento (``MP``, grupo ``WA02``).
@@ -1646,27 +2478,26 @@ class MeioPagamento(Entidade):
     :param str cAdmC: Opcional.
     """
 
-    def __init__(self, **kwargs):
-        super(MeioPagamento, self).__init__(schema={
-                'cMP': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in constantes.WA03_CMP_MP],
-                    },
-                'vMP': {
-                        'type': 'decimal',
-                        'required': True,
-                    },
-                'cAdmC': {
-                        'type': 'string',
-                        'required': False,
-                        'allowed': [
-                                codigo
-                                for codigo, cnpj, nome
-                                in constantes.CREDENCIADORAS_CARTAO
-                            ],
-                    },
-            }, **kwargs)
+    _schema = {
+            'cMP': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in constantes.WA03_CMP_MP],
+                },
+            'vMP': {
+                    'type': 'decimal',
+                    'required': True,
+                },
+            'cAdmC': {
+                    'type': 'string',
+                    'required': False,
+                    'allowed': [
+                            codigo
+                            for codigo, cnpj, nome
+                            in constantes.CREDENCIADORAS_CARTAO
+                        ],
+                },
+        }
 
     def _construir_elemento_xml(self, *args, **kwargs):
         mp = ET.Element('MP')
@@ -1676,6 +2507,14 @@ class MeioPagamento(Entidade):
             ET.SubElement(mp, 'cAdmC').text = self.cAdmC
         return mp
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('MP')
+        escritor.elemento('cMP', self.cMP)
+        escritor.elemento('vMP', str(self.vMP))
+        if hasattr(self, 'cAdmC'):
+            escritor.elemento('cAdmC', self.cAdmC)
+        escritor.fechar()
+
 
 class InformacoesAdicionais(Entidade):
     """
@@ -1684,15 +2523,14 @@ class InformacoesAdicionais(Entidade):
     :param str infCpl: Opcional.
     """
 
-    def __init__(self, **kwargs):
-        super(InformacoesAdicionais, self).__init__(schema={
-                'infCpl': {
-                        'type': 'string',
-                        'required': False,
-                        'minlength': 1,
-                        'maxlength': 5000,
-                    },
-            }, **kwargs)
+    _schema = {
+            'infCpl': {
+                    'type': 'string',
+                    'required': False,
+                    'minlength': 1,
+                    'maxlength': 5000,
+                },
+        }
 
     def _construir_elemento_xml(self, *args, **kwargs):
         grupo = ET.Element('infAdic')
@@ -1700,6 +2538,403 @@ class InformacoesAdicionais(Entidade):
             ET.SubElement(grupo, 'infCpl').text = self.infCpl
         return grupo
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('infAdic')
+        if hasattr(self, 'infCpl'):
+            escritor.elemento('infCpl', self.infCpl)
+        escritor.fechar()
+
+
+class LoteDetalhamentos(object):
+    """
+    Os itens de um CF-e de venda em formato colunar, como alternativa a
+    uma lista de objetos :class:`Detalhamento` (veja o argumento
+    ``detalhamentos`` de :class:`CFeVenda`). Útil quando os itens vêm, por
+    exemplo, de um cursor de banco de dados, evitando a construção e a
+    validação de um :class:`ProdutoServico`, um :class:`Imposto` e um
+    :class:`Detalhamento` para cada item.
+
+    Os argumentos nomeados são as colunas, uma sequência de valores para
+    cada um dos atributos de :class:`ProdutoServico` e de
+    :class:`Detalhamento` (``infAdProd``), todas com o mesmo número de
+    itens. Um valor ``None`` indica que o atributo não foi informado para
+    aquele item.
+
+    :param imposto: Uma instância de :class:`Imposto`, comum a todos os
+        itens, ou uma sequência de instâncias, uma para cada item.
+
+    :param observacoes_fisco: Opcional. Uma sequência contendo, para cada
+        item, uma lista de objetos :class:`ObsFiscoDet` ou ``None``.
+
+    Cada coluna é validada uma única vez, contra as regras do respectivo
+    atributo, e cada valor distinto de uma coluna é validado apenas uma vez.
+    Os elementos ``det`` são escritos diretamente como texto (veja o
+    argumento ``direto`` em :meth:`Entidade.documento`); iterar sobre o lote
+    resulta em objetos :class:`Detalhamento` equivalentes.
+
+    .. sourcecode:: python
+
+        lote = LoteDetalhamentos.de_linhas(
+                ('cProd', 'xProd', 'CFOP', 'uCom', 'qCom', 'vUnCom',
+                        'indRegra'),
+                cursor.fetchall(),
+                imposto=Imposto(
+                        icms=ICMSSN102(Orig='0', CSOSN='500'),
+                        pis=PISSN(CST='49'),
+                        cofins=COFINSSN(CST='49')))
+
+        cfe = CFeVenda(..., detalhamentos=lote)
+
+    """
+
+    _CAMPOS_PRODUTO = (
+            'cProd',
+            'cEAN',
+            'xProd',
+            'NCM',
+            'CFOP',
+            'uCom',
+            'qCom',
+            'vUnCom',
+            'indRegra',
+            'vDesc',
+            'vOutro',
+        )
+
+    def __init__(self, imposto=None, observacoes_fisco=None, **colunas):
+        quantidade = None
+        self._colunas = {}
+        for campo, valores in colunas.items():
+            if campo not in ProdutoServico._schema \
+                    and campo not in Detalhamento._schema:
+                raise AttributeError((
+                        '{!r} object has no attribute {!r}'
+                    ).format(self.__class__.__name__, campo))
+            valores = tuple(valores)
+            if quantidade is None:
+                quantidade = len(valores)
+            elif len(valores) != quantidade:
+                raise ValueError((
+                        'Coluna {!r} possui {:d} itens (esperados {:d})'
+                    ).format(campo, len(valores), quantidade))
+            self._colunas[campo] = valores
+
+        self._quantidade = quantidade or 0
+
+        if imposto is None:
+            raise ValueError('Imposto dos itens nao informado')
+        elif isinstance(imposto, Imposto):
+            imposto = (imposto,) * self._quantidade
+        self._impostos = tuple(imposto)
+        self._observacoes_fisco = tuple(
+                observacoes_fisco or (None,) * self._quantidade)
+
+        for nome, valores in (
+                ('imposto', self._impostos),
+                ('observacoes_fisco', self._observacoes_fisco)):
+            if len(valores) != self._quantidade:
+                raise ValueError((
+                        'Coluna {!r} possui {:d} itens (esperados {:d})'
+                    ).format(nome, len(valores), self._quantidade))
+
+        self._errors = {}
+        self._produtos = None  # conteúdo validado e serializado dos itens
+
+    @classmethod
+    def de_linhas(cls, campos, linhas, **kwargs):
+        """Constrói o lote a partir de linhas (tuplas de valores), tal como
+        resultam de um cursor de banco de dados.
+
+        :param campos: Sequência com os nomes dos atributos, na mesma ordem
+            dos valores das linhas. Pode incluir ``imposto`` e
+            ``observacoes_fisco``.
+
+        :param linhas: Iterável de tuplas de valores.
+
+        Os demais argumentos nomeados são repassados ao construtor.
+        """
+        campos = tuple(campos)
+        colunas = list(zip(*linhas)) or [()] * len(campos)
+        kwargs.update(zip(campos, colunas))
+        return cls(**kwargs)
+
+    def __len__(self):
+        return self._quantidade
+
+    def __iter__(self):
+        produto_campos = [
+                (campo, valores) for campo, valores in self._colunas.items()
+                if campo in ProdutoServico._schema]
+        detalhe_campos = [
+                (campo, valores) for campo, valores in self._colunas.items()
+                if campo in Detalhamento._schema]
+        for n in range(self._quantidade):
+            produto = ProdutoServico(
+                    observacoes_fisco=self._observacoes_fisco[n],
+                    **{c: v[n] for c, v in produto_campos
+                            if v[n] is not None})
+            yield Detalhamento(
+                    produto=produto,
+                    imposto=self._impostos[n],
+                    **{c: v[n] for c, v in detalhe_campos
+                            if v[n] is not None})
+
+    def coluna(self, campo):
+        """Os valores do atributo ``campo`` para todos os itens, como uma
+        tupla. Itens sem o atributo resultam em ``None``.
+        """
+        if campo not in ProdutoServico._schema \
+                and campo not in Detalhamento._schema:
+            raise AttributeError((
+                    '{!r} object has no attribute {!r}'
+                ).format(self.__class__.__name__, campo))
+        return self._colunas.get(campo, (None,) * self._quantidade)
+
+    @property
+    def erros(self):
+        """Os erros da última validação, por número do item (``nItem``)."""
+        return copy.deepcopy(self._errors)
+
+    def validar(self):
+        if self._produtos is not None:
+            return  # colunas já validadas
+
+        erros = {}
+        for classe in (ProdutoServico, Detalhamento):
+            for campo in classe._schema:
+                self._validar_coluna(classe, campo, erros)
+
+        self._errors = erros
+        if erros:
+            raise cerberus.DocumentError((
+                    'Lote de detalhamentos possui {:d} itens invalidos'
+                ).format(len(erros)))
+
+        self._produtos = self._serializar_produtos()
+
+    def _validar_coluna(self, classe, campo, erros):
+        validador, trava = self._validador(classe, campo)
+        valores = self._colunas.get(campo, (None,) * self._quantidade)
+
+        def _falhas(valor):
+            documento = {} if valor is None else {campo: valor}
+            if validador.validate(documento):
+                return None
+            return validador.errors
+
+        memo = {}
+        with trava:
+            for n, valor in enumerate(valores, 1):
+                try:
+                    chave = (type(valor), valor)
+                    if chave in memo:
+                        falhas = memo[chave]
+                    else:
+                        falhas = memo[chave] = _falhas(valor)
+                except TypeError:
+                    falhas = _falhas(valor)  # valor não "hashable"
+                if falhas:
+                    erros.setdefault(n, {}).update(falhas)
+
+    @staticmethod
+    def _validador(classe, campo):
+        return Entidade._validador_compartilhado(
+                (classe, campo, classe._validacao),
+                lambda: _construir_validador(
+                        {campo: classe._schema[campo]},
+                        classe._validator_class,
+                        classe._validacao))
+
+    def _serializar_produtos(self):
+        # elementos do produto (exceto as observações do fisco) e o elemento
+        # "infAdProd" de cada item, sem transliteração
+        colunas = [
+                (campo, self._colunas[campo])
+                for campo in self._CAMPOS_PRODUTO if campo in self._colunas]
+        informacoes = self._colunas.get('infAdProd')
+        produtos = []
+        for n in range(self._quantidade):
+            partes = []
+            for campo, valores in colunas:
+                valor = valores[n]
+                if valor is not None:
+                    partes.append(_serializar_elemento(campo, valor))
+            produto = ''.join(partes)
+            if informacoes is not None and informacoes[n] is not None:
+                informacao = _serializar_elemento('infAdProd', informacoes[n])
+            else:
+                informacao = ''
+            produtos.append((produto, informacao))
+        return produtos
+
+    def _escrever_xml(self, escritor, *args, **kwargs):
+        self.validar()
+        impostos = {}
+        partes = []
+        for n, (produto, informacao) in enumerate(self._produtos):
+            imposto = self._impostos[n]
+            conteudo_imposto = impostos.get(id(imposto))
+            if conteudo_imposto is None:
+                conteudo_imposto = _serializar(imposto)
+                impostos[id(imposto)] = conteudo_imposto
+
+            observacoes = self._observacoes_fisco[n]
+            if observacoes:
+                produto += ''.join(_serializar(obs) for obs in observacoes)
+
+            partes.append(
+                    '<det nItem="' + str(n + 1) + '"><prod>' + produto
+                    + '</prod>' + conteudo_imposto + informacao + '</det>')
+
+        escritor.fragmento(''.join(partes))
+
+
+def _serializar(entidade):
+    # valida e serializa a entidade, sem transliteração
+    escritor = EscritorXML(transliterar=False)
+    entidade._escrever(escritor)
+    return escritor.texto()
+
+
+def _serializar_elemento(tag, valor):
+    # o mesmo resultado de EscritorXML.elemento, sem transliteração
+    if not isinstance(valor, six.string_types):
+        valor = str(valor)
+    if valor:
+        return '<' + tag + '>' + _escapar_texto(valor) + '</' + tag + '>'
+    return '<' + tag + ' />'
+
+
+class PerfilTerminal(Entidade):
+    """
+    Os dados do aplicativo comercial e do emitente, que são os mesmos em
+    todos os CF-e de um mesmo caixa (os grupos ``ide`` e ``emit``). O perfil
+    valida e serializa esses grupos uma única vez e é compartilhado por
+    todos os CF-e de venda e de cancelamento construídos a partir dele (veja
+    o argumento ``perfil`` de :class:`CFeVenda` e de
+    :class:`CFeCancelamento`).
+
+    :param str CNPJ: CNPJ da software house, desenvolvedora do aplicativo
+        comercial (14 dígitos).
+
+    :param str signAC: Assinatura do aplicativo comercial (344 dígitos).
+
+    :param int numeroCaixa: Número do caixa ao qual o SAT está conectado.
+
+    :param Emitente emitente: Identificação do emitente dos CF-e de venda.
+
+    Os grupos são serializados novamente somente se algum atributo do
+    perfil ou do emitente for alterado. Um CF-e cujos atributos ``CNPJ``,
+    ``signAC`` ou ``numeroCaixa`` tenham sido alterados, deixando de
+    coincidir com os do perfil, é validado e serializado normalmente.
+
+    .. sourcecode:: python
+
+        perfil = PerfilTerminal(
+                CNPJ='08427847000169',
+                signAC=constantes.ASSINATURA_AC_TESTE,
+                numeroCaixa=1,
+                emitente=Emitente(
+                        CNPJ='61099008000141',
+                        IE='111111111111',
+                        indRatISSQN='N'))
+
+        cfe = CFeVenda(perfil=perfil, detalhamentos=[...], pagamentos=[...])
+
+    """
+
+    _schema = {
+            'CNPJ': {
+                    'type': 'string',
+                    'check_with': 'cnpj',
+                    'required': True,
+                },
+            'signAC': {
+                    'type': 'string',
+                    'check_with': 'assinatura_ac',
+                    'required': True,
+                },
+            'numeroCaixa': {
+                    'type': 'integer',
+                    'required': True,
+                    'min': 0,
+                    'max': 999,
+                },
+        }
+
+    def __init__(self, emitente=None, **kwargs):
+        self._emitente = emitente
+        self._ide_xml = None
+        self._emit_xml = None
+        super(PerfilTerminal, self).__init__(**kwargs)
+        self._acompanhar(emitente)
+
+    @property
+    def emitente(self):
+        """O :class:`Emitente` dos CF-e de venda."""
+        return self._emitente
+
+    def _alterado(self):
+        self._ide_xml = None
+        self._emit_xml = None
+        super(PerfilTerminal, self)._alterado()
+
+    def _atende(self, documento):
+        # se o documento (ainda) tem os mesmos dados do perfil
+        for campo in self._schema:
+            if getattr(documento, campo, None) != getattr(self, campo, None):
+                return False
+        return True
+
+    def _dados_documento(self, documento, dados):
+        # os dados do documento a validar, exceto os já validados pelo perfil
+        if self._atende(documento):
+            for campo in self._schema:
+                dados.pop(campo, None)
+        return dados
+
+    def _validador_documento(self, documento):
+        # validador do documento para os atributos que não são do perfil
+        classe = documento.__class__
+
+        def _construir():
+            return _construir_validador(
+                    {
+                            campo: regras
+                            for campo, regras in classe._schema.items()
+                            if campo not in self._schema
+                        },
+                    classe._validator_class,
+                    classe._validacao)
+
+        return Entidade._validador_compartilhado(
+                (classe, PerfilTerminal, classe._validacao),
+                _construir)
+
+    def _ide(self):
+        # o grupo "ide", validado e sem transliteração
+        ide = self._ide_xml
+        if ide is None:
+            self.validar()
+            escritor = EscritorXML(transliterar=False)
+            escritor.abrir('ide')
+            escritor.elemento('CNPJ', self.CNPJ)
+            escritor.elemento('signAC', self.signAC)
+            escritor.elemento('numeroCaixa', '{:03d}'.format(
+                    self.numeroCaixa))
+            escritor.fechar()
+            ide = escritor.texto()
+            self._ide_xml = ide
+        return ide
+
+    def _emit(self):
+        # o grupo "emit", validado e sem transliteração
+        emit = self._emit_xml
+        if emit is None:
+            emit = _serializar(self.emitente)
+            self._emit_xml = emit
+        return emit
+
 
 class CFeVenda(Entidade):
     """
@@ -1713,7 +2948,8 @@ class CFeVenda(Entidade):
     :param LocalEntrega entrega: Opcional. Informações do local de entrega.
 
     :param list detalhamentos: Uma lista de objetos :class:`ProdutoServico` que
-        representam os produtos/serviços participantes do CF-e de venda.
+        representam os produtos/serviços participantes do CF-e de venda ou
+        um :class:`LoteDetalhamentos`.
 
     :param DescAcrEntr descontos_acrescimos_subtotal: Opcional. Se informado,
         deverá ser um objeto :class:`DescAcrEntr` que contenha o valor de
@@ -1744,6 +2980,11 @@ class CFeVenda(Entidade):
         soma total dos valores aproximados dos tributos, em cumprimento à Lei
         nº 12.741/2012.
 
+    :param PerfilTerminal perfil: Opcional. Se informado, os atributos
+        ``CNPJ``, ``signAC``, ``numeroCaixa`` e o emitente, quando não
+        informados, são os do perfil, cujos grupos ``ide`` e ``emit`` já
+        validados e serializados são reaproveitados.
+
     ..note::
 
         Não há uma classe específica para representar o elemento ``ide``
@@ -1752,6 +2993,34 @@ class CFeVenda(Entidade):
 
     """
 
+    _schema = {
+            'versaoDadosEnt': {
+                    'type': 'string',
+                    'required': True,
+                    'regex': r'^\d{1}\.\d{2}$',
+                },
+            'CNPJ': {
+                    'type': 'string',
+                    'check_with': 'cnpj',
+                    'required': True,
+                },
+            'signAC': {
+                    'type': 'string',
+                    'check_with': 'assinatura_ac',
+                    'required': True,
+                },
+            'numeroCaixa': {
+                    'type': 'integer',
+                    'required': True,
+                    'min': 0,
+                    'max': 999,
+                },
+            'vCFeLei12741': {
+                    'type': 'decimal',
+                    'required': False,
+                },
+        }
+
     def __init__(
             self,
             emitente=None,
@@ -1761,8 +3030,16 @@ class CFeVenda(Entidade):
             descontos_acrescimos_subtotal=None,
             pagamentos=None,
             informacoes_adicionais=None,
+            perfil=None,
             **kwargs):
 
+        if perfil is not None:
+            if emitente is None:
+                emitente = perfil.emitente
+            for campo in PerfilTerminal._schema:
+                kwargs.setdefault(campo, getattr(perfil, campo))
+
+        self._perfil = perfil
         self._emitente = emitente
         self._destinatario = destinatario
         self._entrega = entrega
@@ -1773,33 +3050,71 @@ class CFeVenda(Entidade):
 
         super(CFeVenda, self).__init__(
                 versaoDadosEnt=constantes.VERSAO_LAYOUT_ARQUIVO_DADOS_AC,
-                schema={
-                        'versaoDadosEnt': {
-                                'type': 'string',
-                                'required': True,
-                                'regex': r'^\d{1}\.\d{2}$',
-                            },
-                        'CNPJ': {
-                                'type': 'string',
-                                'check_with': 'cnpj',
-                                'required': True,
-                            },
-                        'signAC': {
-                                'type': 'string',
-                                'check_with': 'assinatura_ac',
-                                'required': True,
-                            },
-                        'numeroCaixa': {
-                                'type': 'integer',
-                                'required': True,
-                                'min': 0,
-                                'max': 999,
-                            },
-                        'vCFeLei12741': {
-                                'type': 'decimal',
-                                'required': False,
-                            },
-                    }, **kwargs)
+                **kwargs)
+
+    @classmethod
+    def de_xml(cls, fonte):
+        """Constrói o CF-e de venda a partir de um documento XML (veja
+        :meth:`Entidade.de_xml`), como o XML de uma venda arquivada ou de um
+        CF-e autorizado. Cada item (``det``) é convertido em um
+        :class:`Detalhamento` e descartado tão logo seja lido, de modo que a
+        memória usada não cresce com a árvore do documento inteiro.
+
+        A versão do leiaute (``versaoDadosEnt``) do documento é mantida.
+        """
+        detalhamentos = []
+        infCFe = None
+        elemento = None
+        eventos = ET.iterparse(_fonte_xml(fonte), events=('start', 'end'))
+        for evento, elemento in eventos:
+            if evento == 'start':
+                if elemento.tag == 'infCFe' and infCFe is None:
+                    infCFe = elemento
+            elif elemento.tag == 'det':
+                detalhamentos.append(Detalhamento._de_elemento(elemento))
+                elemento.clear()
+                infCFe.remove(elemento)
+        return cls._de_elemento(elemento, detalhamentos=detalhamentos)
+
+    @classmethod
+    def _de_elemento(cls, elemento, detalhamentos=None):
+        infCFe = elemento.find('infCFe')
+        if detalhamentos is None:
+            detalhamentos = [
+                    Detalhamento._de_elemento(det)
+                    for det in infCFe.findall('det')]
+
+        dados = cls._dados_elemento(infCFe.find('ide'))
+        total = infCFe.find('total')
+        if total is not None:
+            dados.update(cls._dados_elemento(total))
+
+        destinatario = infCFe.find('dest')
+        if destinatario is not None and len(destinatario) == 0:
+            destinatario = None  # nenhum destinatário identificado
+
+        pgto = infCFe.find('pgto')
+        pagamentos = [] if pgto is None else [
+                MeioPagamento._de_elemento(mp) for mp in pgto.findall('MP')]
+
+        cfe = cls(
+                emitente=_de_elemento(Emitente, infCFe.find('emit')),
+                destinatario=_de_elemento(Destinatario, destinatario),
+                entrega=_de_elemento(LocalEntrega, infCFe.find('entrega')),
+                detalhamentos=detalhamentos,
+                descontos_acrescimos_subtotal=_de_elemento(
+                        DescAcrEntr,
+                        None if total is None else total.find('DescAcrEntr')),
+                pagamentos=pagamentos,
+                informacoes_adicionais=_de_elemento(
+                        InformacoesAdicionais,
+                        infCFe.find('infAdic')),
+                **dados)
+
+        versao = infCFe.get('versaoDadosEnt')
+        if versao is not None:
+            cfe.versaoDadosEnt = versao
+        return cfe
 
     @property
     def emitente(self):
@@ -1824,6 +3139,29 @@ class CFeVenda(Entidade):
         """
         return tuple(self._detalhamentos or ())
 
+    def adicionar_detalhamento(self, detalhamento):
+        """Acrescenta um item (:class:`Detalhamento`) ao final da lista de
+        :attr:`detalhamentos`.
+        """
+        if not isinstance(self._detalhamentos, list):
+            self._detalhamentos = list(self._detalhamentos or ())
+        self._detalhamentos.append(detalhamento)
+
+    def remover_detalhamento(self, detalhamento):
+        """Remove o item (:class:`Detalhamento`) da lista de
+        :attr:`detalhamentos`. Os itens seguintes serão renumerados.
+
+        :raises ValueError: Se o item não fizer parte da venda.
+        """
+        if not isinstance(self._detalhamentos, list):
+            self._detalhamentos = list(self._detalhamentos or ())
+        for indice, candidato in enumerate(self._detalhamentos):
+            if candidato is detalhamento:
+                del self._detalhamentos[indice]
+                return
+        raise ValueError('Detalhamento nao faz parte da venda: {!r}'.format(
+                detalhamento))
+
     @property
     def descontos_acrescimos_subtotal(self):
         """
@@ -1848,6 +3186,90 @@ class CFeVenda(Entidade):
         """
         return self._informacoes_adicionais
 
+    @property
+    def perfil(self):
+        """O :class:`PerfilTerminal` do CF-e ou ``None``."""
+        return self._perfil
+
+    def totais(self, contexto=None):
+        """Calcula localmente os totais do CF-e (veja :mod:`satcfe.totais`),
+        sem validar as entidades.
+
+        :param decimal.Context contexto: Opcional. O contexto decimal a ser
+            usado nos cálculos.
+
+        :rtype: satcfe.totais.TotaisCFe
+        """
+        if isinstance(self._detalhamentos, LoteDetalhamentos):
+            lote = self._detalhamentos
+            itens = zip(
+                    lote.coluna('qCom'),
+                    lote.coluna('vUnCom'),
+                    lote.coluna('vDesc'),
+                    lote.coluna('vOutro'))
+        else:
+            itens = [(
+                    getattr(det.produto, 'qCom', None),
+                    getattr(det.produto, 'vUnCom', None),
+                    getattr(det.produto, 'vDesc', None),
+                    getattr(det.produto, 'vOutro', None),
+                ) for det in self.detalhamentos]
+
+        descontos_acrescimos = self.descontos_acrescimos_subtotal
+        return totais.calcular(
+                itens,
+                vDescSubtot=getattr(
+                        descontos_acrescimos, 'vDescSubtot', None),
+                vAcresSubtot=getattr(
+                        descontos_acrescimos, 'vAcresSubtot', None),
+                pagamentos=[pg.vMP for pg in self.pagamentos],
+                contexto=contexto)
+
+    def verificar_totais(self, contexto=None):
+        """Calcula localmente os totais do CF-e (veja :meth:`totais`).
+
+        :raises satcfe.excecoes.ErroTotaisInconsistentes: Se os totais
+            indicarem uma venda que certamente seria rejeitada pelo
+            equipamento SAT.
+
+        :rtype: satcfe.totais.TotaisCFe
+        """
+        resultado = self.totais(contexto=contexto)
+        if resultado.inconsistencias:
+            raise ErroTotaisInconsistentes(resultado)
+        return resultado
+
+    def documento(self, *args, **kwargs):
+        """Resulta no documento XML do CF-e de venda (veja
+        :meth:`Entidade.documento`). Se o argumento ``verificar_totais`` for
+        ``True``, os totais são verificados antes (veja
+        :meth:`verificar_totais`), o que também pode ser feito através de
+        :meth:`~satcfe.base.FuncoesSAT.enviar_dados_venda`:
+
+        .. sourcecode:: python
+
+            cliente.enviar_dados_venda(cfe, verificar_totais=True)
+
+        """
+        if kwargs.pop('verificar_totais', False):
+            self.verificar_totais()
+        return super(CFeVenda, self).documento(*args, **kwargs)
+
+    def _data(self):
+        dados = super(CFeVenda, self)._data()
+        if self._perfil is not None:
+            dados = self._perfil._dados_documento(self, dados)
+        return dados
+
+    def _validador(self):
+        if self._perfil is not None and self._perfil._atende(self):
+            # os atributos do perfil são validados (uma única vez, enquanto
+            # não forem alterados) ao serializar o grupo "ide", o que vale
+            # também para o documento construído através do ElementTree
+            self._perfil._ide()
+            return self._perfil._validador_documento(self)
+        return super(CFeVenda, self)._validador()
+
     def _xml(self, *args, **kwargs):
         self.erros.clear()
         return super(CFeVenda, self)._xml(*args, **kwargs)
@@ -1893,6 +3315,60 @@ class CFeVenda(Entidade):
 
         return cfe
 
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('CFe')
+        escritor.abrir('infCFe', [('versaoDadosEnt', self.versaoDadosEnt)])
+
+        perfil = self._perfil
+        if perfil is not None and perfil._atende(self):
+            escritor.fragmento(perfil._ide())
+        else:
+            escritor.abrir('ide')
+            escritor.elemento('CNPJ', self.CNPJ)
+            escritor.elemento('signAC', self.signAC)
+            escritor.elemento('numeroCaixa', '{:03d}'.format(
+                    self.numeroCaixa))
+            escritor.fechar()
+
+        if perfil is not None and self.emitente is perfil.emitente:
+            escritor.fragmento(perfil._emit())
+        else:
+            self.emitente._escrever(escritor)
+
+        dest = self.destinatario or Destinatario()
+        dest._escrever(escritor)
+
+        if self.entrega is not None:
+            self.entrega._escrever(escritor)
+
+        if isinstance(self._detalhamentos, LoteDetalhamentos):
+            self._detalhamentos._escrever_xml(escritor)
+        elif self.detalhamentos:
+            for n, det in enumerate(self.detalhamentos):
+                det._escrever(escritor, nItem=n+1)
+
+        escritor.abrir('total')
+
+        if hasattr(self, 'vCFeLei12741'):
+            escritor.elemento('vCFeLei12741', str(self.vCFeLei12741))
+
+        if self.descontos_acrescimos_subtotal is not None:
+            self.descontos_acrescimos_subtotal._escrever(escritor)
+
+        escritor.fechar()
+
+        escritor.abrir('pgto')
+        if self.pagamentos:
+            for pg in self.pagamentos:
+                pg._escrever(escritor)
+        escritor.fechar()
+
+        if self.informacoes_adicionais is not None:
+            self.informacoes_adicionais._escrever(escritor)
+
+        escritor.fechar()
+        escritor.fechar()
+
 
 class CFeCancelamento(Entidade):
     """
@@ -1916,39 +3392,85 @@ class CFeCancelamento(Entidade):
         Normalmente este será o número do caixa de onde parte a solicitação de
         cancelamento. Deverá ser um número inteiro entre ``0`` e ``999``.
 
+    :param PerfilTerminal perfil: Opcional. Se informado, os atributos
+        ``CNPJ``, ``signAC`` e ``numeroCaixa``, quando não informados, são os
+        do perfil, cujo grupo ``ide`` já validado e serializado é
+        reaproveitado.
+
     """
 
-    def __init__(self, destinatario=None, **kwargs):
+    _schema = {
+            'chCanc': {
+                    'type': 'string',
+                    'required': True,
+                    'regex': r'^CFe\d{44}$',
+                },
+            'CNPJ': {
+                    'type': 'string',
+                    'check_with': 'cnpj',
+                    'required': True,
+                },
+            'signAC': {
+                    'type': 'string',
+                    'check_with': 'assinatura_ac',
+                    'required': True,
+                },
+            'numeroCaixa': {
+                    'type': 'integer',
+                    'required': True,
+                    'min': 0,
+                    'max': 999,
+                },
+        }
+
+    def __init__(self, destinatario=None, perfil=None, **kwargs):
+        if perfil is not None:
+            for campo in PerfilTerminal._schema:
+                kwargs.setdefault(campo, getattr(perfil, campo))
+
+        self._perfil = perfil
         self._destinatario = destinatario
-        super(CFeCancelamento, self).__init__(schema={
-                'chCanc': {
-                        'type': 'string',
-                        'required': True,
-                        'regex': r'^CFe\d{44}$',
-                    },
-                'CNPJ': {
-                        'type': 'string',
-                        'check_with': 'cnpj',
-                        'required': True,
-                    },
-                'signAC': {
-                        'type': 'string',
-                        'check_with': 'assinatura_ac',
-                        'required': True,
-                    },
-                'numeroCaixa': {
-                        'type': 'integer',
-                        'required': True,
-                        'min': 0,
-                        'max': 999,
-                    },
-            }, **kwargs)
+        super(CFeCancelamento, self).__init__(**kwargs)
+
+    @classmethod
+    def _de_elemento(cls, elemento):
+        infCFe = elemento.find('infCFe')
+        dados = cls._dados_elemento(infCFe)
+        dados.update(cls._dados_elemento(infCFe.find('ide')))
+
+        destinatario = infCFe.find('dest')
+        if destinatario is not None and len(destinatario) == 0:
+            destinatario = None
+
+        return cls(
+                destinatario=_de_elemento(Destinatario, destinatario),
+                **dados)
 
     @property
     def destinatario(self):
         """O :class:`Destinatario` ou ``None``."""
         return self._destinatario
 
+    @property
+    def perfil(self):
+        """O :class:`PerfilTerminal` do CF-e ou ``None``."""
+        return self._perfil
+
+    def _data(self):
+        dados = super(CFeCancelamento, self)._data()
+        if self._perfil is not None:
+            dados = self._perfil._dados_documento(self, dados)
+        return dados
+
+    def _validador(self):
+        if self._perfil is not None and self._perfil._atende(self):
+            # os atributos do perfil são validados (uma única vez, enquanto
+            # não forem alterados) ao serializar o grupo "ide", o que vale
+            # também para o documento construído através do ElementTree
+            self._perfil._ide()
+            return self._perfil._validador_documento(self)
+        return super(CFeCancelamento, self)._validador()
+
     def _xml(self, *args, **kwargs):
         self.erros.clear()
         return super(CFeCancelamento, self)._xml(*args, **kwargs)
@@ -1973,3 +3495,27 @@ class CFeCancelamento(Entidade):
         ET.SubElement(infCFe, 'total')
 
         return cfecanc
+
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('CFeCanc')
+        escritor.abrir('infCFe', [('chCanc', self.chCanc)])
+
+        if self._perfil is not None and self._perfil._atende(self):
+            escritor.fragmento(self._perfil._ide())
+        else:
+            escritor.abrir('ide')
+            escritor.elemento('CNPJ', self.CNPJ)
+            escritor.elemento('signAC', self.signAC)
+            escritor.elemento('numeroCaixa', '{:03d}'.format(
+                    self.numeroCaixa))
+            escritor.fechar()
+
+        escritor.elemento('emit')
+
+        dest = self.destinatario or Destinatario()
+        dest._escrever(escritor, cancelamento=True)
+
+        escritor.elemento('total')
+
+        escritor.fechar()
+        escritor.fechar()
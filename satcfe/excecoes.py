@@ -56,3 +56,69 @@ class ExcecaoRespostaSAT(Exception):
     @property
     def resposta(self):
         return self._resposta
+
+
+class ErroTempoEsgotado(Exception):
+    """Lançada quando uma função da DLL SAT não responde dentro do tempo
+    limite configurado para a invocação. Nesse caso não é possível saber se o
+    comando foi ou não executado pelo equipamento SAT.
+    """
+
+    def __init__(self, funcao, timeout):
+        super(ErroTempoEsgotado, self).__init__(
+                '{}, tempo limite de {!r} segundo(s) esgotado'.format(
+                        funcao,
+                        timeout))
+        self._funcao = funcao
+        self._timeout = timeout
+
+    @property
+    def funcao(self):
+        return self._funcao
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+
+class ErroEquipamentoSuspeito(ErroTempoEsgotado):
+    """Lançada quando o equipamento SAT está sob suspeita, após uma função que
+    não respondeu dentro do tempo limite, e também não respondeu à sondagem
+    que antecede as próximas invocações. Nesse caso, a função SAT **não**
+    chegou a ser invocada.
+    """
+    pass
+
+
+class ErroProcessoBibliotecaSAT(Exception):
+    """Lançada quando o processo que hospeda a DLL SAT termina de maneira
+    inesperada (eg. uma falha de segmentação na biblioteca do fabricante)
+    durante a invocação de uma função SAT.
+    """
+    pass
+
+
+class ErroPoolSATIndisponivel(Exception):
+    """Lançada pelo :class:`~satcfe.pool.PoolSAT` quando não há nenhum
+    equipamento SAT em rotação para atender à uma venda, ou quando não é
+    possível determinar qual equipamento emitiu o CF-e a ser cancelado.
+    """
+    pass
+
+
+class ErroTotaisInconsistentes(Exception):
+    """Lançada quando os totais do CF-e de venda, calculados localmente (veja
+    :mod:`satcfe.totais`), indicam uma venda que certamente seria rejeitada
+    pelo equipamento SAT (eg. pagamentos insuficientes).
+    """
+
+    def __init__(self, totais):
+        super(ErroTotaisInconsistentes, self).__init__(
+                'Totais do CF-e inconsistentes: {}'.format(
+                        '; '.join(totais.inconsistencias)))
+        self._totais = totais
+
+    @property
+    def totais(self):
+        """Os totais calculados (:class:`~satcfe.totais.TotaisCFe`)."""
+        return self._totais
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+#
+# satcfe/instrumentacao.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import collections
+import logging
+import math
+import threading
+
+try:
+    from time import perf_counter as relogio
+except ImportError:
+    # Python 2 não possui perf_counter
+    from time import time as relogio
+
+
+logger = logging.getLogger('satcfe')
+
+CODIFICAR = 'codificar'
+"""Etapa de codificação dos argumentos da função SAT."""
+
+INVOCAR = 'invocar'
+"""Etapa de invocação da função na biblioteca SAT (inclui a espera pelo
+equipamento no :class:`~satcfe.base.DespachanteSAT`).
+"""
+
+DECODIFICAR = 'decodificar'
+"""Etapa de decodificação do retorno da função SAT."""
+
+HTTP = 'http'
+"""Etapa de requisição HTTP ao servidor SATHub."""
+
+ANALISAR = 'analisar'
+"""Etapa de análise do retorno (veja
+:func:`~satcfe.resposta.padrao.analisar_retorno`).
+"""
+
+Medicao = collections.namedtuple('Medicao', [
+        'etapa',
+        'funcao',
+        'duracao',
+        'tamanho_envio',
+        'tamanho_retorno',
+        'numero_sessao',
+        'EEEEE',
+        'erro',
+    ])
+"""Uma medição emitida aos observadores registrados. Os atributos são:
+
+``etapa``
+    Uma das etapas :data:`CODIFICAR`, :data:`INVOCAR`, :data:`DECODIFICAR`,
+    :data:`HTTP` ou :data:`ANALISAR`;
+
+``funcao``
+    Nome da função SAT (ou o método do SATHub, na etapa :data:`HTTP`);
+
+``duracao``
+    Duração da etapa, em segundos;
+
+``tamanho_envio`` e ``tamanho_retorno``
+    Tamanho, em bytes (ou caracteres, conforme a etapa), dos dados enviados e
+    recebidos, ou ``None`` se não se aplicar à etapa;
+
+``numero_sessao`` e ``EEEEE``
+    Número de sessão e código de resultado, quando conhecidos na etapa;
+
+``erro``
+    A exceção lançada durante a etapa ou ``None``.
+"""
+
+_observadores = []
+
+_trava = threading.Lock()
+
+
+def registrar(observador):
+    """Registra um observador, um *callable* que será invocado com uma
+    instância de :class:`Medicao` ao término de cada etapa instrumentada.
+    Exceções lançadas pelo observador são registradas em log e ignoradas.
+
+    :return: O próprio observador, de modo que possa ser usado como
+        decorador.
+    """
+    global _observadores
+    with _trava:
+        if observador not in _observadores:
+            _observadores = _observadores + [observador]
+    return observador
+
+
+def remover(observador):
+    """Remove um observador registrado através de :func:`registrar`."""
+    global _observadores
+    with _trava:
+        _observadores = [o for o in _observadores if o != observador]
+
+
+def ativa():
+    """Indica se há algum observador registrado. Quando não houver, as etapas
+    sequer são medidas.
+    """
+    return bool(_observadores)
+
+
+def emitir(
+        etapa,
+        funcao,
+        duracao,
+        tamanho_envio=None,
+        tamanho_retorno=None,
+        numero_sessao=None,
+        EEEEE=None,
+        erro=None):
+    """Emite uma :class:`Medicao` para todos os observadores registrados."""
+    observadores = _observadores
+    if not observadores:
+        return
+
+    medicao = Medicao(
+            etapa=etapa,
+            funcao=funcao,
+            duracao=duracao,
+            tamanho_envio=tamanho_envio,
+            tamanho_retorno=tamanho_retorno,
+            numero_sessao=numero_sessao,
+            EEEEE=EEEEE,
+            erro=erro)
+
+    for observador in observadores:
+        try:
+            observador(medicao)
+        except Exception:
+            logger.exception('observador %r falhou', observador)
+
+
+class Histograma(object):
+    """Histograma de valores positivos (tipicamente durações, em segundos)
+    com baldes em escala logarítmica, de modo que o consumo de memória não
+    depende da quantidade de valores registrados. Cada percentil é estimado
+    com um erro relativo de, no máximo, ``fator - 1``.
+
+    :param float fator: Razão entre os limites de baldes consecutivos.
+
+    :param float minimo: Limite superior do primeiro balde. Valores menores
+        são contados nesse balde.
+    """
+
+    def __init__(self, fator=1.05, minimo=1e-6):
+        self._fator = fator
+        self._log_fator = math.log(fator)
+        self._minimo = minimo
+        self._baldes = collections.Counter()
+        self._contagem = 0
+        self._soma = 0.0
+        self._maximo = 0.0
+
+    @property
+    def contagem(self):
+        return self._contagem
+
+    @property
+    def soma(self):
+        return self._soma
+
+    @property
+    def maximo(self):
+        return self._maximo
+
+    @property
+    def media(self):
+        return self._soma / self._contagem if self._contagem else 0.0
+
+    def registrar(self, valor):
+        if valor > self._minimo:
+            balde = int(math.ceil(
+                    math.log(valor / self._minimo) / self._log_fator))
+        else:
+            balde = 0
+        self._baldes[balde] += 1
+        self._contagem += 1
+        self._soma += valor
+        self._maximo = max(self._maximo, valor)
+
+    def percentil(self, p):
+        """Estima o valor abaixo do qual estão ``p`` por cento dos valores
+        registrados, ou ``None`` se nenhum valor foi registrado.
+        """
+        if not self._contagem:
+            return None
+        alvo = max(1, int(math.ceil(self._contagem * p / 100.0)))
+        acumulado = 0
+        for balde in sorted(self._baldes):
+            acumulado += self._baldes[balde]
+            if acumulado >= alvo:
+                break
+        return min(self._maximo, self._minimo * self._fator ** balde)
+
+
+class HistogramaTempos(object):
+    """Observador que mantém, em memória, um :class:`Histograma` das
+    durações para cada par etapa/função.
+
+    .. sourcecode:: python
+
+        from satcfe import instrumentacao
+
+        tempos = instrumentacao.registrar(instrumentacao.HistogramaTempos())
+        ...
+        for (etapa, funcao), dados in sorted(tempos.resumo().items()):
+            print(etapa, funcao, dados['p50'], dados['p95'], dados['p99'])
+
+    """
+
+    PERCENTIS = (50, 95, 99)
+
+    def __init__(self, fator=1.05):
+        self._fator = fator
+        self._histogramas = {}
+        self._trava = threading.Lock()
+
+    def __call__(self, medicao):
+        chave = (medicao.etapa, medicao.funcao)
+        with self._trava:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = Histograma(fator=self._fator)
+                self._histogramas[chave] = histograma
+            histograma.registrar(medicao.duracao)
+
+    def histograma(self, funcao, etapa=INVOCAR):
+        """Obtém o :class:`Histograma` da função na etapa indicada ou
+        ``None`` se não houver medições.
+        """
+        return self._histogramas.get((etapa, funcao))
+
+    def percentis(self, funcao, etapa=INVOCAR):
+        """Resulta em um dicionário contendo os :attr:`PERCENTIS` para a
+        função na etapa indicada (eg. ``{50: 0.41, 95: 1.2, 99: 2.7}``).
+        """
+        with self._trava:
+            histograma = self._histogramas.get((etapa, funcao))
+            return {
+                    p: None if histograma is None else histograma.percentil(p)
+                    for p in self.PERCENTIS}
+
+    def resumo(self):
+        """Resulta em um dicionário onde as chaves são tuplas ``(etapa,
+        funcao)`` e os valores são dicionários contendo ``contagem``,
+        ``media``, ``maximo`` e os percentis (eg. ``p50``, ``p95`` e
+        ``p99``).
+        """
+        resultado = {}
+        with self._trava:
+            for chave, histograma in self._histogramas.items():
+                dados = {
+                        'contagem': histograma.contagem,
+                        'media': histograma.media,
+                        'maximo': histograma.maximo,
+                    }
+                for p in self.PERCENTIS:
+                    dados['p{:d}'.format(p)] = histograma.percentil(p)
+                resultado[chave] = dados
+        return resultado
+
+    def limpar(self):
+        """Descarta todas as medições."""
+        with self._trava:
+            self._histogramas.clear()
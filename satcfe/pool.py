@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+#
+# satcfe/pool.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import logging
+import threading
+
+from satcomum.ersat import ChaveCFeSAT
+
+from .excecoes import ErroPoolSATIndisponivel
+from .excecoes import ErroProcessoBibliotecaSAT
+from .excecoes import ErroTempoEsgotado
+from .excecoes import ExcecaoRespostaSAT
+from .resposta.consultarstatusoperacional import DESBLOQUEADO
+
+
+logger = logging.getLogger('satcfe')
+
+
+class PoolSAT(object):
+    """Distribui as vendas entre vários equipamentos SAT. Cada equipamento é
+    acessado através do seu próprio cliente, seja ele um
+    :class:`~satcfe.clientelocal.ClienteSATLocal` ou um
+    :class:`~satcfe.clientesathub.ClienteSATHub`.
+
+    .. sourcecode:: python
+
+        pool = PoolSAT([
+                ClienteSATHub('10.0.0.11', 5000),
+                ClienteSATHub('10.0.0.12', 5000),
+                ClienteSATHub('10.0.0.13', 5000),
+            ])
+
+        pool.consultar_status_operacional()  # verifica os equipamentos
+        resposta = pool.enviar_dados_venda(cfe)
+        ...
+        pool.cancelar_ultima_venda(resposta.chaveConsulta, cfecanc)
+
+    Cada venda é encaminhada para o equipamento em rotação que tiver o menor
+    número de invocações em curso (em caso de empate, aquele que emitiu menos
+    vendas). O pool lembra a chave do último CF-e emitido por cada
+    equipamento, de modo que o cancelamento seja encaminhado ao equipamento
+    que emitiu a venda.
+
+    Um equipamento é retirado de rotação quando, na consulta ao status
+    operacional, ele não responde, responde com falha ou não está
+    desbloqueado, e também quando uma venda falha por uma das
+    :attr:`FALHAS_EQUIPAMENTO`. O equipamento volta à rotação na próxima
+    consulta ao status operacional bem sucedida.
+
+    :param clientes: Sequência de clientes SAT, um para cada equipamento.
+
+    """
+
+    FALHAS_EQUIPAMENTO = (
+            ErroTempoEsgotado,
+            ErroProcessoBibliotecaSAT,
+            IOError,
+        )
+    """Exceções que indicam que o equipamento SAT (ou o caminho até ele) está
+    com problemas e que, portanto, retiram o equipamento de rotação.
+    """
+
+    def __init__(self, clientes):
+        self._clientes = tuple(clientes)
+        if not self._clientes:
+            raise ValueError('O pool requer ao menos um cliente SAT')
+
+        quantidade = len(self._clientes)
+        self._trava = threading.Lock()
+        self._saudaveis = [True] * quantidade
+        self._suspensos = [False] * quantidade
+        self._ocupacao = [0] * quantidade
+        self._vendas = [0] * quantidade
+        self._ultimas_chaves = [None] * quantidade
+        self._numeros_serie = [None] * quantidade
+
+    @property
+    def clientes(self):
+        """Tupla contendo todos os clientes SAT do pool."""
+        return self._clientes
+
+    @property
+    def em_rotacao(self):
+        """Tupla contendo os clientes SAT que estão recebendo vendas."""
+        with self._trava:
+            return tuple(
+                    cliente for indice, cliente in enumerate(self._clientes)
+                    if self._disponivel(indice))
+
+    def ocupacao(self, cliente):
+        """Número de invocações em curso no equipamento do cliente."""
+        return self._ocupacao[self._indice(cliente)]
+
+    def vendas(self, cliente):
+        """Número de vendas encaminhadas ao equipamento do cliente."""
+        return self._vendas[self._indice(cliente)]
+
+    def retirar(self, cliente):
+        """Retira o equipamento do cliente de rotação (eg. para manutenção).
+        Ao contrário dos equipamentos retirados por problemas, o equipamento
+        somente voltará à rotação através de :meth:`restabelecer`.
+        """
+        with self._trava:
+            self._suspensos[self._indice(cliente)] = True
+
+    def restabelecer(self, cliente):
+        """Devolve à rotação um equipamento retirado via :meth:`retirar`."""
+        with self._trava:
+            self._suspensos[self._indice(cliente)] = False
+
+    def emissor(self, chave_cfe):
+        """Determina o cliente cujo equipamento emitiu o CF-e.
+
+        A chave é procurada entre as chaves das últimas vendas encaminhadas
+        pelo pool. Se não for encontrada, o número de série do equipamento
+        contido na chave é comparado com os números de série obtidos na
+        última consulta ao status operacional.
+
+        :param str chave_cfe: Chave de acesso do CF-e (``CFe`` + 44 dígitos).
+
+        :return: O cliente ou ``None`` se não for possível determinar.
+        """
+        indice = self._indice_emissor(chave_cfe)
+        return None if indice is None else self._clientes[indice]
+
+    def enviar_dados_venda(self, dados_venda, *args, **kwargs):
+        """Encaminha a venda para o equipamento menos ocupado em rotação.
+        Veja :meth:`~satcfe.base.FuncoesSAT.enviar_dados_venda`.
+
+        :raises ErroPoolSATIndisponivel: Se não houver nenhum equipamento em
+            rotação.
+        """
+        indice = self._reservar()
+        cliente = self._clientes[indice]
+        try:
+            resposta = cliente.enviar_dados_venda(dados_venda, *args, **kwargs)
+        except self.FALHAS_EQUIPAMENTO:
+            self._marcar(indice, saudavel=False)
+            raise
+        finally:
+            self._liberar(indice)
+
+        chave = getattr(resposta, 'chaveConsulta', None)
+        if chave:
+            with self._trava:
+                self._ultimas_chaves[indice] = chave
+
+        return resposta
+
+    def cancelar_ultima_venda(
+            self,
+            chave_cfe,
+            dados_cancelamento,
+            *args,
+            **kwargs):
+        """Encaminha o cancelamento ao equipamento que emitiu o CF-e, mesmo
+        que ele esteja fora de rotação. Veja
+        :meth:`~satcfe.base.FuncoesSAT.cancelar_ultima_venda`.
+
+        :raises ErroPoolSATIndisponivel: Se não for possível determinar qual
+            equipamento emitiu o CF-e (veja :meth:`emissor`).
+        """
+        indice = self._indice_emissor(chave_cfe)
+        if indice is None:
+            raise ErroPoolSATIndisponivel(
+                    'Nao foi possivel determinar o equipamento SAT '
+                    'emissor do CF-e: {!r}'.format(chave_cfe))
+
+        self._ocupar(indice)
+        try:
+            resposta = self._clientes[indice].cancelar_ultima_venda(
+                    chave_cfe,
+                    dados_cancelamento,
+                    *args,
+                    **kwargs)
+        except self.FALHAS_EQUIPAMENTO:
+            self._marcar(indice, saudavel=False)
+            raise
+        finally:
+            self._liberar(indice)
+
+        with self._trava:
+            # somente a última venda pode ser cancelada
+            self._ultimas_chaves[indice] = None
+
+        return resposta
+
+    def consultar_status_operacional(self):
+        """Consulta o status operacional de todos os equipamentos do pool,
+        retirando ou devolvendo cada equipamento à rotação conforme o
+        resultado.
+
+        :return: Lista com as respostas, na mesma ordem dos clientes. Para os
+            equipamentos que não responderam, a resposta será ``None``.
+        :rtype: list
+        """
+        respostas = []
+        for indice, cliente in enumerate(self._clientes):
+            self._ocupar(indice)
+            try:
+                resposta = cliente.consultar_status_operacional()
+            except ExcecaoRespostaSAT as ex:
+                resposta = ex.resposta
+                saudavel = False
+            except self.FALHAS_EQUIPAMENTO as ex:
+                logger.warning(
+                        'equipamento SAT #%d nao respondeu a consulta ao '
+                        'status operacional: %s', indice, ex)
+                resposta = None
+                saudavel = False
+            else:
+                saudavel = resposta.ESTADO_OPERACAO == DESBLOQUEADO
+                with self._trava:
+                    self._numeros_serie[indice] = resposta.NSERIE
+            finally:
+                self._liberar(indice)
+
+            self._marcar(indice, saudavel=saudavel)
+            respostas.append(resposta)
+
+        return respostas
+
+    def _indice(self, cliente):
+        for indice, candidato in enumerate(self._clientes):
+            if candidato is cliente:
+                return indice
+        raise ValueError('Cliente SAT nao pertence ao pool: {!r}'.format(
+                cliente))
+
+    def _indice_emissor(self, chave_cfe):
+        with self._trava:
+            for indice, chave in enumerate(self._ultimas_chaves):
+                if chave is not None and chave == chave_cfe:
+                    return indice
+            numeros_serie = list(self._numeros_serie)
+
+        try:
+            numero_serie = ChaveCFeSAT(chave_cfe).numero_serie
+        except ValueError:
+            return None
+
+        for indice, candidato in enumerate(numeros_serie):
+            if candidato is not None and candidato == numero_serie:
+                return indice
+
+        return None
+
+    def _disponivel(self, indice):
+        return self._saudaveis[indice] and not self._suspensos[indice]
+
+    def _reservar(self):
+        with self._trava:
+            candidatos = [
+                    indice for indice in range(len(self._clientes))
+                    if self._disponivel(indice)]
+            if not candidatos:
+                raise ErroPoolSATIndisponivel(
+                        'Nenhum equipamento SAT em rotacao')
+            indice = min(candidatos, key=lambda i: (
+                    self._ocupacao[i],
+                    self._vendas[i]))
+            self._ocupacao[indice] += 1
+            self._vendas[indice] += 1
+        return indice
+
+    def _ocupar(self, indice):
+        with self._trava:
+            self._ocupacao[indice] += 1
+
+    def _liberar(self, indice):
+        with self._trava:
+            self._ocupacao[indice] -= 1
+
+    def _marcar(self, indice, saudavel):
+        with self._trava:
+            if self._saudaveis[indice] != saudavel:
+                logger.info(
+                        'equipamento SAT #%d %s rotacao',
+                        indice,
+                        'retorna a' if saudavel else 'retirado de')
+            self._saudaveis[indice] = saudavel
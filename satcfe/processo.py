@@ -0,0 +1,340 @@
+# -*- coding: utf-8 -*-
+#
+# satcfe/processo.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+"""Hospedagem da biblioteca SAT em um processo separado.
+
+Uma falha de segmentação ou um travamento na biblioteca do fabricante irá,
+normalmente, derrubar todo o processo Python que a carregou. A classe
+:class:`BibliotecaSATIsolada` carrega a biblioteca SAT em um processo filho e
+encaminha as invocações através de um *pipe*, de modo que o processo principal
+sobreviva a essas falhas, reiniciando o processo filho quando necessário.
+
+.. sourcecode:: python
+
+    cliente = ClienteSATLocal(
+            BibliotecaSATIsolada('/opt/fabricante/libsat.so', timeout=30),
+            codigo_ativacao='12345678')
+
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import errno
+import functools
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+
+from .base import FUNCTION_PROTOTYPES
+from .base import BibliotecaSAT
+from .excecoes import ErroProcessoBibliotecaSAT
+from .excecoes import ErroTempoEsgotado
+
+
+logger = logging.getLogger('satcfe')
+
+_OK = 'ok'
+_ERRO = 'erro'
+_PING = '_ping'
+
+# erros que indicam que o processo filho terminou sem ler a mensagem: o pipe
+# já estava fechado no envio ou foi fechado com a mensagem ainda não lida
+_NAO_ENTREGUE = (errno.EPIPE, errno.ECONNRESET)
+
+
+def _hospedar(conexao, caminho, convencao):
+    # executado no processo filho: carrega a biblioteca SAT e atende às
+    # invocações até que o pipe seja fechado pelo processo principal
+    try:
+        biblioteca = BibliotecaSAT(caminho, convencao=convencao)
+    except Exception as ex:
+        conexao.send((_ERRO, ex))
+        return
+
+    conexao.send((_OK, None))
+
+    while True:
+        try:
+            mensagem = conexao.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+
+        if mensagem is None:
+            break
+
+        funcname, args = mensagem
+        if funcname == _PING:
+            conexao.send((_OK, None))
+            continue
+
+        try:
+            resposta = biblioteca.funcao(funcname)(*args)
+        except Exception as ex:
+            conexao.send((_ERRO, ex))
+        else:
+            conexao.send((_OK, resposta))
+
+
+def _matar(processo):
+    # Process.kill existe apenas a partir do Python 3.7; antes disso, envia
+    # SIGKILL diretamente (no Windows, terminate já resulta em
+    # TerminateProcess, que não pode ser ignorado)
+    if hasattr(processo, 'kill'):
+        processo.kill()
+    elif processo.exitcode is None:
+        if os.name == 'nt':
+            processo.terminate()
+        else:
+            try:
+                os.kill(processo.pid, signal.SIGKILL)
+            except OSError:
+                pass  # o processo terminou nesse meio tempo
+
+
+class BibliotecaSATIsolada(object):
+    """Carrega a biblioteca SAT em um processo filho. Pode ser usada onde quer
+    que se espere uma :class:`~satcfe.base.BibliotecaSAT`.
+
+    Se o processo filho terminar de maneira inesperada, a invocação em curso
+    resultará em :exc:`~satcfe.excecoes.ErroProcessoBibliotecaSAT` e o
+    processo será reiniciado na próxima invocação. Se a invocação não for
+    respondida dentro do tempo limite, o processo filho será encerrado e a
+    invocação resultará em :exc:`~satcfe.excecoes.ErroTempoEsgotado`.
+
+    .. warning::
+
+        As invocações que falharem não são repetidas automaticamente, já que
+        não é possível saber se o comando chegou a ser executado pelo
+        equipamento SAT (eg. ``EnviarDadosVenda``).
+
+    :param string caminho: Caminho completo para a biblioteca SAT.
+
+    :param integer convencao: Opcional. Convenção de chamada da biblioteca.
+        Veja :class:`~satcfe.base.BibliotecaSAT`.
+
+    :param float timeout: Opcional. Tempo limite, em segundos, para que uma
+        função SAT responda. Se não for informado, aguarda indefinidamente.
+
+    :param float timeout_carga: Opcional. Tempo limite, em segundos, para que
+        o processo filho carregue a biblioteca SAT. Padrão é ``10``.
+
+    """
+
+    def __init__(
+            self,
+            caminho,
+            convencao=None,
+            timeout=None,
+            timeout_carga=10):
+        self._caminho = caminho
+        self._convencao = convencao
+        self._timeout = timeout
+        self._timeout_carga = timeout_carga
+        self._processo = None
+        self._conexao = None
+        self._reinicios = 0
+        self._falhou = False
+        self._trava = threading.RLock()
+        self._carregar()
+
+    @property
+    def caminho(self):
+        """Caminho completo para a biblioteca SAT."""
+        return self._caminho
+
+    @property
+    def convencao(self):
+        """Convenção de chamada para a biblioteca SAT, conforme informado."""
+        return self._convencao
+
+    @property
+    def timeout(self):
+        """Tempo limite, em segundos, para que uma função SAT responda."""
+        return self._timeout
+
+    @property
+    def reinicios(self):
+        """Número de vezes que o processo filho foi reiniciado."""
+        return self._reinicios
+
+    @property
+    def pid(self):
+        """Identificação do processo filho ou ``None``."""
+        return self._processo.pid if self._processo is not None else None
+
+    def _carregar(self):
+        conexao, conexao_filho = multiprocessing.Pipe()
+        processo = multiprocessing.Process(
+                target=_hospedar,
+                args=(conexao_filho, self._caminho, self._convencao))
+        processo.daemon = True
+        processo.start()
+        conexao_filho.close()
+
+        self._processo = processo
+        self._conexao = conexao
+
+        if not conexao.poll(self._timeout_carga):
+            self._descartar()
+            raise ErroTempoEsgotado(
+                    '(carga da biblioteca)',
+                    self._timeout_carga)
+
+        try:
+            situacao, erro = conexao.recv()
+        except EOFError:
+            self._descartar()
+            raise ErroProcessoBibliotecaSAT((
+                    'Processo da biblioteca SAT {!r} terminou durante a '
+                    'carga da biblioteca'
+                ).format(self._caminho))
+
+        if situacao == _ERRO:
+            self._descartar()
+            raise erro
+
+    def _descartar(self):
+        processo, self._processo = self._processo, None
+        conexao, self._conexao = self._conexao, None
+        if conexao is not None:
+            conexao.close()
+        if processo is not None:
+            if processo.is_alive():
+                processo.terminate()
+                processo.join(1)
+            if processo.is_alive():
+                # um processo travado (ou parado) pode ignorar SIGTERM
+                _matar(processo)
+            processo.join(1)
+
+    def _garantir_processo(self):
+        if self._processo is not None and self._processo.is_alive():
+            return
+
+        if self._processo is not None:
+            logger.warning(
+                    'processo da biblioteca SAT terminou (exitcode=%r); '
+                    'reiniciando', self._processo.exitcode)
+            self._falhou = True
+            self._descartar()
+
+        self._carregar()
+
+        if self._falhou:
+            self._falhou = False
+            self._reinicios += 1
+
+    def _reiniciar(self):
+        logger.warning(
+                'processo da biblioteca SAT terminou antes da invocacao; '
+                'reiniciando')
+        self._falhou = True
+        self._descartar()
+        self._garantir_processo()
+
+    def _trocar(self, funcname, args, timeout):
+        self._conexao.send((funcname, args))
+        if not self._conexao.poll(timeout):
+            self._falhou = True
+            self._descartar()
+            raise ErroTempoEsgotado(funcname, timeout)
+        return self._conexao.recv()
+
+    def _enviar(self, funcname, args, timeout):
+        with self._trava:
+            self._garantir_processo()
+            try:
+                try:
+                    situacao, resultado = self._trocar(funcname, args, timeout)
+                except (IOError, OSError) as ex:
+                    if getattr(ex, 'errno', None) not in _NAO_ENTREGUE:
+                        raise
+                    # o processo filho terminou sem ler a invocação (eg. logo
+                    # após a verificação em _garantir_processo), que então
+                    # pode ser enviada, com segurança, a um novo processo
+                    self._reiniciar()
+                    situacao, resultado = self._trocar(funcname, args, timeout)
+            except (EOFError, IOError, OSError):
+                self._processo.join(1)
+                exitcode = self._processo.exitcode
+                self._falhou = True
+                self._descartar()
+                raise ErroProcessoBibliotecaSAT((
+                        'Processo da biblioteca SAT terminou durante a '
+                        'invocacao de {!r} (exitcode={!r})'
+                    ).format(funcname, exitcode))
+
+        if situacao == _ERRO:
+            raise resultado
+
+        return resultado
+
+    def invocar(self, funcname, *args):
+        """Invoca a função SAT no processo filho.
+
+        :raises ErroTempoEsgotado: Se a função não responder dentro do tempo
+            limite. O processo filho será encerrado.
+
+        :raises ErroProcessoBibliotecaSAT: Se o processo filho terminar
+            durante a invocação.
+        """
+        return self._enviar(funcname, args, self._timeout)
+
+    def funcao(self, funcname):
+        """Obtém um *callable* que invoca a função SAT no processo filho.
+        Veja :meth:`~satcfe.base.BibliotecaSAT.funcao`.
+        """
+        if funcname not in FUNCTION_PROTOTYPES:
+            raise ValueError((
+                    'There is no function prototype named: {!r}'
+                ).format(funcname))
+        return functools.partial(self.invocar, funcname)
+
+    def verificar(self, timeout=5):
+        """Verifica se o processo filho está respondendo. Se não estiver, o
+        processo será reiniciado.
+
+        :param float timeout: Tempo limite, em segundos, para a resposta.
+
+        :return: Retorna ``True`` se o processo filho respondeu.
+        :rtype: bool
+        """
+        try:
+            self._enviar(_PING, (), timeout)
+        except (ErroTempoEsgotado, ErroProcessoBibliotecaSAT):
+            with self._trava:
+                self._garantir_processo()
+            return False
+        return True
+
+    def encerrar(self):
+        """Encerra o processo filho. Uma invocação posterior irá iniciar um
+        novo processo.
+        """
+        with self._trava:
+            if self._conexao is not None:
+                try:
+                    self._conexao.send(None)
+                except (IOError, OSError):
+                    pass
+            self._falhou = False
+            self._descartar()
@@ -85,100 +85,99 @@ class ConfiguracaoRede(Entidade):
 
     """
 
-    def __init__(self, **kwargs):
-        super(ConfiguracaoRede, self).__init__(schema={
-                'tipoInter': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in REDE_TIPOINTER_OPCOES],
-                    },
-                'SSID': {
-                        'type': 'string',
-                        'required': False,
-                        'minlength': 1,
-                        'maxlength': 32,
-                    },
-                'seg': {
-                        'type': 'string',
-                        'required': False,
-                        'allowed': [v for v, s in REDE_SEG_OPCOES],
-                    },
-                'codigo': {
-                        'type': 'string',
-                        'required': False,
-                        'minlength': 1,
-                        'maxlength': 64,
-                    },
-                'tipoLan': {
-                        'type': 'string',
-                        'required': True,
-                        'allowed': [v for v, s in REDE_TIPOLAN_OPCOES],
-                    },
-                'lanIP': {
-                        'type': 'string',
-                        'check_with': 'ipv4',
-                        'required': False,
-                    },
-                'lanMask': {
-                        'type': 'string',
-                        'check_with': 'ipv4',
-                        'required': False,
-                    },
-                'lanGW': {
-                        'type': 'string',
-                        'check_with': 'ipv4',
-                        'required': False,
-                    },
-                'lanDNS1': {
-                        'type': 'string',
-                        'check_with': 'ipv4',
-                        'required': False,
-                    },
-                'lanDNS2': {
-                        'type': 'string',
-                        'check_with': 'ipv4',
-                        'required': False,
-                    },
-                'usuario': {
-                        'type': 'string',
-                        'required': False,
-                        'minlength': 1, 'maxlength': 64,
-                    },
-                'senha': {
-                        'type': 'string',
-                        'required': False,
-                        'minlength': 1,
-                        'maxlength': 64,
-                    },
-                'proxy': {
-                        'type': 'string',
-                        'required': False,
-                        'allowed': [v for v, s in REDE_PROXY_OPCOES],
-                    },
-                'proxy_ip': {
-                        'type': 'string',
-                        'check_with': 'ipv4',
-                        'required': False,
-                    },
-                'proxy_porta': {
-                        'type': 'integer',
-                        'required': False,
-                        'min': 0,
-                        'max': 65535,
-                    },
-                'proxy_user': {
-                        'type': 'string',
-                        'required': False,
-                        'minlength': 1,
-                        'maxlength': 64,
-                    },
-                'proxy_senha': {
-                        'type': 'string',
-                        'required': False,
-                        'minlength': 1,
-                        'maxlength': 64,
-                    },
-            }, **kwargs)
+    _schema = {
+            'tipoInter': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in REDE_TIPOINTER_OPCOES],
+                },
+            'SSID': {
+                    'type': 'string',
+                    'required': False,
+                    'minlength': 1,
+                    'maxlength': 32,
+                },
+            'seg': {
+                    'type': 'string',
+                    'required': False,
+                    'allowed': [v for v, s in REDE_SEG_OPCOES],
+                },
+            'codigo': {
+                    'type': 'string',
+                    'required': False,
+                    'minlength': 1,
+                    'maxlength': 64,
+                },
+            'tipoLan': {
+                    'type': 'string',
+                    'required': True,
+                    'allowed': [v for v, s in REDE_TIPOLAN_OPCOES],
+                },
+            'lanIP': {
+                    'type': 'string',
+                    'check_with': 'ipv4',
+                    'required': False,
+                },
+            'lanMask': {
+                    'type': 'string',
+                    'check_with': 'ipv4',
+                    'required': False,
+                },
+            'lanGW': {
+                    'type': 'string',
+                    'check_with': 'ipv4',
+                    'required': False,
+                },
+            'lanDNS1': {
+                    'type': 'string',
+                    'check_with': 'ipv4',
+                    'required': False,
+                },
+            'lanDNS2': {
+                    'type': 'string',
+                    'check_with': 'ipv4',
+                    'required': False,
+                },
+            'usuario': {
+                    'type': 'string',
+                    'required': False,
+                    'minlength': 1, 'maxlength': 64,
+                },
+            'senha': {
+                    'type': 'string',
+                    'required': False,
+                    'minlength': 1,
+                    'maxlength': 64,
+                },
+            'proxy': {
+                    'type': 'string',
+                    'required': False,
+                    'allowed': [v for v, s in REDE_PROXY_OPCOES],
+                },
+            'proxy_ip': {
+                    'type': 'string',
+                    'check_with': 'ipv4',
+                    'required': False,
+                },
+            'proxy_porta': {
+                    'type': 'integer',
+                    'required': False,
+                    'min': 0,
+                    'max': 65535,
+                },
+            'proxy_user': {
+                    'type': 'string',
+                    'required': False,
+                    'minlength': 1,
+                    'maxlength': 64,
+                },
+            'proxy_senha': {
+                    'type': 'string',
+                    'required': False,
+                    'minlength': 1,
+                    'maxlength': 64,
+                },
+        }
 
     def _construir_elemento_xml(self, *args, **kwargs):
         config = ET.Element('config')
@@ -189,3 +188,13 @@ class ConfiguracaoRede(Entidade):
                     valor = str(valor)
                 ET.SubElement(config, elemento).text = valor
         return config
+
+    def _escrever_elemento_xml(self, escritor, *args, **kwargs):
+        escritor.abrir('config')
+        for elemento in self._schema.keys():
+            valor = getattr(self, elemento, None)
+            if valor:
+                if isinstance(valor, int):
+                    valor = str(valor)
+                escritor.elemento(elemento, valor)
+        escritor.fechar()
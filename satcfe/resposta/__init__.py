@@ -28,5 +28,6 @@ from .consultarstatusoperacional import RespostaConsultarStatusOperacional  # no
 from .consultarultimasessaofiscal import RespostaConsultarUltimaSessaoFiscal  # noqa: F401, E501
 from .enviardadosvenda import RespostaEnviarDadosVenda  # noqa: F401
 from .extrairlogs import RespostaExtrairLogs  # noqa: F401
+from .padrao import RespostaComCFe  # noqa: F401
 from .padrao import RespostaSAT  # noqa: F401
 from .testefimafim import RespostaTesteFimAFim  # noqa: F401
@@ -23,8 +23,18 @@ from __future__ import unicode_literals
 from builtins import str as text
 
 from ..excecoes import ExcecaoRespostaSAT
+from .padrao import AnalisadorRetorno
 from .padrao import RespostaSAT
-from .padrao import analisar_retorno
+from .padrao import slots_campos
+
+_CAMPOS = (
+        ('numeroSessao', int),
+        ('EEEEE', text),
+        ('CCCC', text),
+        ('mensagem', text),
+        ('cod', text),
+        ('mensagemSEFAZ', text),
+    )
 
 
 class RespostaAssociarAssinatura(RespostaSAT):
@@ -48,31 +58,26 @@ class RespostaAssociarAssinatura(RespostaSAT):
 
     """
 
+    __slots__ = slots_campos(_CAMPOS)
+
     @classmethod
     def analisar(cls, retorno):
         """Constrói uma instância da resposta a partir do retorno informado.
 
         :param str retorno: Retorno da função ``AssociarAssinatura``.
         """
-        resposta = analisar_retorno(
-                retorno,
-                funcao='AssociarAssinatura',
-                classe_resposta=RespostaAssociarAssinatura,
-                campos=(
-                        ('numeroSessao', int),
-                        ('EEEEE', text),
-                        ('CCCC', text),
-                        ('mensagem', text),
-                        ('cod', text),
-                        ('mensagemSEFAZ', text),
-                    ),
-                campos_alternativos=[
-                        # se a ativação falhar espera-se o padrão de campos
-                        # no retorno (embora isto não esteja explícito na ER
-                        # SAT, usa os campos padrão como um fallback razoável)
-                        RespostaSAT.CAMPOS,
-                    ]
-            )
+        resposta = _ANALISADOR.analisar(retorno, funcao='AssociarAssinatura')
         if resposta.EEEEE not in ('13000',):
             raise ExcecaoRespostaSAT(resposta)
         return resposta
+
+
+_ANALISADOR = AnalisadorRetorno(
+        RespostaAssociarAssinatura,
+        campos=_CAMPOS,
+        campos_alternativos=[
+                # se a ativação falhar espera-se o padrão de campos no retorno
+                # (embora isto não esteja explícito na ER SAT, usa os campos
+                # padrão como um fallback razoável)
+                RespostaSAT.CAMPOS,
+            ])
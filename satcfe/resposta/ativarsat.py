@@ -24,13 +24,18 @@ from builtins import str as text
 
 from ..excecoes import ExcecaoRespostaSAT
 from ..util import base64_to_str
+from .padrao import AnalisadorRetorno
 from .padrao import RespostaSAT
-from .padrao import analisar_retorno
+from .padrao import slots_campos
 
 
 ATIVADO_CORRETAMENTE = '04000'
 CSR_ICPBRASIL_CRIADO_SUCESSO = '04006'
 
+_CAMPOS = RespostaSAT.CAMPOS + (
+        ('CSR', text),
+    )
+
 
 class RespostaAtivarSAT(RespostaSAT):
     """Lida com as respostas da função ``AtivarSAT`` (veja o método
@@ -56,6 +61,10 @@ class RespostaAtivarSAT(RespostaSAT):
 
     """
 
+    CAMPOS_BASE64 = ('CSR',)
+
+    __slots__ = slots_campos(_CAMPOS)
+
     def csr(self):
         """Retorna o CSR (**Certificate Signing Request**) decodificado."""
         return base64_to_str(self.CSR)
@@ -67,26 +76,19 @@ class RespostaAtivarSAT(RespostaSAT):
 
         :param str retorno: Retorno da função ``AtivarSAT``.
         """
-        resposta = analisar_retorno(
-                retorno,
-                funcao='AtivarSAT',
-                classe_resposta=RespostaAtivarSAT,
-                campos=(
-                        ('numeroSessao', int),
-                        ('EEEEE', text),
-                        ('mensagem', text),
-                        ('cod', text),
-                        ('mensagemSEFAZ', text),
-                        ('CSR', text),
-                    ),
-                campos_alternativos=[
-                        # se a ativação falhar espera-se o padrão de campos
-                        # no retorno...
-                        RespostaSAT.CAMPOS,
-                    ]
-            )
+        resposta = _ANALISADOR.analisar(retorno, funcao='AtivarSAT')
         if resposta.EEEEE not in (
                 ATIVADO_CORRETAMENTE,
                 CSR_ICPBRASIL_CRIADO_SUCESSO,):
             raise ExcecaoRespostaSAT(resposta)
         return resposta
+
+
+_ANALISADOR = AnalisadorRetorno(
+        RespostaAtivarSAT,
+        campos=_CAMPOS,
+        campos_alternativos=[
+                # se a ativação falhar espera-se o padrão de campos no
+                # retorno...
+                RespostaSAT.CAMPOS,
+            ])
@@ -20,26 +20,41 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
-import xml.etree.ElementTree as ET
-
 from decimal import Decimal
-from io import StringIO
 
 from builtins import str as text
 
-from satcomum.ersat import dados_qrcode
-
 from ..excecoes import ExcecaoRespostaSAT
 from ..util import as_datetime
-from ..util import base64_to_str
+from .padrao import AnalisadorRetorno
+from .padrao import RespostaComCFe
 from .padrao import RespostaSAT
-from .padrao import analisar_retorno
+from .padrao import slots_campos
 
 
 CANCELADO_COM_SUCESSO = '07000'
 
-
-class RespostaCancelarUltimaVenda(RespostaSAT):
+_CAMPOS = (
+        ('numeroSessao', int),
+        ('EEEEE', text),
+        ('CCCC', text),
+        ('mensagem', text),
+        ('cod', text),
+        ('mensagemSEFAZ', text),
+        ('arquivoCFeBase64', text),
+        ('timeStamp', as_datetime),
+        ('chaveConsulta', text),
+        ('valorTotalCFe', Decimal),
+        ('CPFCNPJValue', text),
+        ('assinaturaQRCODE', text),
+    )
+
+# se o cancelamento falhar apenas os primeiros seis campos especificados na
+# ER deverão ser retornados...
+_CAMPOS_FALHA = _CAMPOS[:6]
+
+
+class RespostaCancelarUltimaVenda(RespostaComCFe):
     """Lida com as respostas da função ``CancelarUltimaVenda`` (veja o método
     :meth:`~satcfe.base.FuncoesSAT.cancelar_ultima_venda`). Os atributos
     esperados em caso de sucesso, são:
@@ -81,26 +96,11 @@ class RespostaCancelarUltimaVenda(RespostaSAT):
 
     """
 
-    def xml(self):
-        """Retorna o XML do CF-e-SAT de cancelamento decodificado.
-
-        :rtype: str
-        """
-        if self._sucesso():
-            return base64_to_str(self.arquivoCFeBase64)
-        else:
-            raise ExcecaoRespostaSAT(self)
+    CAMPOS_BASE64 = ('arquivoCFeBase64',)
 
-    def qrcode(self):
-        """Resulta nos dados que compõem o QRCode.
+    CAMPO_CFE = 'arquivoCFeBase64'
 
-        :rtype: str
-        """
-        if self._sucesso():
-            tree = ET.parse(StringIO(self.xml()))
-            return dados_qrcode(tree)
-        else:
-            raise ExcecaoRespostaSAT(self)
+    __slots__ = slots_campos(_CAMPOS)
 
     def _sucesso(self):
         return self.EEEEE == CANCELADO_COM_SUCESSO
@@ -112,40 +112,18 @@ class RespostaCancelarUltimaVenda(RespostaSAT):
 
         :param str retorno: Retorno da função ``CancelarUltimaVenda``.
         """
-        resposta = analisar_retorno(
-                retorno,
-                funcao='CancelarUltimaVenda',
-                classe_resposta=RespostaCancelarUltimaVenda,
-                campos=(
-                        ('numeroSessao', int),
-                        ('EEEEE', text),
-                        ('CCCC', text),
-                        ('mensagem', text),
-                        ('cod', text),
-                        ('mensagemSEFAZ', text),
-                        ('arquivoCFeBase64', text),
-                        ('timeStamp', as_datetime),
-                        ('chaveConsulta', text),
-                        ('valorTotalCFe', Decimal),
-                        ('CPFCNPJValue', text),
-                        ('assinaturaQRCODE', text),
-                    ),
-                campos_alternativos=[
-                        # se a venda falhar apenas os primeiros seis campos
-                        # especificados na ER deverão ser retornados...
-                        (
-                                ('numeroSessao', int),
-                                ('EEEEE', text),
-                                ('CCCC', text),
-                                ('mensagem', text),
-                                ('cod', text),
-                                ('mensagemSEFAZ', text),
-                        ),
-                        # por via das dúvidas, considera o padrão de campos,
-                        # caso não haja nenhuma coincidência...
-                        RespostaSAT.CAMPOS,
-                    ]
-            )
+        resposta = _ANALISADOR.analisar(retorno, funcao='CancelarUltimaVenda')
         if resposta.EEEEE not in (CANCELADO_COM_SUCESSO,):
             raise ExcecaoRespostaSAT(resposta)
         return resposta
+
+
+_ANALISADOR = AnalisadorRetorno(
+        RespostaCancelarUltimaVenda,
+        campos=_CAMPOS,
+        campos_alternativos=[
+                _CAMPOS_FALHA,
+                # por via das dúvidas, considera o padrão de campos, caso não
+                # haja nenhuma coincidência...
+                RespostaSAT.CAMPOS,
+            ])
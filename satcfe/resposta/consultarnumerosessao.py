@@ -30,8 +30,8 @@ from .cancelarultimavenda import RespostaCancelarUltimaVenda
 from .consultarstatusoperacional import RespostaConsultarStatusOperacional
 from .enviardadosvenda import RespostaEnviarDadosVenda
 from .extrairlogs import RespostaExtrairLogs
+from .padrao import AnalisadorRetorno
 from .padrao import RespostaSAT
-from .padrao import analisar_retorno
 from .testefimafim import RespostaTesteFimAFim
 
 
@@ -64,6 +64,8 @@ class RespostaConsultarNumeroSessao(RespostaSAT):
     :meth:`analisar` deverá resultar na resposta apropriada para cada retorno.
     """
 
+    __slots__ = ()
+
     @staticmethod
     def analisar(retorno):
         """Constrói uma :class:`RespostaSAT` ou especialização dependendo da
@@ -97,10 +99,12 @@ class RespostaConsultarNumeroSessao(RespostaSAT):
 
     @staticmethod
     def _pos_analise(retorno):
-        resposta = analisar_retorno(
+        resposta = _ANALISADOR.analisar(
                 retorno,
-                funcao='ConsultarNumeroSessao',
-                classe_resposta=RespostaConsultarNumeroSessao)
+                funcao='ConsultarNumeroSessao')
         if resposta.EEEEE not in ('11000',):
             raise ExcecaoRespostaSAT(resposta)
         return resposta
+
+
+_ANALISADOR = AnalisadorRetorno(RespostaConsultarNumeroSessao)
@@ -27,8 +27,9 @@ from ..util import as_date
 from ..util import as_datetime
 from ..util import as_datetime_or_none
 from ..util import normalizar_ip
+from .padrao import AnalisadorRetorno
 from .padrao import RespostaSAT
-from .padrao import analisar_retorno
+from .padrao import slots_campos
 
 
 DESBLOQUEADO = 0
@@ -51,6 +52,33 @@ def _stripped_str(s):
     return text(s).strip()
 
 
+_CAMPOS = RespostaSAT.CAMPOS + (
+        ('NSERIE', _stripped_str),
+        ('TIPO_LAN', _stripped_str),
+        ('LAN_IP', normalizar_ip),
+        ('LAN_MAC', text),
+        ('LAN_MASK', normalizar_ip),
+        ('LAN_GW', normalizar_ip),
+        ('LAN_DNS_1', normalizar_ip),
+        ('LAN_DNS_2', normalizar_ip),
+        ('STATUS_LAN', _stripped_str),
+        ('NIVEL_BATERIA', _stripped_str),
+        ('MT_TOTAL', _stripped_str),
+        ('MT_USADA', _stripped_str),
+        ('DH_ATUAL', as_datetime),
+        ('VER_SB', _stripped_str),
+        ('VER_LAYOUT', _stripped_str),
+        ('ULTIMO_CF_E_SAT', _stripped_str),
+        ('LISTA_INICIAL', _stripped_str),
+        ('LISTA_FINAL', _stripped_str),
+        ('DH_CFE', as_datetime_or_none),
+        ('DH_ULTIMA', as_datetime),
+        ('CERT_EMISSAO', as_date),
+        ('CERT_VENCIMENTO', as_date),
+        ('ESTADO_OPERACAO', int),
+    )
+
+
 class RespostaConsultarStatusOperacional(RespostaSAT):
     """Lida com as respostas da função ``ConsultarStatusOperacional`` (veja o
     método :meth:`~satcfe.base.FuncoesSAT.consultar_status_operacional`).
@@ -126,6 +154,8 @@ class RespostaConsultarStatusOperacional(RespostaSAT):
 
     """
 
+    __slots__ = slots_campos(_CAMPOS)
+
     @property
     def status(self):
         """Nome amigável do campo ``ESTADO_OPERACAO``, conforme a "Tabela de
@@ -143,40 +173,18 @@ class RespostaConsultarStatusOperacional(RespostaSAT):
 
         :param str retorno: Retorno da função ``ConsultarStatusOperacional``.
         """
-        resposta = analisar_retorno(
+        resposta = _ANALISADOR.analisar(
                 retorno,
-                funcao='ConsultarStatusOperacional',
-                classe_resposta=RespostaConsultarStatusOperacional,
-                campos=RespostaSAT.CAMPOS + (
-                        ('NSERIE', _stripped_str),
-                        ('TIPO_LAN', _stripped_str),
-                        ('LAN_IP', normalizar_ip),
-                        ('LAN_MAC', text),
-                        ('LAN_MASK', normalizar_ip),
-                        ('LAN_GW', normalizar_ip),
-                        ('LAN_DNS_1', normalizar_ip),
-                        ('LAN_DNS_2', normalizar_ip),
-                        ('STATUS_LAN', _stripped_str),
-                        ('NIVEL_BATERIA', _stripped_str),
-                        ('MT_TOTAL', _stripped_str),
-                        ('MT_USADA', _stripped_str),
-                        ('DH_ATUAL', as_datetime),
-                        ('VER_SB', _stripped_str),
-                        ('VER_LAYOUT', _stripped_str),
-                        ('ULTIMO_CF_E_SAT', _stripped_str),
-                        ('LISTA_INICIAL', _stripped_str),
-                        ('LISTA_FINAL', _stripped_str),
-                        ('DH_CFE', as_datetime_or_none),
-                        ('DH_ULTIMA', as_datetime),
-                        ('CERT_EMISSAO', as_date),
-                        ('CERT_VENCIMENTO', as_date),
-                        ('ESTADO_OPERACAO', int),
-                    ),
-                campos_alternativos=[
-                        # se falhar resultarão apenas os 5 campos padrão
-                        RespostaSAT.CAMPOS,
-                    ]
-            )
+                funcao='ConsultarStatusOperacional')
         if resposta.EEEEE not in ('10000',):
             raise ExcecaoRespostaSAT(resposta)
         return resposta
+
+
+_ANALISADOR = AnalisadorRetorno(
+        RespostaConsultarStatusOperacional,
+        campos=_CAMPOS,
+        campos_alternativos=[
+                # se falhar resultarão apenas os 5 campos padrão
+                RespostaSAT.CAMPOS,
+            ])
@@ -26,8 +26,8 @@ from ..excecoes import ErroRespostaSATInvalida
 from ..excecoes import ExcecaoRespostaSAT
 from .cancelarultimavenda import RespostaCancelarUltimaVenda
 from .enviardadosvenda import RespostaEnviarDadosVenda
+from .padrao import AnalisadorRetorno
 from .padrao import RespostaSAT
-from .padrao import analisar_retorno
 
 
 _RESPOSTAS_POSSIVEIS = (
@@ -47,6 +47,8 @@ class RespostaConsultarUltimaSessaoFiscal(RespostaSAT):
     apropriada para cada retorno.
     """
 
+    __slots__ = ()
+
     @staticmethod
     def analisar(retorno):
         """Constrói uma :class:`RespostaSAT` ou especialização dependendo da
@@ -80,10 +82,12 @@ class RespostaConsultarUltimaSessaoFiscal(RespostaSAT):
 
     @staticmethod
     def _pos_analise(retorno):
-        resposta = analisar_retorno(
+        resposta = _ANALISADOR.analisar(
                 retorno,
-                funcao='ConsultarUltimaSessaoFiscal',
-                classe_resposta=RespostaConsultarUltimaSessaoFiscal)
+                funcao='ConsultarUltimaSessaoFiscal')
         if resposta.EEEEE not in ('19000',):
             raise ExcecaoRespostaSAT(resposta)
         return resposta
+
+
+_ANALISADOR = AnalisadorRetorno(RespostaConsultarUltimaSessaoFiscal)
@@ -20,15 +20,24 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import codecs
 import os
 import tempfile
+import zlib
 
 from builtins import str as text
 
 from ..excecoes import ExcecaoRespostaSAT
+from ..util import base64_to_chunks
 from ..util import base64_to_str
+from .padrao import AnalisadorRetorno
 from .padrao import RespostaSAT
-from .padrao import analisar_retorno
+from .padrao import slots_campos
+
+
+_CAMPOS = RespostaSAT.CAMPOS + (
+        ('arquivoLog', text),
+    )
 
 
 class RespostaExtrairLogs(RespostaSAT):
@@ -55,6 +64,10 @@ class RespostaExtrairLogs(RespostaSAT):
 
     """
 
+    CAMPOS_BASE64 = ('arquivoLog',)
+
+    __slots__ = slots_campos(_CAMPOS)
+
     def conteudo(self):
         """Retorna o conteúdo do log decodificado."""
         return base64_to_str(self.arquivoLog)
@@ -62,10 +75,15 @@ class RespostaExtrairLogs(RespostaSAT):
     def salvar(
             self,
             destino=None,
-            prefix='tmp', suffix='-sat.log', dir=None,
-            encoding='utf-8', encoding_errors='strict'):
+            prefix='tmp', suffix=None, dir=None,
+            encoding='utf-8', encoding_errors='strict',
+            compactar=False):
         """Salva o arquivo de log decodificado.
 
+        O log é decodificado de Base64 e escrito em blocos (veja
+        :meth:`escrever`), sem que o conteúdo completo seja mantido em
+        memória, o que é importante para os logs de vários megabytes.
+
         :param str destino: Opcional. Caminho completo para o arquivo onde os
             dados dos logs deverão ser salvos. Se não informado, será criado
             um arquivo temporário via :func:`tempfile.mkstemp`.
@@ -74,7 +92,8 @@ class RespostaExtrairLogs(RespostaSAT):
             informado será usado ``"tmp"``.
 
         :param str suffix: Opcional. Sufixo para o nome do arquivo. Se não
-            informado será usado ``"-sat.log"``.
+            informado será usado ``"-sat.log"`` (ou ``"-sat.log.gz"``, se o
+            log for compactado).
 
         :param dir: Opcional. Contém o caminho completo onde o arquivo
             temporário deverá ser criado. Este argumento terá efeito apenas
@@ -86,34 +105,93 @@ class RespostaExtrairLogs(RespostaSAT):
             método :meth:`str.encode` para detalhes.
 
         :param str encoding_errors: Opcional. Como lidar com os erros de
-            codificação de caracteres. Padrão é ``"strict"``. Veja o método
-            :meth:`str.encode` para detalhes.
+            codificação de caracteres, tanto na decodificação do log (que
+            deve estar em UTF-8) quanto na codificação para ``encoding``.
+            Padrão é ``"strict"``, quando um log que não esteja em UTF-8
+            resulta em :exc:`UnicodeDecodeError` (e parte do log pode já ter
+            sido escrita). Veja o método :meth:`str.encode` para detalhes.
 
+        :param bool compactar: Opcional. Se o log deverá ser compactado no
+            formato gzip. Padrão é ``False``.
 
         :return: Retorna o caminho completo para o arquivo salvo.
         :rtype: str
 
-        :raises FileExistsError: Se o destino informado já existir.
+        :raises FileExistsError: Se o destino informado já existir (em
+            Python 2, :exc:`OSError` com ``errno.EEXIST``).
         """
         if destino:
-            if os.path.exists(destino):
-                raise FileExistsError(destino)
+            # O_EXCL garante que um arquivo existente não seja sobrescrito
             fd = os.open(destino, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
         else:
+            if suffix is None:
+                suffix = '-sat.log.gz' if compactar else '-sat.log'
             fd, destino = tempfile.mkstemp(
                     dir=dir,
                     prefix=prefix,
                     suffix=suffix)
 
-        # converte conteúdo str (unicode) para bytes antes de escrever
-        dados = self.conteudo().encode(encoding, errors=encoding_errors)
-
-        os.write(fd, dados)
-        os.fsync(fd)
-        os.close(fd)
+        try:
+            self.escrever(
+                    fd,
+                    encoding=encoding,
+                    encoding_errors=encoding_errors,
+                    compactar=compactar)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
 
         return destino
 
+    def escrever(
+            self,
+            destino,
+            encoding='utf-8', encoding_errors='strict',
+            compactar=False,
+            tamanho_bloco=65536):
+        """Escreve o log decodificado em um descritor de arquivo ou em um
+        objeto com o método ``write`` (eg. um arquivo aberto em modo binário
+        ou um *socket* via :meth:`socket.socket.makefile`), decodificando o
+        log de Base64 em blocos (veja :func:`~satcfe.util.base64_to_chunks`).
+        A memória usada é limitada ao tamanho dos blocos, independentemente
+        do tamanho do log.
+
+        :param destino: Um descritor de arquivo (``int``), aberto para
+            escrita, ou um objeto com o método ``write`` que aceite bytes.
+            O destino não é fechado.
+
+        :param str encoding: Opcional. Veja :meth:`salvar`.
+
+        :param str encoding_errors: Opcional. Veja :meth:`salvar`.
+
+        :param bool compactar: Opcional. Veja :meth:`salvar`.
+
+        :param int tamanho_bloco: Opcional. Número de caracteres Base64
+            decodificados de cada vez.
+
+        :return: O número de bytes escritos no destino.
+        :rtype: int
+        """
+        blocos = base64_to_chunks(self.arquivoLog, chunk_size=tamanho_bloco)
+
+        if codecs.lookup(encoding).name == 'utf-8' \
+                and encoding_errors == 'strict':
+            # o log decodificado de Base64 já está em UTF-8 e os blocos são
+            # escritos como estão, apenas validados
+            blocos = _validar(blocos)
+        else:
+            # recodifica cada bloco, mantendo os caracteres multibyte
+            # divididos entre blocos e tratando os erros como solicitado
+            blocos = _recodificar(blocos, encoding, encoding_errors)
+
+        if compactar:
+            blocos = _compactar(blocos)
+
+        escritos = 0
+        for bloco in blocos:
+            escritos += _escrever(destino, bloco)
+        return escritos
+
     @staticmethod
     def analisar(retorno):
         """Constrói uma :class:`RespostaExtrairLogs` a partir do retorno
@@ -121,19 +199,64 @@ class RespostaExtrairLogs(RespostaSAT):
 
         :param str retorno: Retorno da função ``ExtrairLogs``.
         """
-        resposta = analisar_retorno(
-                retorno,
-                funcao='ExtrairLogs',
-                classe_resposta=RespostaExtrairLogs,
-                campos=RespostaSAT.CAMPOS + (
-                        ('arquivoLog', text),
-                    ),
-                campos_alternativos=[
-                        # se a extração dos logs falhar espera-se o padrão de
-                        # campos no retorno...
-                        RespostaSAT.CAMPOS,
-                    ]
-            )
+        resposta = _ANALISADOR.analisar(retorno, funcao='ExtrairLogs')
         if resposta.EEEEE not in ('15000',):
             raise ExcecaoRespostaSAT(resposta)
         return resposta
+
+
+_ANALISADOR = AnalisadorRetorno(
+        RespostaExtrairLogs,
+        campos=_CAMPOS,
+        campos_alternativos=[
+                # se a extração dos logs falhar espera-se o padrão de campos
+                # no retorno...
+                RespostaSAT.CAMPOS,
+            ])
+
+
+def _validar(blocos):
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    for bloco in blocos:
+        decodificador.decode(bloco)
+        yield bloco
+    decodificador.decode(b'', final=True)
+
+
+def _recodificar(blocos, encoding, encoding_errors):
+    decodificador = codecs.getincrementaldecoder('utf-8')(encoding_errors)
+    for bloco in blocos:
+        yield decodificador.decode(bloco).encode(encoding, encoding_errors)
+    yield decodificador.decode(b'', final=True).encode(
+            encoding,
+            encoding_errors)
+
+
+def _compactar(blocos):
+    # zlib com wbits=31 resulta em um fluxo no formato gzip
+    compactador = zlib.compressobj(
+            zlib.Z_DEFAULT_COMPRESSION,
+            zlib.DEFLATED,
+            16 + zlib.MAX_WBITS)
+    for bloco in blocos:
+        yield compactador.compress(bloco)
+    yield compactador.flush()
+
+
+def _escrever(destino, dados):
+    # tanto os.write quanto o método write de objetos sem buffer podem
+    # escrever apenas parte dos dados
+    if hasattr(destino, 'write'):
+        # os objetos recebem bytes: em Python 2, os arquivos escreveriam a
+        # representação de um memoryview (eg. "<memory at 0x...>")
+        restante = dados
+        while restante:
+            escritos = destino.write(restante)
+            if escritos is None:
+                break  # objetos com buffer escrevem tudo (None em Python 2)
+            restante = restante[escritos:]
+    else:
+        visao = memoryview(dados)
+        while visao:
+            visao = visao[os.write(destino, visao):]
+    return len(dados)
@@ -20,10 +20,30 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import xml.etree.ElementTree as ET
+
+from decimal import Decimal
+
 from builtins import str as text
 
+import six
+
+from satcomum.ersat import dados_qrcode
+
+from .. import instrumentacao
 from ..excecoes import ExcecaoRespostaSAT
 from ..excecoes import ErroRespostaSATInvalida
+from ..util import RetornoBytes
+from ..util import base64_to_str
+
+
+IMEDIATA = 'imediata'
+"""Os campos são convertidos durante a análise do retorno (padrão)."""
+
+SOB_DEMANDA = 'sob-demanda'
+"""Os campos são convertidos no primeiro acesso ao atributo."""
+
+CONVERSOES = (IMEDIATA, SOB_DEMANDA)
 
 
 class RespostaSAT(object):
@@ -48,6 +68,15 @@ class RespostaSAT(object):
         resposta.atributos.funcao
         resposta.atributos.verbatim
 
+    Os campos das respostas são mantidos em ``__slots__``. As especializações
+    devem declarar os ``__slots__`` dos seus campos adicionais (veja
+    :func:`slots_campos`) e, para a análise dos retornos, compilar um
+    :class:`AnalisadorRetorno` uma única vez. Outros atributos, que não
+    sejam campos declarados, continuam sendo aceitos e são mantidos no
+    ``__dict__`` da instância, criado apenas quando necessário. Os campos
+    podem ser convertidos apenas quando acessados (veja
+    :meth:`definir_conversao`).
+
     Esta classe fornece uma série de métodos construtores (*factory methods*)
     para respostas que são comuns. Para as respostas que não são comuns,
     existem especializações desta classe.
@@ -90,6 +119,20 @@ class RespostaSAT(object):
     o tipo Python, a partir da resposta original.
     """
 
+    CAMPOS_BASE64 = ()
+    """Campos contendo dados em Base64 que, quando o retorno for um
+    :class:`~satcfe.util.RetornoBytes`, são mantidos como fatias
+    ``memoryview`` do retorno original, em vez de decodificados.
+    """
+
+    __slots__ = tuple(campo for campo, _ in CAMPOS) + (
+            'atributos',
+            '_pendentes',
+            '__dict__',
+        )
+
+    _conversao = IMEDIATA
+
     def __init__(self, **kwargs):
         super(RespostaSAT, self).__init__()
         for key, value in kwargs.items():
@@ -100,12 +143,64 @@ class RespostaSAT(object):
         # self.atributos.verbatim = None
         self.atributos = None
 
+    def __getattr__(self, nome):
+        # invocado apenas para os atributos ainda não definidos, isto é, os
+        # campos ainda não convertidos de uma resposta analisada sob demanda
+        if nome != '_pendentes':
+            pendentes = getattr(self, '_pendentes', None)
+            if pendentes is not None and nome in pendentes.campos:
+                valor = pendentes.converter(nome)
+                setattr(self, nome, valor)
+                return valor
+        raise AttributeError('{!r} object has no attribute {!r}'.format(
+                self.__class__.__name__, nome))
+
+    @classmethod
+    def definir_conversao(cls, tipo):
+        """Define quando os campos das respostas são convertidos. Quando
+        invocado a partir de :class:`RespostaSAT`, define a conversão de
+        todas as respostas que não tenham sua própria definição; a partir de
+        uma especialização, define a conversão apenas daquela resposta (e
+        suas especializações).
+
+        :param str tipo: Uma das constantes :attr:`IMEDIATA` ou
+            :attr:`SOB_DEMANDA`. Para uma especialização, use ``None`` para
+            voltar a seguir a definição de :class:`RespostaSAT`.
+
+        Na conversão sob demanda, a resposta mantém as partes do retorno e
+        converte cada campo apenas no primeiro acesso ao atributo, mantendo o
+        valor convertido para os acessos seguintes. Uma consulta periódica
+        que verifique apenas alguns campos deixa de converter todos os
+        demais:
+
+        .. sourcecode:: python
+
+            RespostaConsultarStatusOperacional.definir_conversao(SOB_DEMANDA)
+
+            resposta = cliente.consultar_status_operacional()
+            if resposta.ESTADO_OPERACAO == DESBLOQUEADO:
+                # apenas numeroSessao, EEEEE e ESTADO_OPERACAO convertidos
+                ...
+
+        Note que, sob demanda, um campo com um valor que não possa ser
+        convertido resultará em erro apenas quando o atributo for acessado.
+        Especializações que definam o próprio método ``__init__`` continuam
+        tendo os campos convertidos imediatamente.
+        """
+        if tipo is None and cls is not RespostaSAT:
+            if '_conversao' in cls.__dict__:
+                del cls._conversao
+            return
+        if tipo not in CONVERSOES:
+            raise ValueError('Conversao desconhecida: {!r}'.format(tipo))
+        cls._conversao = tipo
+
     @staticmethod
     def comunicar_certificado_icpbrasil(retorno):
         """Constrói uma :class:`RespostaSAT` para o retorno da função
         :meth:`~satcfe.base.FuncoesSAT.comunicar_certificado_icpbrasil`.
         """
-        resposta = analisar_retorno(
+        resposta = _PADRAO.analisar(
                 retorno,
                 funcao='ComunicarCertificadoICPBRASIL')
         if resposta.EEEEE not in ('05000',):
@@ -117,7 +212,7 @@ class RespostaSAT(object):
         """Constrói uma :class:`RespostaSAT` para o retorno da função
         :meth:`~satcfe.base.FuncoesSAT.consultar_sat`.
         """
-        resposta = analisar_retorno(retorno, funcao='ConsultarSAT')
+        resposta = _PADRAO.analisar(retorno, funcao='ConsultarSAT')
         if resposta.EEEEE not in ('08000',):
             raise ExcecaoRespostaSAT(resposta)
         return resposta
@@ -127,7 +222,7 @@ class RespostaSAT(object):
         """Constrói uma :class:`RespostaSAT` para o retorno da função
         :meth:`~satcfe.base.FuncoesSAT.configurar_interface_de_rede`.
         """
-        resposta = analisar_retorno(
+        resposta = _PADRAO.analisar(
                 retorno,
                 funcao='ConfigurarInterfaceDeRede')
         if resposta.EEEEE not in ('12000',):
@@ -139,7 +234,7 @@ class RespostaSAT(object):
         """Constrói uma :class:`RespostaSAT` para o retorno da função
         :meth:`~satcfe.base.FuncoesSAT.atualizar_software_sat`.
         """
-        resposta = analisar_retorno(retorno, funcao='AtualizarSoftwareSAT')
+        resposta = _PADRAO.analisar(retorno, funcao='AtualizarSoftwareSAT')
         if resposta.EEEEE not in ('14000',):
             raise ExcecaoRespostaSAT(resposta)
         return resposta
@@ -149,7 +244,7 @@ class RespostaSAT(object):
         """Constrói uma :class:`RespostaSAT` para o retorno da função
         :meth:`~satcfe.base.FuncoesSAT.bloquear_sat`.
         """
-        resposta = analisar_retorno(retorno, funcao='BloquearSAT')
+        resposta = _PADRAO.analisar(retorno, funcao='BloquearSAT')
         if resposta.EEEEE not in ('16000',):
             raise ExcecaoRespostaSAT(resposta)
         return resposta
@@ -159,7 +254,7 @@ class RespostaSAT(object):
         """Constrói uma :class:`RespostaSAT` para o retorno da função
         :meth:`~satcfe.base.FuncoesSAT.desbloquear_sat`.
         """
-        resposta = analisar_retorno(retorno, funcao='DesbloquearSAT')
+        resposta = _PADRAO.analisar(retorno, funcao='DesbloquearSAT')
         if resposta.EEEEE not in ('17000',):
             raise ExcecaoRespostaSAT(resposta)
         return resposta
@@ -169,12 +264,225 @@ class RespostaSAT(object):
         """Constrói uma :class:`RespostaSAT` para o retorno da função
         :meth:`~satcfe.base.FuncoesSAT.trocar_codigo_de_ativacao`.
         """
-        resposta = analisar_retorno(retorno, funcao='TrocarCodigoDeAtivacao')
+        resposta = _PADRAO.analisar(
+                retorno,
+                funcao='TrocarCodigoDeAtivacao')
         if resposta.EEEEE not in ('18000',):
             raise ExcecaoRespostaSAT(resposta)
         return resposta
 
 
+class RespostaComCFe(RespostaSAT):
+    """Base para as respostas que, em caso de sucesso, contém o XML de um
+    CF-e codificado em Base64 (veja o atributo :attr:`CAMPO_CFE`).
+
+    O XML decodificado e a sua árvore são obtidos uma única vez e mantidos na
+    própria resposta, de modo que :meth:`xml`, :meth:`qrcode`,
+    :meth:`arvore` e os acessores dos campos mais comuns (:meth:`chave`,
+    :meth:`valor_total` e :meth:`quantidade_itens`) compartilhem o mesmo
+    resultado. Use :meth:`liberar` para descartá-los, quando a resposta for
+    mantida por mais tempo que o necessário para o seu processamento.
+
+    As especializações devem implementar o método ``_sucesso``.
+    """
+
+    __slots__ = ('_xml', '_arvore')
+
+    CAMPO_CFE = None
+    """Nome do campo que contém o XML do CF-e codificado em Base64."""
+
+    def xml(self):
+        """Retorna o XML do CF-e-SAT decodificado de Base64.
+
+        :rtype: str
+        """
+        if not self._sucesso():
+            raise ExcecaoRespostaSAT(self)
+        xml = self._cache('_xml')
+        if xml is None:
+            xml = base64_to_str(getattr(self, self.CAMPO_CFE))
+            self._xml = xml
+        return xml
+
+    def arvore(self):
+        """Retorna a árvore do XML do CF-e-SAT.
+
+        :rtype: xml.etree.ElementTree.ElementTree
+        """
+        arvore = self._cache('_arvore')
+        if arvore is None:
+            arvore = ET.ElementTree(ET.fromstring(self.xml()))
+            self._arvore = arvore
+        return arvore
+
+    def qrcode(self):
+        """Resulta nos dados que compõem o QRCode.
+
+        :rtype: str
+        """
+        return dados_qrcode(self.arvore())
+
+    def chave(self):
+        """Retorna a chave do CF-e (atributo ``Id`` do grupo ``infCFe``,
+        incluindo o prefixo ``CFe``).
+
+        :rtype: str
+        """
+        return self._infCFe().attrib['Id']
+
+    def valor_total(self):
+        """Retorna o valor total do CF-e (``vCFe``).
+
+        :rtype: decimal.Decimal
+        """
+        return Decimal(self._infCFe().findtext('total/vCFe'))
+
+    def quantidade_itens(self):
+        """Retorna o número de itens (``det``) do CF-e. O CF-e de
+        cancelamento não possui itens.
+
+        :rtype: int
+        """
+        return len(self._infCFe().findall('det'))
+
+    def liberar(self):
+        """Descarta o XML decodificado e a sua árvore, mantidos pela resposta.
+        Serão obtidos novamente se forem requisitados.
+        """
+        self._xml = None
+        self._arvore = None
+
+    def _infCFe(self):
+        return self.arvore().getroot().find('infCFe')
+
+    def _cache(self, nome):
+        try:
+            return getattr(self, nome)
+        except AttributeError:
+            return None
+
+    def _sucesso(self):
+        raise NotImplementedError()
+
+
+class AnalisadorRetorno(object):
+    """Analisador dos retornos de uma função SAT, compilado uma única vez
+    para a classe de resposta e as relações de campos esperadas (veja
+    :func:`analisar_retorno` para a descrição dos argumentos).
+
+    Para cada relação de campos são preparados, uma única vez, os nomes e
+    conversores dos campos, que são atribuídos diretamente aos ``__slots__``
+    da resposta, sem o dicionário de argumentos intermediário. A relação a
+    ser usada é selecionada pelo número de campos do retorno, em uma única
+    consulta:
+
+    .. sourcecode:: python
+
+        analisador = AnalisadorRetorno(
+                RespostaEnviarDadosVenda,
+                campos=campos_sucesso,
+                campos_alternativos=[campos_falha, RespostaSAT.CAMPOS])
+
+        for retorno in retornos_arquivados:
+            resposta = analisador.analisar(retorno, funcao='EnviarDadosVenda')
+
+    Os campos para os quais a classe de resposta não declare ``__slots__``
+    são mantidos no ``__dict__`` da resposta.
+    """
+
+    __slots__ = ('_classe', '_esperados', '_relacoes')
+
+    def __init__(
+            self,
+            classe_resposta=RespostaSAT,
+            campos=RespostaSAT.CAMPOS,
+            campos_alternativos=()):
+        relacoes = [_relacao(campos)] + [
+                _relacao(r) for r in campos_alternativos]
+        self._classe = classe_resposta
+        self._esperados = len(relacoes[0])
+        self._relacoes = {}
+        for relacao in relacoes:
+            # assim como na análise original, prevalece a primeira relação
+            # com o número de campos encontrado no retorno
+            if len(relacao) not in self._relacoes:
+                self._relacoes[len(relacao)] = _compilar(
+                        classe_resposta, relacao) + (
+                        _campos_sob_demanda(classe_resposta, relacao),)
+
+    @property
+    def classe_resposta(self):
+        """A classe das respostas resultantes."""
+        return self._classe
+
+    def analisar(self, retorno, funcao=None, manter_verbatim=True):
+        """Analisa o retorno (veja :func:`analisar_retorno`).
+
+        :rtype: satcfe.resposta.padrao.RespostaSAT
+        """
+        if not instrumentacao.ativa():
+            return self._analisar(retorno, funcao, manter_verbatim)
+
+        inicio = instrumentacao.relogio()
+        try:
+            resposta = self._analisar(retorno, funcao, manter_verbatim)
+        except Exception as ex:
+            instrumentacao.emitir(
+                    instrumentacao.ANALISAR,
+                    funcao,
+                    instrumentacao.relogio() - inicio,
+                    tamanho_retorno=len(retorno),
+                    erro=ex)
+            raise
+
+        instrumentacao.emitir(
+                instrumentacao.ANALISAR,
+                funcao,
+                instrumentacao.relogio() - inicio,
+                tamanho_retorno=len(retorno),
+                numero_sessao=getattr(resposta, 'numeroSessao', None),
+                EEEEE=getattr(resposta, 'EEEEE', None))
+
+        return resposta
+
+    def _analisar(self, retorno, funcao, manter_verbatim):
+        if '|' not in retorno:
+            raise ErroRespostaSATInvalida((
+                    'Resposta não possui pipes separando os campos: {!r}'
+                ).format(retorno))
+
+        binario = isinstance(retorno, RetornoBytes)
+        partes = retorno.partes() if binario else retorno.split('|')
+
+        try:
+            analisar_texto, analisar_binario, campos = \
+                self._relacoes[len(partes)]
+        except KeyError:
+            raise ErroRespostaSATInvalida((
+                    'Resposta não possui o número esperado de campos. '
+                    'Esperados {:d} campos, mas contém {:d}: {!r}'
+                ).format(self._esperados, len(partes), retorno))
+
+        if manter_verbatim:
+            verbatim = retorno.dados if binario else retorno
+        else:
+            verbatim = None
+        atributos = RespostaSAT.Atributos(funcao=funcao, verbatim=verbatim)
+
+        if campos is not None and self._classe._conversao == SOB_DEMANDA:
+            resposta = object.__new__(self._classe)
+            resposta.atributos = atributos
+            resposta._pendentes = _CamposPendentes(
+                    partes,
+                    campos,
+                    retorno.decodificar if binario else None)
+            return resposta
+
+        if binario:
+            return analisar_binario(partes, atributos, retorno.decodificar)
+        return analisar_texto(partes, atributos)
+
+
 def analisar_retorno(
         retorno,
         classe_resposta=RespostaSAT,
@@ -187,9 +495,16 @@ def analisar_retorno(
     separados entre si através de pipes e o número de campos deverá coincidir
     com os campos especificados.
 
+    O :class:`AnalisadorRetorno` para a classe de resposta e os campos
+    informados é compilado na primeira análise e mantido para as análises
+    seguintes (até um limite de combinações de classe e campos, quando os
+    analisadores mantidos são descartados). Quem analisa grandes volumes de
+    retornos pode construir o próprio :class:`AnalisadorRetorno`, evitando
+    até mesmo a busca pelo analisador já compilado.
+
     :param str retorno: O conteúdo da resposta retornada pela função da
         biblioteca do fabricante do equipamento SAT, que espera-se que seja um
-        dado Unicode.
+        dado Unicode ou um :class:`~satcfe.util.RetornoBytes`.
 
     :param type classe_resposta: O tipo :class:`RespostaSAT` ou especialização
         que irá representar o retorno, após sua decomposição em campos.
@@ -218,40 +533,145 @@ def analisar_retorno(
     :rtype: satcfe.resposta.padrao.RespostaSAT
 
     """
-    if '|' not in retorno:
-        raise ErroRespostaSATInvalida((
-                'Resposta não possui pipes separando os campos: {!r}'
-            ).format(retorno))
-
-    partes = retorno.split('|')
-
-    if len(partes) != len(campos):
-        # procura por uma relação alternativa de campos do retorno
-        for relacao_alternativa in campos_alternativos:
-            if len(partes) == len(relacao_alternativa):
-                relacao_campos = relacao_alternativa
-                break
-        else:
-            raise ErroRespostaSATInvalida((
-                    'Resposta não possui o número esperado de campos. '
-                    'Esperados {:d} campos, mas contém {:d}: {!r}'
-                ).format(len(campos), len(partes), retorno))
-    else:
-        relacao_campos = campos
+    campos = _relacao(campos)
+    campos_alternativos = tuple(_relacao(r) for r in campos_alternativos)
+    chave = (classe_resposta, campos, campos_alternativos)
+    try:
+        analisador = _ANALISADORES.get(chave)
+    except TypeError:
+        analisador = chave = None  # conversores não "hashable"
+    if analisador is None:
+        analisador = AnalisadorRetorno(
+                classe_resposta,
+                campos=campos,
+                campos_alternativos=campos_alternativos)
+        if chave is not None:
+            # as operações sobre o dicionário são atômicas; a memória é
+            # simplesmente esvaziada quando a capacidade é atingida (eg.
+            # conversores criados a cada análise, como funções lambda)
+            if len(_ANALISADORES) >= _CAPACIDADE_ANALISADORES:
+                _ANALISADORES.clear()
+            analisador = _ANALISADORES.setdefault(chave, analisador)
+    return analisador.analisar(
+            retorno,
+            funcao=funcao,
+            manter_verbatim=manter_verbatim)
+
 
-    resultado = {}
+def slots_campos(*relacoes):
+    """Resulta nos nomes dos campos das relações informadas que ainda não são
+    atributos de :class:`RespostaSAT`, para compor os ``__slots__`` das
+    especializações.
 
-    def _enumerate(sequence):
-        for index, value in enumerate(sequence):
-            yield index, value[0], value[1]
+    :rtype: tuple
+    """
+    nomes = []
+    for relacao in relacoes:
+        for campo, _ in relacao:
+            if campo not in RespostaSAT.__slots__ and campo not in nomes:
+                nomes.append(campo)
+    return tuple(nomes)
+
+
+_CAPACIDADE_ANALISADORES = 64
+
+_ANALISADORES = {}
+
+
+def _relacao(campos):
+    # a relação de campos como uma tupla de pares (campo, conversor), ainda
+    # que especificada através de listas (eg. [['numeroSessao', int], ...])
+    return tuple((campo, conversor) for campo, conversor in campos)
+
+
+def _inicializacao_padrao(classe_resposta):
+    # em Python 2, cada acesso a um método resulta em um novo objeto
+    # (unbound method), de modo que são comparadas as próprias funções
+    return six.get_unbound_function(classe_resposta.__init__) is \
+        six.get_unbound_function(RespostaSAT.__init__)
+
+
+class _CamposPendentes(object):
+    # as partes do retorno de uma resposta analisada sob demanda, com os
+    # índices e conversores dos campos (veja RespostaSAT.__getattr__)
+
+    __slots__ = ('partes', 'campos', 'decodificar')
+
+    def __init__(self, partes, campos, decodificar):
+        self.partes = partes
+        self.campos = campos
+        self.decodificar = decodificar
+
+    def converter(self, nome):
+        indice, conversor, base64 = self.campos[nome]
+        parte = self.partes[indice]
+        if self.decodificar is None:
+            return conversor(parte)
+        elif base64:
+            return parte
+        return conversor(self.decodificar(parte))
+
+
+def _campos_sob_demanda(classe_resposta, relacao):
+    if not _inicializacao_padrao(classe_resposta):
+        return None  # a especialização espera todos os campos no __init__
+    campos_base64 = classe_resposta.CAMPOS_BASE64
+    campos = {}
+    for indice, (campo, conversor) in enumerate(relacao):
+        campos[campo] = (indice, conversor, campo in campos_base64)
+    return campos
+
+
+def _compilar(classe_resposta, relacao):
+    # prepara duas funções para a relação de campos, uma para o retorno como
+    # texto e outra para o retorno em modo bytes (RetornoBytes), onde os
+    # campos em Base64 são mantidos como fatias memoryview; as funções são
+    # closures sobre as relações abaixo, resolvidas uma única vez
+    texto = tuple(
+            # str() sobre as partes de str.split() resulta no próprio objeto
+            (campo, None if conversor is text and text is str else conversor)
+            for campo, conversor in relacao)
+
+    binario = tuple(
+            (campo, conversor, campo in classe_resposta.CAMPOS_BASE64)
+            for campo, conversor in relacao)
+
+    if not _inicializacao_padrao(classe_resposta):
+        # a especialização espera todos os campos como argumentos do __init__
+        def analisar_texto(partes, atributos):
+            resposta = classe_resposta(**dict(
+                    (campo, parte if conversor is None else conversor(parte))
+                    for (campo, conversor), parte in zip(texto, partes)))
+            resposta.atributos = atributos
+            return resposta
+
+        def analisar_binario(partes, atributos, decodificar):
+            resposta = classe_resposta(**dict(
+                    (campo, parte if base64 else conversor(decodificar(parte)))
+                    for (campo, conversor, base64), parte in zip(
+                            binario, partes)))
+            resposta.atributos = atributos
+            return resposta
+
+        return analisar_texto, analisar_binario
+
+    def analisar_texto(partes, atributos, nova=object.__new__):
+        resposta = nova(classe_resposta)
+        for (campo, conversor), parte in zip(texto, partes):
+            setattr(resposta, campo,
+                    parte if conversor is None else conversor(parte))
+        resposta.atributos = atributos
+        return resposta
 
-    for indice, campo, conversor in _enumerate(relacao_campos):
-        resultado[campo] = conversor(partes[indice])
+    def analisar_binario(partes, atributos, decodificar, nova=object.__new__):
+        resposta = nova(classe_resposta)
+        for (campo, conversor, base64), parte in zip(binario, partes):
+            setattr(resposta, campo,
+                    parte if base64 else conversor(decodificar(parte)))
+        resposta.atributos = atributos
+        return resposta
+
+    return analisar_texto, analisar_binario
 
-    verbatim = retorno if manter_verbatim else None
-    resposta = classe_resposta(**resultado)
-    resposta.atributos = RespostaSAT.Atributos(
-            funcao=funcao,
-            verbatim=verbatim)
 
-    return resposta
+_PADRAO = AnalisadorRetorno()
@@ -20,25 +20,27 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
-import xml.etree.ElementTree as ET
-
-from io import StringIO
-
 from builtins import str as text
 
-from satcomum.ersat import dados_qrcode
-
 from ..excecoes import ExcecaoRespostaSAT
 from ..util import as_datetime
-from ..util import base64_to_str
+from .padrao import AnalisadorRetorno
+from .padrao import RespostaComCFe
 from .padrao import RespostaSAT
-from .padrao import analisar_retorno
+from .padrao import slots_campos
 
 
 EMITIDO_COM_SUCESSO = '09000'
 
+_CAMPOS = RespostaSAT.CAMPOS + (
+        ('arquivoCFeBase64', text),
+        ('timeStamp', as_datetime),
+        ('numDocFiscal', int),
+        ('chaveConsulta', text),
+    )
 
-class RespostaTesteFimAFim(RespostaSAT):
+
+class RespostaTesteFimAFim(RespostaComCFe):
     """Lida com as respostas da função ``TesteFimAFim`` (veja o método
     :meth:`~satcfe.base.FuncoesSAT.teste_fim_a_fim`). Os atributos
     esperados em caso de sucesso, são:
@@ -65,26 +67,11 @@ class RespostaTesteFimAFim(RespostaSAT):
 
     """
 
-    def xml(self):
-        """Retorna o XML do CF-e-SAT decodificado.
+    CAMPOS_BASE64 = ('arquivoCFeBase64',)
 
-        :rtype: str
-        """
-        if self._sucesso():
-            return base64_to_str(self.arquivoCFeBase64)
-        else:
-            raise ExcecaoRespostaSAT(self)
+    CAMPO_CFE = 'arquivoCFeBase64'
 
-    def qrcode(self):
-        """Resulta nos dados que compõem o QRCode.
-
-        :rtype: str
-        """
-        if self._sucesso():
-            tree = ET.parse(StringIO(self.xml()))
-            return dados_qrcode(tree)
-        else:
-            raise ExcecaoRespostaSAT(self)
+    __slots__ = slots_campos(_CAMPOS)
 
     def _sucesso(self):
         return self.EEEEE == EMITIDO_COM_SUCESSO
@@ -99,25 +86,15 @@ class RespostaTesteFimAFim(RespostaSAT):
         :raises ExcecaoRespostaSAT: Se o atributo ``EEEEE`` não indicar o
             código de sucesso ``09000`` para ``TesteFimAFim``.
         """
-        resposta = analisar_retorno(
-                retorno,
-                funcao='TesteFimAFim',
-                classe_resposta=RespostaTesteFimAFim,
-                campos=(
-                        ('numeroSessao', int),
-                        ('EEEEE', text),
-                        ('mensagem', text),
-                        ('cod', text),
-                        ('mensagemSEFAZ', text),
-                        ('arquivoCFeBase64', text),
-                        ('timeStamp', as_datetime),
-                        ('numDocFiscal', int),
-                        ('chaveConsulta', text),
-                    ),
-                campos_alternativos=[
-                        RespostaSAT.CAMPOS,
-                    ]
-            )
+        resposta = _ANALISADOR.analisar(retorno, funcao='TesteFimAFim')
         if resposta.EEEEE not in (EMITIDO_COM_SUCESSO,):
             raise ExcecaoRespostaSAT(resposta)
         return resposta
+
+
+_ANALISADOR = AnalisadorRetorno(
+        RespostaTesteFimAFim,
+        campos=_CAMPOS,
+        campos_alternativos=[
+                RespostaSAT.CAMPOS,
+            ])
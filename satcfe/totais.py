@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+#
+# satcfe/totais.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+"""Cálculo local dos totais do CF-e de venda.
+
+O equipamento SAT calcula os totais do CF-e (grupos ``ICMSTot`` e
+``ISSQNTot``) e resulta no valor total (``valorTotalCFe``) apenas na resposta
+à função ``EnviarDadosVenda``. Os mesmos totais podem ser previstos localmente,
+antes do envio, de modo que uma venda inconsistente (eg. com pagamentos
+insuficientes) seja rejeitada sem a necessidade de uma chamada ao equipamento:
+
+.. sourcecode:: python
+
+    totais = cfe.totais()  # veja CFeVenda.totais()
+    print(totais.vCFe, totais.vTroco)
+
+    # ou, diretamente no envio, resultando em ErroTotaisInconsistentes
+    cliente.enviar_dados_venda(cfe, verificar_totais=True)
+
+Os cálculos são feitos em um contexto decimal próprio (:data:`CONTEXTO`), que
+não depende do contexto da *thread* corrente, com os valores arredondados em
+duas casas decimais conforme a regra de arredondamento da norma ABNT NBR 5891
+(equivalente a :data:`decimal.ROUND_HALF_EVEN`).
+
+.. note::
+
+    Os totais pressupõem entidades válidas (veja
+    :meth:`~satcfe.entidades.Entidade.validar`). O rateio do desconto ou
+    acréscimo sobre o subtotal entre os itens (``vRatDesc`` e ``vRatAcr``)
+    não é calculado, já que não afeta o valor total do CF-e.
+
+"""
+
+import decimal
+
+from collections import namedtuple
+from decimal import Decimal
+
+
+CONTEXTO = decimal.Context(
+        prec=28,
+        rounding=decimal.ROUND_HALF_EVEN,
+        traps=[
+                decimal.DivisionByZero,
+                decimal.InvalidOperation,
+                decimal.Overflow,
+            ])
+"""Contexto decimal usado nos cálculos dos totais."""
+
+_CENTAVO = Decimal('0.01')
+
+_ZERO = Decimal('0.00')
+
+
+TotaisItem = namedtuple('TotaisItem', [
+        'nItem',
+        'vProd',
+        'vDesc',
+        'vOutro',
+        'vItem',
+    ])
+"""Totais de um item do CF-e: o valor bruto (``vProd``, que é ``qCom`` vezes
+``vUnCom``, arredondado), o desconto (``vDesc``), outras despesas
+(``vOutro``) e o valor líquido do item (``vItem``), antes do rateio do
+desconto ou acréscimo sobre o subtotal.
+"""
+
+
+TotaisCFe = namedtuple('TotaisCFe', [
+        'itens',
+        'vProd',
+        'vDesc',
+        'vOutro',
+        'vDescSubtot',
+        'vAcresSubtot',
+        'vCFe',
+        'vPagamentos',
+        'vTroco',
+        'inconsistencias',
+    ])
+"""Totais do CF-e de venda: os totais de cada item (:class:`TotaisItem`), as
+somas dos valores dos itens, o desconto e o acréscimo sobre o subtotal, o
+valor total do CF-e (``vCFe``), a soma dos meios de pagamento, o troco e uma
+lista de mensagens descrevendo as inconsistências encontradas, se houver.
+"""
+
+
+def calcular(
+        itens,
+        vDescSubtot=None,
+        vAcresSubtot=None,
+        pagamentos=(),
+        contexto=None):
+    """Calcula os totais do CF-e de venda.
+
+    :param itens: Iterável de tuplas ``(qCom, vUnCom, vDesc, vOutro)``, uma
+        para cada item, na ordem dos itens. Os valores opcionais não
+        informados devem ser ``None``.
+
+    :param Decimal vDescSubtot: Opcional. Desconto sobre o subtotal.
+
+    :param Decimal vAcresSubtot: Opcional. Acréscimo sobre o subtotal.
+
+    :param pagamentos: Iterável com os valores (``vMP``) dos meios de
+        pagamento.
+
+    :param decimal.Context contexto: Opcional. O contexto decimal a ser
+        usado nos cálculos. Se não informado, será usado :data:`CONTEXTO`.
+
+    :rtype: TotaisCFe
+    """
+    contexto = contexto or CONTEXTO
+    inconsistencias = []
+    totais_itens = []
+    vProd = vDesc = vOutro = _ZERO
+
+    for n, (qCom, vUnCom, item_vDesc, item_vOutro) in enumerate(itens, 1):
+        if qCom is None or vUnCom is None:
+            inconsistencias.append((
+                    'Item {:d}: quantidade (qCom) ou valor unitario (vUnCom) '
+                    'nao informado'
+                ).format(n))
+            continue
+
+        item_vProd = contexto.multiply(qCom, vUnCom).quantize(
+                _CENTAVO,
+                context=contexto)
+        item_vDesc = _ZERO if item_vDesc is None else item_vDesc
+        item_vOutro = _ZERO if item_vOutro is None else item_vOutro
+        vItem = contexto.subtract(
+                contexto.add(item_vProd, item_vOutro),
+                item_vDesc)
+
+        if vItem < 0:
+            inconsistencias.append((
+                    'Item {:d}: desconto (vDesc={}) maior que o valor do '
+                    'item (vProd={}, vOutro={})'
+                ).format(n, item_vDesc, item_vProd, item_vOutro))
+
+        totais_itens.append(TotaisItem(
+                nItem=n,
+                vProd=item_vProd,
+                vDesc=item_vDesc,
+                vOutro=item_vOutro,
+                vItem=vItem))
+
+        vProd = contexto.add(vProd, item_vProd)
+        vDesc = contexto.add(vDesc, item_vDesc)
+        vOutro = contexto.add(vOutro, item_vOutro)
+
+    if not totais_itens and not inconsistencias:
+        inconsistencias.append('Nenhum item (det) informado')
+
+    vDescSubtot = _ZERO if vDescSubtot is None else vDescSubtot
+    vAcresSubtot = _ZERO if vAcresSubtot is None else vAcresSubtot
+
+    subtotal = contexto.subtract(contexto.add(vProd, vOutro), vDesc)
+    vCFe = contexto.add(contexto.subtract(subtotal, vDescSubtot), vAcresSubtot)
+    if vDescSubtot and vDescSubtot >= subtotal:
+        inconsistencias.append((
+                'Desconto sobre o subtotal (vDescSubtot={}) maior ou igual '
+                'ao subtotal ({})'
+            ).format(vDescSubtot, subtotal))
+
+    vPagamentos = _ZERO
+    for vMP in pagamentos:
+        vPagamentos = contexto.add(vPagamentos, vMP)
+
+    vTroco = contexto.subtract(vPagamentos, vCFe)
+    if vTroco < 0:
+        inconsistencias.append((
+                'Soma dos meios de pagamento ({}) inferior ao valor total do '
+                'CF-e ({})'
+            ).format(vPagamentos, vCFe))
+
+    return TotaisCFe(
+            itens=totais_itens,
+            vProd=vProd,
+            vDesc=vDesc,
+            vOutro=vOutro,
+            vDescSubtot=vDescSubtot,
+            vAcresSubtot=vAcresSubtot,
+            vCFe=vCFe,
+            vPagamentos=vPagamentos,
+            vTroco=vTroco,
+            inconsistencias=inconsistencias)
+
@@ -21,9 +21,19 @@ from __future__ import print_function
 from __future__ import unicode_literals
 
 import base64
+import re
 
+from datetime import date
 from datetime import datetime
 
+import six
+
+
+_ALFABETO_BASE64 = (
+        b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=')
+
+_FORA_DO_ALFABETO_BASE64 = re.compile(b'[^A-Za-z0-9+/=]')
+
 
 def str_to_base64(data, encoding='utf-8'):
     """Codifica uma string (por padrão, UTF-8) em Base64.
@@ -43,12 +53,144 @@ def str_to_base64(data, encoding='utf-8'):
 def base64_to_str(data):
     """Decodifica uma massa de dados codificada em Base64.
 
-    :param str data: String contendo a massa de dados codificada em Base64.
+    :param data: String contendo a massa de dados codificada em Base64. Pode
+        ser também um objeto ``bytes`` ou ``memoryview`` (veja
+        :class:`RetornoBytes`), caso em que não há a codificação intermediária
+        em bytes.
+
     :rtype: str
     """
-    data_as_bytes = data.encode('utf-8')
-    decoded_bytes = base64.b64decode(data_as_bytes)
-    return decoded_bytes.decode('utf-8')
+    return base64_to_bytes(data).decode('utf-8')
+
+
+def base64_to_bytes(data):
+    """Decodifica uma massa de dados codificada em Base64, resultando nos
+    bytes decodificados, sem interpretá-los como texto.
+
+    :param data: Um objeto ``str``, ``bytes`` ou ``memoryview`` contendo a
+        massa de dados codificada em Base64.
+
+    :rtype: bytes
+    """
+    if isinstance(data, memoryview):
+        if six.PY2:
+            data = data.tobytes()
+    elif not isinstance(data, (bytes, bytearray)):
+        data = data.encode('utf-8')
+    return base64.b64decode(data)
+
+
+def base64_to_chunks(data, chunk_size=65536):
+    """Decodifica uma massa de dados codificada em Base64 em blocos,
+    resultando nos bytes decodificados de cada bloco, de modo que apenas um
+    bloco de cada vez seja mantido em memória (veja
+    :meth:`~satcfe.resposta.extrairlogs.RespostaExtrairLogs.salvar`). A
+    concatenação dos blocos é idêntica ao resultado de
+    :func:`base64_to_bytes`, incluindo o descarte dos caracteres que não
+    fazem parte do alfabeto Base64 (eg. quebras de linha).
+
+    :param data: Um objeto ``str``, ``bytes`` ou ``memoryview`` contendo a
+        massa de dados codificada em Base64.
+
+    :param int chunk_size: Número de caracteres Base64 lidos de cada vez.
+
+    :rtype: generator
+    """
+    binario = isinstance(data, (bytes, bytearray, memoryview))
+    pendente = b''
+    for inicio in range(0, len(data), chunk_size):
+        bloco = data[inicio:inicio + chunk_size]
+        if isinstance(bloco, memoryview):
+            # em Python 2, bytes(memoryview) resulta na representação do
+            # objeto (eg. "<memory at 0x...>") e não no seu conteúdo
+            bloco = bloco.tobytes()
+        elif not binario:
+            bloco = bloco.encode('utf-8')
+        bloco = pendente + bytes(bloco)
+        if bloco.translate(None, _ALFABETO_BASE64):
+            # descarta os caracteres fora do alfabeto antes de dividir os
+            # blocos em grupos de quatro caracteres, assim como b64decode
+            bloco = _FORA_DO_ALFABETO_BASE64.sub(b'', bloco)
+        corte = len(bloco) - (len(bloco) % 4)
+        pendente = bloco[corte:]
+        if corte:
+            yield base64.b64decode(bloco[:corte])
+    if pendente:
+        yield base64.b64decode(pendente)  # resulta no erro de b64decode
+
+
+class RetornoBytes(object):
+    """Retorno de uma função SAT mantido como bytes, da forma como foi obtido
+    da biblioteca SAT (veja o argumento ``modo_bytes`` de
+    :class:`~satcfe.base.FuncoesSAT`).
+
+    A análise do retorno (:func:`~satcfe.resposta.padrao.analisar_retorno`)
+    decodifica apenas os campos curtos. Os campos em Base64 (eg. o XML do
+    CF-e ou o arquivo de log) são mantidos como fatias ``memoryview`` do
+    retorno original, sem cópia, e somente são decodificados quando
+    requisitados.
+
+    :param bytes dados: O retorno da função SAT.
+
+    :param str encoding: Codificação de caracteres dos campos de texto.
+
+    :param str encoding_errors: Como lidar com os erros de decodificação.
+    """
+
+    __slots__ = ('_dados', '_encoding', '_encoding_errors')
+
+    def __init__(self, dados, encoding='utf-8', encoding_errors='strict'):
+        self._dados = dados
+        self._encoding = encoding
+        self._encoding_errors = encoding_errors
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self._dados)
+
+    def __len__(self):
+        return len(self._dados)
+
+    def __contains__(self, item):
+        if not isinstance(item, bytes):
+            item = item.encode(self._encoding)
+        return item in self._dados
+
+    @property
+    def dados(self):
+        return self._dados
+
+    @property
+    def encoding(self):
+        return self._encoding
+
+    @property
+    def encoding_errors(self):
+        return self._encoding_errors
+
+    def partes(self):
+        """Separa os campos do retorno em fatias ``memoryview``, sem copiar
+        os dados.
+        """
+        dados = self._dados
+        visao = memoryview(dados)
+        partes = []
+        inicio = 0
+        while True:
+            fim = dados.find(b'|', inicio)
+            if fim < 0:
+                partes.append(visao[inicio:])
+                break
+            partes.append(visao[inicio:fim])
+            inicio = fim + 1
+        return partes
+
+    def decodificar(self, parte=None):
+        """Decodifica uma das :meth:`partes` (ou todo o retorno) como texto.
+
+        :rtype: str
+        """
+        dados = self._dados if parte is None else parte.tobytes()
+        return dados.decode(self._encoding, self._encoding_errors)
 
 
 def as_date(value):
@@ -56,10 +198,22 @@ def as_date(value):
     espaços em branco das bordas da sequência serão removidos antes da
     conversão.
 
+    As datas no formato fixo (oito dígitos) são convertidas diretamente a
+    partir de fatias da sequência, sem :meth:`datetime.datetime.strptime`, e
+    as datas convertidas mais recentemente são mantidas em memória (eg. as
+    datas de emissão e vencimento do certificado, repetidas em cada consulta
+    de status). Os demais casos, incluindo os erros, são tratados por
+    :meth:`~datetime.datetime.strptime`, com os mesmos resultados.
+
     :param str value: String contendo uma data ANSI (``yyyymmdd``)
     :rtype: datetime.date
     """
-    return datetime.strptime(value.strip(), '%Y%m%d').date()
+    try:
+        return _DATAS[value]
+    except KeyError:
+        return _memorizar(_DATAS, value, _converter_data(value))
+    except TypeError:
+        return _converter_data(value)  # valor não "hashable"
 
 
 def as_date_or_none(value):
@@ -71,7 +225,7 @@ def as_date_or_none(value):
     :rtype: datetime.date or None
     """
     try:
-        return datetime.strptime(value.strip(), '%Y%m%d').date()
+        return as_date(value)
     except ValueError:
         return None
 
@@ -81,10 +235,18 @@ def as_datetime(value):
     Os espaços em branco das bordas da sequência serão removidos antes da
     conversão.
 
+    Assim como em :func:`as_date`, o formato fixo (quatorze dígitos) é
+    convertido diretamente a partir de fatias da sequência.
+
     :param str value: String contendo uma data/hora ANSI (``yyyymmddHHMMSS``)
     :rtype: datetime.datetime
     """
-    return datetime.strptime(value.strip(), '%Y%m%d%H%M%S')
+    try:
+        return _DATAS_HORAS[value]
+    except KeyError:
+        return _memorizar(_DATAS_HORAS, value, _converter_data_hora(value))
+    except TypeError:
+        return _converter_data_hora(value)  # valor não "hashable"
 
 
 def as_datetime_or_none(value):
@@ -97,11 +259,57 @@ def as_datetime_or_none(value):
     :rtype: datetime.datetime or None
     """
     try:
-        return datetime.strptime(value.strip(), '%Y%m%d%H%M%S')
+        return as_datetime(value)
     except ValueError:
         return None
 
 
+_CAPACIDADE_MEMO_DATAS = 256
+
+_DATAS = {}
+
+_DATAS_HORAS = {}
+
+# apenas os dígitos ASCII, como em strptime (str.isdigit() aceitaria outros)
+_DIGITOS = frozenset('0123456789')
+
+
+def _memorizar(memo, valor, resultado):
+    # os valores são imutáveis e as operações sobre o dicionário são
+    # atômicas, dispensando uma trava; a memória é simplesmente esvaziada
+    # quando a capacidade é atingida
+    if len(memo) >= _CAPACIDADE_MEMO_DATAS:
+        memo.clear()
+    memo[valor] = resultado
+    return resultado
+
+
+def _converter_data(value):
+    valor = value.strip()
+    if len(valor) == 8 and _DIGITOS.issuperset(valor):
+        try:
+            return date(int(valor[:4]), int(valor[4:6]), int(valor[6:]))
+        except ValueError:
+            pass  # deixa que strptime resulte no erro original
+    return datetime.strptime(valor, '%Y%m%d').date()
+
+
+def _converter_data_hora(value):
+    valor = value.strip()
+    if len(valor) == 14 and _DIGITOS.issuperset(valor):
+        try:
+            return datetime(
+                    int(valor[:4]),
+                    int(valor[4:6]),
+                    int(valor[6:8]),
+                    int(valor[8:10]),
+                    int(valor[10:12]),
+                    int(valor[12:]))
+        except ValueError:
+            pass  # deixa que strptime resulte no erro original
+    return datetime.strptime(valor, '%Y%m%d%H%M%S')
+
+
 def normalizar_ip(ip):
     """Normaliza uma sequência string que contenha um endereço IPv4.
 
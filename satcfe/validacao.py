@@ -0,0 +1,606 @@
+# -*- coding: utf-8 -*-
+#
+# satcfe/validacao.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+"""Validação compilada das entidades do CF-e.
+
+Os *schemas* das entidades (veja :mod:`satcfe.entidades`) são escritos para o
+`Cerberus <https://docs.python-cerberus.org/>`_, que interpreta as regras a
+cada validação. O :class:`ValidadorCompilado` traduz o *schema*, uma única vez,
+para uma função Python com as verificações escritas diretamente (expressões
+regulares pré-compiladas, conjuntos de valores permitidos, etc), produzindo
+exatamente os mesmos erros que o Cerberus produziria.
+
+A validação compilada é selecionada através de
+:meth:`~satcfe.entidades.Entidade.definir_validacao`:
+
+.. sourcecode:: python
+
+    from satcfe import validacao
+    from satcfe.entidades import Entidade
+    from satcfe.entidades import ProdutoServico
+
+    # para todas as entidades
+    Entidade.definir_validacao(validacao.COMPILADA)
+
+    # ou apenas para uma determinada entidade
+    ProdutoServico.definir_validacao(validacao.COMPILADA)
+
+Independentemente do tipo de validação, os dígitos verificadores de CNPJ e
+CPF são verificados através de uma :class:`MemoVerificacao`, que mantém os
+resultados dos números verificados mais recentemente (veja os atributos
+``memo_cnpj`` e ``memo_cpf`` de :class:`~satcfe.entidades.ExtendedValidator`).
+Os números conhecidos de antemão (eg. os CNPJ do emitente e da *software
+house* de cada caixa) podem ser verificados logo na inicialização:
+
+.. sourcecode:: python
+
+    from satcfe.entidades import ExtendedValidator
+
+    ExtendedValidator.memo_cnpj.aquecer(['08427847000169', '61099008000141'])
+
+"""
+
+import re
+import threading
+
+from collections import OrderedDict
+from collections import namedtuple
+
+import cerberus
+
+from cerberus import errors
+from cerberus.platform import Hashable
+from cerberus.platform import Iterable
+from cerberus.platform import Mapping
+from cerberus.platform import Sequence
+from cerberus.platform import _str_type
+
+
+CERBERUS = 'cerberus'
+"""Validação através do próprio Cerberus (padrão)."""
+
+COMPILADA = 'compilada'
+"""Validação através do :class:`ValidadorCompilado`."""
+
+VALIDACOES = (CERBERUS, COMPILADA)
+
+REGRAS_SUPORTADAS = frozenset([
+        'allowed',
+        'check_with',
+        'dependencies',
+        'excludes',
+        'max',
+        'maxlength',
+        'meta',
+        'min',
+        'minlength',
+        'nullable',
+        'regex',
+        'required',
+        'type',
+    ])
+"""Regras do Cerberus que o :class:`ValidadorCompilado` é capaz de compilar.
+Um *schema* que use qualquer outra regra resulta em :exc:`ValueError`.
+"""
+
+# regras que não são descartadas quando o valor do campo é None
+_REGRAS_VALOR_NULO = frozenset(['check_with', 'dependencies', 'excludes'])
+
+_MENSAGENS = errors.BasicErrorHandler.messages
+
+
+def _mensagem(definicao, *args, **kwargs):
+    return _MENSAGENS[definicao.code].format(*args, **kwargs)
+
+
+def _nao_permitidos_em_lista():
+    # até a versão 1.3.2, o Cerberus reporta os valores não permitidos de um
+    # iterável como a lista da diferença entre os conjuntos; nas versões
+    # seguintes, como uma tupla, na ordem em que os valores aparecem
+    validador = cerberus.Validator({'x': {'allowed': ['a']}})
+    validador.validate({'x': ['b']})
+    return validador.errors['x'][0].endswith(']')
+
+
+_NAO_PERMITIDOS_EM_LISTA = _nao_permitidos_em_lista()
+
+
+class _Alvo(object):
+    # faz as vezes do validador do Cerberus para os métodos ``_check_with_*``
+    # da classe de validador, que reportam os erros através de ``_error``
+
+    __slots__ = ('erros', 'document', 'schema')
+
+    def __init__(self, erros, document, schema):
+        self.erros = erros
+        self.document = document
+        self.schema = schema
+
+    def _error(self, field, message):
+        self.erros.append((field, '', message))
+
+
+class ValidadorCompilado(object):
+    """Validador com a mesma interface (e os mesmos erros) do validador do
+    Cerberus, mas que compila o *schema* em uma função Python.
+
+    :param dict schema: O *schema* no formato do Cerberus.
+
+    :param validator_class: Classe de validador do Cerberus de onde são
+        obtidos os tipos (``types_mapping``) e os métodos ``_check_with_*``.
+
+    :raises ValueError: Se o *schema* usar alguma regra que não esteja em
+        :data:`REGRAS_SUPORTADAS`.
+    """
+
+    def __init__(self, schema, validator_class):
+        self.schema = schema
+        self._errors = {}
+        self.codigo, self._validar = _Compilador(
+                schema, validator_class).compilar()
+
+    @property
+    def errors(self):
+        """Os erros da última validação, no mesmo formato que
+        :attr:`cerberus.Validator.errors`.
+        """
+        return self._errors
+
+    def validate(self, document):
+        erros = []
+        self._validar(document, erros, _Alvo(erros, document, self.schema))
+        if not erros:
+            self._errors = {}
+            return True
+
+        # o Cerberus ordena os erros de um campo pelo nome da regra, sendo
+        # que os erros personalizados (regra vazia) vêm primeiro
+        erros.sort(key=lambda erro: (erro[0], erro[1]))
+        resultado = {}
+        for campo, _, mensagem in erros:
+            resultado.setdefault(campo, []).append(mensagem)
+        self._errors = resultado
+        return False
+
+
+class _Compilador(object):
+
+    def __init__(self, schema, validator_class):
+        self._schema = schema
+        self._validator_class = validator_class
+        self._globais = {}
+
+    def compilar(self):
+        linhas = ['def validar(d, erros, alvo):']
+        excludes = any(
+                'excludes' in regras for regras in self._schema.values())
+        if excludes:
+            linhas.append('    naoreq = set()')
+
+        for indice, (campo, regras) in enumerate(self._schema.items()):
+            linhas.extend(self._campo(indice, campo, regras))
+
+        linhas.extend([
+                '    for campo in d:',
+                '        if campo not in ESQUEMA:',
+                '            erros.append((campo, "", {!r}))'.format(
+                        _mensagem(errors.UNKNOWN_FIELD)),
+            ])
+
+        requerido = (
+                '            erros.append((campo, "required", {!r}))'
+            ).format(_mensagem(errors.REQUIRED_FIELD))
+        requeridos = tuple(
+                campo for campo, regras in self._schema.items()
+                if regras.get('required', False) is True)
+        if requeridos:
+            self._globais['REQUERIDOS'] = requeridos
+            linhas.extend([
+                    '    for campo in REQUERIDOS:',
+                    '        if campo not in d{}:'.format(
+                            ' and campo not in naoreq' if excludes else ''),
+                    requerido,
+                ])
+
+        if excludes:
+            linhas.extend([
+                    '    if naoreq and all(d.get(c) is None for c in naoreq):',
+                    '        for campo in naoreq:',
+                    requerido,
+                ])
+
+        codigo = '\n'.join(linhas) + '\n'
+        self._globais['ESQUEMA'] = frozenset(self._schema)
+        escopo = dict(self._globais)
+        exec(compile(codigo, '<validador compilado>', 'exec'), escopo)
+        return codigo, escopo['validar']
+
+    def _global(self, prefixo, indice, valor):
+        nome = '{}_{:d}'.format(prefixo, indice)
+        while nome in self._globais:
+            nome += '_'
+        self._globais[nome] = valor
+        return nome
+
+    def _campo(self, indice, campo, regras):
+        if not isinstance(regras, Mapping):
+            raise ValueError('Regras do campo {!r} devem ser um dicionario: '
+                    '{!r}'.format(campo, regras))
+
+        nao_suportadas = set(regras) - REGRAS_SUPORTADAS
+        if nao_suportadas:
+            raise ValueError('Regras nao suportadas no campo {!r}: {}'.format(
+                    campo, ', '.join(sorted(nao_suportadas))))
+
+        # mesma ordem em que o Cerberus avalia as regras: nullable, type e,
+        # então, as demais regras na ordem em que aparecem na definição
+        demais = [
+                regra for regra in regras
+                if regra not in ('nullable', 'type', 'required', 'meta')]
+
+        linhas = [
+                '    if {!r} in d:'.format(campo),
+                '        v = d[{!r}]'.format(campo),
+                '        if v is None:',
+            ]
+
+        corpo = []
+        if not regras.get('nullable', False):
+            corpo.append('erros.append(({!r}, "nullable", {!r}))'.format(
+                    campo, _mensagem(errors.NOT_NULLABLE)))
+        corpo.extend(self._regras(
+                indice,
+                campo,
+                regras,
+                [r for r in demais if r in _REGRAS_VALOR_NULO],
+                string=False))
+        linhas.extend(_indentar(corpo or ['pass'], 3))
+
+        tipo = regras.get('type')
+        string = False
+        if tipo:
+            incluidos, excluidos, string = self._tipo(campo, tipo)
+            condicao = 'not isinstance(v, {})'.format(
+                    self._global('INCLUIDOS', indice, incluidos))
+            if excluidos:
+                condicao += ' or isinstance(v, {})'.format(
+                        self._global('EXCLUIDOS', indice, excluidos))
+            linhas.extend([
+                    '        elif {}:'.format(condicao),
+                    '            erros.append(({!r}, "type", {!r}))'.format(
+                            campo,
+                            _mensagem(errors.BAD_TYPE, constraint=tipo)),
+                ])
+
+        linhas.append('        else:')
+        corpo = self._regras(indice, campo, regras, demais, string=string)
+        linhas.extend(_indentar(corpo or ['pass'], 3))
+        return linhas
+
+    def _tipo(self, campo, tipo):
+        nomes = (tipo,) if isinstance(tipo, _str_type) else tuple(tipo)
+        incluidos = []
+        excluidos = []
+        for nome in nomes:
+            definicao = self._validator_class.types_mapping.get(nome)
+            if definicao is None:
+                raise ValueError('Tipo nao suportado no campo {!r}: '
+                        '{!r}'.format(campo, nome))
+            incluidos.extend(_tipos(definicao.included_types))
+            excluidos.extend(_tipos(definicao.excluded_types))
+
+        if len(nomes) > 1 and excluidos:
+            # os tipos excluídos de uma definição não valem para as demais
+            raise ValueError('Combinacao de tipos nao suportada no campo '
+                    '{!r}: {!r}'.format(campo, tipo))
+
+        string = all(
+                isinstance(t, type) and issubclass(t, _str_type)
+                for t in incluidos)
+        return tuple(incluidos), tuple(excluidos), string
+
+    def _regras(self, indice, campo, regras, nomes, string):
+        linhas = []
+        for posicao, regra in enumerate(nomes):
+            restricao = regras[regra]
+            if regra == 'dependencies':
+                linhas.extend(self._dependencies(campo, restricao))
+                restantes = self._regras(
+                        indice,
+                        campo,
+                        regras,
+                        nomes[posicao + 1:],
+                        string)
+                if restantes:
+                    linhas.append('if not falhou:')
+                    linhas.extend(_indentar(restantes, 1))
+                break
+            gerador = getattr(self, '_regra_{}'.format(regra))
+            linhas.extend(gerador(indice, campo, regras, restricao, string))
+        return linhas
+
+    def _dependencies(self, campo, restricao):
+        if isinstance(restricao, _str_type) or not isinstance(
+                restricao, (Iterable, Mapping)):
+            restricao = (restricao,)
+
+        if not isinstance(restricao, Sequence):
+            raise ValueError('Regra dependencies nao suportada no campo '
+                    '{!r}: {!r}'.format(campo, restricao))
+
+        linhas = ['falhou = False']
+        for dependencia in restricao:
+            if not isinstance(dependencia, _str_type) \
+                    or '.' in dependencia or dependencia.startswith('^'):
+                raise ValueError('Dependencia nao suportada no campo '
+                        '{!r}: {!r}'.format(campo, dependencia))
+            linhas.extend([
+                    'if {!r} not in d:'.format(dependencia),
+                    '    erros.append(({!r}, "dependencies", {!r}))'.format(
+                            campo,
+                            _mensagem(errors.DEPENDENCIES_FIELD, dependencia)),
+                    '    falhou = True',
+                ])
+        return linhas
+
+    def _regra_allowed(self, indice, campo, regras, restricao, string):
+        try:
+            permitidos = frozenset(restricao)
+        except TypeError:
+            permitidos = tuple(restricao)
+        nome = self._global('PERMITIDOS', indice, permitidos)
+        mensagem = _MENSAGENS[errors.UNALLOWED_VALUE.code]
+        linhas = [
+                'if v not in {}:'.format(nome),
+                '    erros.append(({!r}, "allowed", {!r}.format(value=v)))'
+                .format(campo, mensagem),
+            ]
+        if string:
+            return linhas
+
+        # valores iteráveis (exceto strings) têm cada item verificado
+        self._globais['Iterable'] = Iterable
+        self._globais['_str_type'] = _str_type
+        mensagem = _MENSAGENS[errors.UNALLOWED_VALUES.code]
+        if _NAO_PERMITIDOS_EM_LISTA:
+            nao_permitidos = 'list(set(v) - set({}))'.format(nome)
+        else:
+            nao_permitidos = 'tuple(x for x in v if x not in {})'.format(nome)
+        return [
+                'if isinstance(v, Iterable) and not isinstance(v, _str_type):',
+                '    nao_permitidos = {}'.format(nao_permitidos),
+                '    if nao_permitidos:',
+                '        erros.append(({!r}, "allowed", {!r}.format('
+                'nao_permitidos)))'.format(campo, mensagem),
+                'else:',
+            ] + _indentar(linhas, 1)
+
+    def _regra_check_with(self, indice, campo, regras, restricao, string):
+        verificacoes = restricao
+        if isinstance(restricao, _str_type) or not isinstance(
+                restricao, Iterable):
+            verificacoes = [restricao]
+
+        linhas = []
+        for verificacao in verificacoes:
+            if isinstance(verificacao, _str_type):
+                metodo = getattr(
+                        self._validator_class,
+                        '_check_with_{}'.format(verificacao),
+                        None)
+                if metodo is None:
+                    raise ValueError('Verificacao nao suportada no campo '
+                            '{!r}: {!r}'.format(campo, verificacao))
+                nome = self._global('CHECK_WITH', indice, getattr(
+                        metodo, '__func__', metodo))
+                linhas.append('{}(alvo, {!r}, v)'.format(nome, campo))
+            else:
+                nome = self._global('CHECK_WITH', indice, verificacao)
+                linhas.append('{}({!r}, v, alvo._error)'.format(nome, campo))
+        return linhas
+
+    def _regra_excludes(self, indice, campo, regras, restricao, string):
+        excluidos = restricao
+        if isinstance(restricao, Hashable):
+            excluidos = [restricao]
+
+        linhas = []
+        if regras.get('required', False):
+            naoreq = [campo] + [e for e in excluidos if e in self._schema]
+            linhas.append('naoreq.update({!r})'.format(tuple(naoreq)))
+
+        mensagem = _mensagem(
+                errors.EXCLUDES_FIELD,
+                ', '.join("'{0}'".format(e) for e in excluidos),
+                field=campo)
+        linhas.extend([
+                'if {}:'.format(' or '.join(
+                        '{!r} in d'.format(e) for e in excluidos) or 'False'),
+                '    erros.append(({!r}, "excludes", {!r}))'.format(
+                        campo, mensagem),
+            ])
+        return linhas
+
+    def _regra_max(self, indice, campo, regras, restricao, string):
+        return self._limite(
+                indice, campo, 'max', '>', restricao, errors.MAX_VALUE)
+
+    def _regra_min(self, indice, campo, regras, restricao, string):
+        return self._limite(
+                indice, campo, 'min', '<', restricao, errors.MIN_VALUE)
+
+    def _limite(self, indice, campo, regra, operador, restricao, definicao):
+        nome = self._global(regra.upper(), indice, restricao)
+        return [
+                'try:',
+                '    if v {} {}:'.format(operador, nome),
+                '        erros.append(({!r}, {!r}, {!r}))'.format(
+                        campo,
+                        regra,
+                        _mensagem(definicao, constraint=restricao)),
+                'except TypeError:',
+                '    pass',
+            ]
+
+    def _regra_maxlength(self, indice, campo, regras, restricao, string):
+        return self._comprimento(
+                campo, 'maxlength', '>', restricao, errors.MAX_LENGTH, string)
+
+    def _regra_minlength(self, indice, campo, regras, restricao, string):
+        return self._comprimento(
+                campo, 'minlength', '<', restricao, errors.MIN_LENGTH, string)
+
+    def _comprimento(
+            self,
+            campo,
+            regra,
+            operador,
+            restricao,
+            definicao,
+            string):
+        condicao = 'len(v) {} {!r}'.format(operador, restricao)
+        if not string:
+            self._globais['Iterable'] = Iterable
+            condicao = 'isinstance(v, Iterable) and {}'.format(condicao)
+        return [
+                'if {}:'.format(condicao),
+                '    erros.append(({!r}, {!r}, {!r}))'.format(
+                        campo,
+                        regra,
+                        _mensagem(definicao, constraint=restricao)),
+            ]
+
+    def _regra_regex(self, indice, campo, regras, restricao, string):
+        padrao = restricao if restricao.endswith('$') else restricao + '$'
+        nome = self._global('REGEX', indice, re.compile(padrao).match)
+        linhas = [
+                'if not {}(v):'.format(nome),
+                '    erros.append(({!r}, "regex", {!r}))'.format(
+                        campo,
+                        _mensagem(
+                                errors.REGEX_MISMATCH,
+                                constraint=restricao)),
+            ]
+        if string:
+            return linhas
+        self._globais['_str_type'] = _str_type
+        return ['if isinstance(v, _str_type):'] + _indentar(linhas, 1)
+
+
+def _tipos(tipos):
+    # dependendo da versão, o Cerberus define os tipos de uma definição como
+    # um único tipo (eg. "string" em Python 2) ou como tuplas aninhadas (eg.
+    # "integer", com ``(int, long)``), formas que ``isinstance`` aceita
+    if isinstance(tipos, type):
+        return [tipos]
+    resultado = []
+    for tipo in tipos:
+        resultado.extend(_tipos(tipo))
+    return resultado
+
+
+def _indentar(linhas, niveis):
+    prefixo = '    ' * niveis
+    return [prefixo + linha for linha in linhas]
+
+
+EstatisticasMemo = namedtuple('EstatisticasMemo', [
+        'acertos',
+        'falhas',
+        'tamanho',
+        'capacidade',
+    ])
+"""Estatísticas de uma :class:`MemoVerificacao`: o número de acertos (valores
+cujo resultado já era conhecido), de falhas (valores que precisaram ser
+verificados), o número de resultados mantidos e a capacidade da memória.
+"""
+
+
+class MemoVerificacao(object):
+    """Memória limitada dos resultados de uma função de verificação, como a
+    verificação dos dígitos de um CNPJ. Os resultados menos usados
+    recentemente são descartados quando a capacidade é atingida. Pode ser
+    usada a partir de diversas *threads*.
+
+    :param verificar: Função que recebe o valor e resulta em ``True`` ou
+        ``False``.
+
+    :param int capacidade: Número máximo de resultados mantidos.
+    """
+
+    def __init__(self, verificar, capacidade=1024):
+        self._verificar = verificar
+        self._capacidade = capacidade
+        self._resultados = OrderedDict()
+        self._trava = threading.Lock()
+        self._acertos = 0
+        self._falhas = 0
+
+    def __call__(self, valor):
+        resultados = self._resultados
+        try:
+            with self._trava:
+                if valor in resultados:
+                    # move o valor para o final (o mais recentemente usado)
+                    resultado = resultados.pop(valor)
+                    resultados[valor] = resultado
+                    self._acertos += 1
+                    return resultado
+                self._falhas += 1
+        except TypeError:
+            return self._verificar(valor)  # valor não "hashable"
+
+        resultado = self._verificar(valor)
+        self._guardar(valor, resultado)
+        return resultado
+
+    def aquecer(self, valores):
+        """Verifica e guarda os resultados dos valores informados, sem que
+        sejam contados como acertos ou falhas. Útil na inicialização, com os
+        valores que certamente serão verificados (eg. o CNPJ do emitente).
+        """
+        for valor in valores:
+            self._guardar(valor, self._verificar(valor))
+
+    def estatisticas(self):
+        """Resulta nas estatísticas de uso (:class:`EstatisticasMemo`)."""
+        with self._trava:
+            return EstatisticasMemo(
+                    acertos=self._acertos,
+                    falhas=self._falhas,
+                    tamanho=len(self._resultados),
+                    capacidade=self._capacidade)
+
+    def limpar(self):
+        """Descarta os resultados e zera as estatísticas."""
+        with self._trava:
+            self._resultados.clear()
+            self._acertos = 0
+            self._falhas = 0
+
+    def _guardar(self, valor, resultado):
+        with self._trava:
+            resultados = self._resultados
+            resultados.pop(valor, None)
+            resultados[valor] = resultado
+            while len(resultados) > self._capacidade:
+                resultados.popitem(last=False)
@@ -22,8 +22,24 @@ from __future__ import unicode_literals
 import io
 import os
 import re
+import sys
 
 from setuptools import setup
+from setuptools.command.build_py import build_py
+
+
+class BuildPy(build_py):
+    # o módulo satcfe.clienteasync contém corrotinas nativas (``async def``)
+    # e não pode ser compilado (nem importado) em Python 2
+    def find_package_modules(self, package, package_dir):
+        modules = build_py.find_package_modules(self, package, package_dir)
+        if sys.version_info < (3, 6):
+            modules = [
+                    (pkg, mod, filename)
+                    for pkg, mod, filename in modules
+                    if (pkg, mod) != ('satcfe', 'clienteasync')
+                ]
+        return modules
 
 
 def read(*filenames, **kwargs):
@@ -46,6 +62,7 @@ long_description = read('README.rst')
 install_requires = [
         'cerberus>=1,<2',
         'future',
+        'futures; python_version < "3"',
         'satcomum>=2.2',
         'six',
         'unidecode',
@@ -54,7 +71,10 @@ install_requires = [
 extras_require = {
         'sathub': [
             'requests',
-        ]
+        ],
+        'sathub-async': [
+            'aiohttp',
+        ],
     }
 
 setup(
@@ -69,6 +89,7 @@ setup(
             ],
         install_requires=install_requires,
         extras_require=extras_require,
+        cmdclass={'build_py': BuildPy},
         include_package_data=True,
         license='Apache Software License',
         platforms='any',
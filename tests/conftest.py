@@ -23,6 +23,7 @@ from __future__ import unicode_literals
 import os
 import re
 import shutil
+import sys
 
 from collections import namedtuple
 from decimal import Decimal
@@ -64,6 +65,14 @@ _SATCFE_TEST_EMITENTE_ISSQN_REGIME = 'SATCFE_TEST_EMITENTE_ISSQN_REGIME'
 _SATCFE_TEST_EMITENTE_ISSQN_RATEIO = 'SATCFE_TEST_EMITENTE_ISSQN_RATEIO'
 
 
+# O módulo de testes dos clientes assíncronos contém corrotinas nativas
+# (``async def``) e não pode sequer ser importado em versões anteriores
+# ao Python 3.6, de modo que precisa ser ignorado já na coleta;
+collect_ignore = []
+if sys.version_info < (3, 6):
+    collect_ignore.append('test_clienteasync.py')
+
+
 _MarkerData = namedtuple('_MarkerData', 'name reason option_help')
 
 
@@ -20,9 +20,22 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import gc
+
+from decimal import Decimal
+
+import pytest
+
 from satcomum import constantes
 from satcfe.entidades import CFeVenda
+from satcfe.entidades import COFINSSN
+from satcfe.entidades import Detalhamento
 from satcfe.entidades import Emitente
+from satcfe.entidades import ICMSSN102
+from satcfe.entidades import Imposto
+from satcfe.entidades import MeioPagamento
+from satcfe.entidades import PISSN
+from satcfe.entidades import ProdutoServico
 
 
 def test_simples_minimo():
@@ -96,3 +109,108 @@ def test_simples_minimo():
     pgto = infCFe.find('pgto')
     assert pgto is not None
     assert len(list(pgto)) == 0
+
+
+_PIS = PISSN(CST='49')
+
+
+def _detalhamento(n):
+    return Detalhamento(
+            produto=ProdutoServico(
+                    cProd=str(n),
+                    xProd='Produto #{:d}'.format(n),
+                    CFOP='5102',
+                    uCom='UN',
+                    qCom=Decimal('1.0000'),
+                    vUnCom=Decimal('5.75'),
+                    indRegra='A'),
+            imposto=Imposto(
+                    icms=ICMSSN102(Orig='0', CSOSN='500'),
+                    pis=_PIS,
+                    cofins=COFINSSN(CST='49')))
+
+
+def _venda(itens):
+    return CFeVenda(
+            CNPJ='08427847000169',
+            signAC=constantes.ASSINATURA_AC_TESTE,
+            numeroCaixa=1,
+            emitente=Emitente(
+                    CNPJ='61099008000141',
+                    IE='111111111111',
+                    indRatISSQN=constantes.C16_NAO_RATEADO),
+            detalhamentos=[_detalhamento(n) for n in range(itens)],
+            pagamentos=[
+                    MeioPagamento(
+                            cMP=constantes.WA03_DINHEIRO,
+                            vMP=Decimal('100.00'))])
+
+
+@pytest.fixture
+def validacoes_produto(monkeypatch):
+    validados = []
+    validar = ProdutoServico.validar
+
+    def _validar(self):
+        validados.append(self.cProd)
+        validar(self)
+
+    monkeypatch.setattr(ProdutoServico, 'validar', _validar)
+    return validados
+
+
+def test_itens_inalterados_nao_sao_revalidados(validacoes_produto):
+    venda = _venda(5)
+    primeiro = venda.documento(direto=True)
+    assert validacoes_produto == ['0', '1', '2', '3', '4']
+
+    del validacoes_produto[:]
+    assert venda.documento(direto=True) == primeiro
+    assert validacoes_produto == []
+
+    venda.detalhamentos[2].produto.xProd = 'Alterado'
+    venda.detalhamentos[3].imposto.icms.CSOSN = '400'
+    venda.detalhamentos[4].infAdProd = 'Adicional'
+    documento = venda.documento(direto=True)
+    assert sorted(validacoes_produto) == ['2', '3', '4']
+    assert '<xProd>Alterado</xProd>' in documento
+    assert documento == venda.documento()
+
+
+def test_grupo_compartilhado_invalida_todos_os_itens(validacoes_produto):
+    venda = _venda(3)
+    venda.documento(direto=True)
+
+    del validacoes_produto[:]
+    _PIS.CST = '49'
+    venda.documento(direto=True)
+    assert sorted(validacoes_produto) == ['0', '1', '2']
+
+
+def test_acrescentar_e_remover_itens(validacoes_produto):
+    venda = _venda(3)
+    venda.documento(direto=True)
+
+    del validacoes_produto[:]
+    removido = venda.detalhamentos[0]
+    venda.remover_detalhamento(removido)
+    venda.adicionar_detalhamento(_detalhamento(3))
+    documento = venda.documento(direto=True)
+
+    assert validacoes_produto == ['3']
+    assert '<det nItem="1"><prod><cProd>1</cProd>' in documento
+    assert '<det nItem="3"><prod><cProd>3</cProd>' in documento
+    assert documento == venda.documento()
+
+    with pytest.raises(ValueError):
+        venda.remover_detalhamento(removido)
+
+
+def test_dependentes_nao_sao_mantidos_pelo_grupo_compartilhado():
+    venda = _venda(3)
+    venda.documento(direto=True)
+    assert len(_PIS._dependentes) >= 3
+
+    del venda
+    gc.collect()
+    assert len(_PIS._dependentes) == 0
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+# tests/entidades/test_dexml.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import io
+import os
+
+from decimal import Decimal
+
+import cerberus
+import pytest
+
+from satcomum import constantes
+
+from satcfe.entidades import CFeCancelamento
+from satcfe.entidades import CFeVenda
+from satcfe.entidades import Destinatario
+from satcfe.entidades import ICMSSN102
+from satcfe.entidades import Imposto
+from satcfe.entidades import PISQtde
+from satcfe.entidades import ProdutoServico
+
+from .test_escritorxml import _venda
+
+
+_DADOS = os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        'data',
+        'enviardadosvenda')
+
+
+@pytest.mark.parametrize('arquivo', ['cfe.xml', 'cfe-autorizado.xml'])
+def test_cfe_arquivado(arquivo):
+    cfe = CFeVenda.de_xml(os.path.join(_DADOS, arquivo))
+
+    assert cfe.versaoDadosEnt == '0.06'
+    assert cfe.numeroCaixa == 2
+    assert cfe.emitente.IM == '123123'
+    assert cfe.destinatario is None
+    assert len(cfe.detalhamentos) == 1
+
+    det = cfe.detalhamentos[0]
+    assert det.produto.xProd == 'TODDYNHO 200 ML'
+    assert det.produto.qCom == Decimal('1.0000')
+    assert not hasattr(det.produto, 'vProd')  # acrescentado pelo SAT
+    assert isinstance(det.imposto.icms, ICMSSN102)
+    assert det.imposto.pis.CST == '49'
+
+    assert cfe.pagamentos[0].vMP == Decimal('2.00')
+    assert cfe.informacoes_adicionais.infCpl.startswith('Valores')
+
+    cfe.validar()
+
+
+def test_cfe_autorizado_equivale_ao_enviado():
+    enviado = CFeVenda.de_xml(os.path.join(_DADOS, 'cfe.xml'))
+    autorizado = CFeVenda.de_xml(os.path.join(_DADOS, 'cfe-autorizado.xml'))
+    assert autorizado.documento() == enviado.documento()
+
+
+@pytest.mark.parametrize('opcoes', [{}, {'forcar_unicode': True}])
+def test_ida_e_volta(opcoes):
+    documento = _venda().documento(**opcoes)
+    cfe = CFeVenda.de_xml(documento)
+    assert cfe.documento(**opcoes) == documento
+    assert CFeVenda.de_xml(documento.encode('utf-8')).documento(
+            **opcoes) == documento
+    assert CFeVenda.de_xml(io.BytesIO(documento.encode('utf-8'))).documento(
+            **opcoes) == documento
+
+
+def test_cfe_cancelamento():
+    cancelamento = CFeCancelamento(
+            chCanc='CFe13190208723218000186599000040190000740711801',
+            CNPJ='08427847000169',
+            signAC=constantes.ASSINATURA_AC_TESTE,
+            numeroCaixa=2,
+            destinatario=Destinatario(CPF='11122233396'))
+    documento = cancelamento.documento()
+
+    cfe = CFeCancelamento.de_xml(documento)
+    assert cfe.chCanc == cancelamento.chCanc
+    assert cfe.numeroCaixa == 2
+    assert cfe.destinatario is None  # vazio no XML do cancelamento
+    assert cfe.documento() == documento
+
+
+def test_entidades_isoladas():
+    imposto = Imposto.de_xml(
+            '<imposto><vItem12741>0.10</vItem12741>'
+            '<PIS><PISQtde><CST>03</CST><qBCProd>1.0000</qBCProd>'
+            '<vAliqProd>0.0100</vAliqProd></PISQtde></PIS>'
+            '<COFINS /></imposto>')
+    assert imposto.vItem12741 == Decimal('0.10')
+    assert isinstance(imposto.pis, PISQtde)
+    assert imposto.icms is None
+    assert imposto.cofins is None
+
+
+def test_valores_invalidos_mantidos_como_texto():
+    produto = ProdutoServico.de_xml(
+            '<prod><cProd>1</cProd><xProd>X</xProd><CFOP>5102</CFOP>'
+            '<uCom>UN</uCom><qCom>um</qCom><vUnCom>1.00</vUnCom>'
+            '<indRegra>A</indRegra></prod>')
+    assert produto.qCom == 'um'
+    with pytest.raises(cerberus.DocumentError):
+        produto.validar()
+    assert list(produto.erros['ProdutoServico']) == ['qCom']
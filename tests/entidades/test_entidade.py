@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# tests/entidades/test_entidade.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import sys
+import threading
+
+from decimal import Decimal
+
+import pytest
+import cerberus
+
+from satcfe.entidades import Entidade
+from satcfe.entidades import Detalhamento
+from satcfe.entidades import ExtendedValidator
+from satcfe.entidades import ICMSSN102
+from satcfe.entidades import Imposto
+from satcfe.entidades import PISSN
+from satcfe.entidades import ProdutoServico
+
+
+def _produto(**kwargs):
+    dados = dict(
+            cProd='123456',
+            xProd='BORRACHA STAEDTLER',
+            CFOP='5102',
+            uCom='UN',
+            qCom=Decimal('1.0000'),
+            vUnCom=Decimal('5.75'),
+            indRegra='A')
+    dados.update(kwargs)
+    return ProdutoServico(**dados)
+
+
+def test_validador_compartilhado_pela_classe():
+    p1 = _produto()
+    p2 = _produto()
+    p1.validar()
+    p2.validar()
+    assert p1._validador() is p2._validador()
+    assert p1._validador() is not ICMSSN102(
+            Orig='0',
+            CSOSN='500')._validador()
+
+
+def test_schema_da_instancia():
+    class _Simples(Entidade):
+        pass
+
+    entidade = _Simples(
+            schema={'nome': {'type': 'string', 'required': True}},
+            validator_class=ExtendedValidator,
+            nome=1)
+
+    with pytest.raises(cerberus.DocumentError):
+        entidade.validar()
+    assert 'nome' in entidade.erros['_Simples']
+
+    with pytest.raises(AttributeError):
+        _Simples(nome='x')  # o schema da classe é vazio
+
+
+def test_validacao_concorrente():
+    falhas = []
+
+    def _validar(indice):
+        try:
+            for _ in range(50):
+                if indice % 2:
+                    produto = _produto(CFOP='x')
+                    with pytest.raises(cerberus.DocumentError):
+                        produto.validar()
+                    assert list(produto.erros['ProdutoServico']) == ['CFOP']
+                else:
+                    _produto().validar()
+        except Exception as ex:  # pragma: no cover
+            falhas.append(ex)
+
+    tarefas = [
+            threading.Thread(target=_validar, args=(i,))
+            for i in range(8)]
+    for tarefa in tarefas:
+        tarefa.start()
+    for tarefa in tarefas:
+        tarefa.join()
+
+    assert falhas == []
+
+
+def test_entidades_dos_itens_sem_dict():
+    produto = _produto(cEAN='7891234567895')
+    assert not hasattr(produto, '__dict__')
+    assert produto.cEAN == '7891234567895'
+    assert not hasattr(produto, 'NCM')  # opcional, não definido
+    assert produto.erros == {}
+
+    produto.NCM = '19059090'
+    produto.validar()
+    del produto.NCM
+    assert not hasattr(produto, 'NCM')
+
+    with pytest.raises(AttributeError):
+        _produto(desconhecido='x')
+
+    with pytest.raises(AttributeError):
+        produto.desconhecido = 'x'
+
+    with pytest.raises(TypeError):
+        ICMSSN102(validator_class=ExtendedValidator, Orig='0', CSOSN='500')
+
+
+def test_memoria_por_item():
+    # compara o tamanho das entidades de um item com o de subclasses
+    # equivalentes que mantêm um __dict__ por instância (veja o resultado
+    # executando pytest com a opção "-s")
+    def _tamanho(entidade):
+        tamanho = sys.getsizeof(entidade)
+        if hasattr(entidade, '__dict__'):
+            tamanho += sys.getsizeof(entidade.__dict__)
+        return tamanho
+
+    def _com_dict(classe):
+        return type(str('_ComDict'), (classe,), {})
+
+    def _item(produto, icms, pis, imposto, detalhamento):
+        p = produto(**_produto()._data())
+        i = imposto(icms=icms(Orig='0', CSOSN='500'), pis=pis(CST='49'))
+        d = detalhamento(produto=p, imposto=i)
+        return sum(_tamanho(e) for e in (p, i, i.icms, i.pis, d))
+
+    compacto = _item(ProdutoServico, ICMSSN102, PISSN, Imposto, Detalhamento)
+    com_dict = _item(*[_com_dict(c) for c in (
+            ProdutoServico, ICMSSN102, PISSN, Imposto, Detalhamento)])
+
+    print('\nEntidades de um item: {:d} bytes ({:d} bytes com __dict__)'
+            .format(compacto, com_dict))
+
+    assert compacto < com_dict
@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+#
+# tests/entidades/test_escritorxml.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import xml.etree.ElementTree as ET
+
+from decimal import Decimal
+
+import cerberus
+import pytest
+
+from satcomum import constantes
+
+from satcfe import entidades
+from satcfe.base import resolver_documento
+from satcfe.entidades import CFeCancelamento
+from satcfe.entidades import CFeVenda
+from satcfe.entidades import COFINSAliq
+from satcfe.entidades import COFINSNT
+from satcfe.entidades import COFINSOutr
+from satcfe.entidades import COFINSQtde
+from satcfe.entidades import COFINSSN
+from satcfe.entidades import COFINSST
+from satcfe.entidades import DescAcrEntr
+from satcfe.entidades import Destinatario
+from satcfe.entidades import Detalhamento
+from satcfe.entidades import Emitente
+from satcfe.entidades import Entidade
+from satcfe.entidades import EscritorXML
+from satcfe.entidades import ICMS00
+from satcfe.entidades import ICMS40
+from satcfe.entidades import ICMSSN102
+from satcfe.entidades import ICMSSN900
+from satcfe.entidades import ISSQN
+from satcfe.entidades import Imposto
+from satcfe.entidades import InformacoesAdicionais
+from satcfe.entidades import LocalEntrega
+from satcfe.entidades import MeioPagamento
+from satcfe.entidades import ObsFiscoDet
+from satcfe.entidades import PISAliq
+from satcfe.entidades import PISNT
+from satcfe.entidades import PISOutr
+from satcfe.entidades import PISQtde
+from satcfe.entidades import PISSN
+from satcfe.entidades import PISST
+from satcfe.entidades import ProdutoServico
+from satcfe.rede import ConfiguracaoRede
+
+
+_VARIANTES = [
+        {},
+        {'incluir_xml_decl': False},
+        {'forcar_unicode': True},
+        {'forcar_unicode': True, 'incluir_xml_decl': False},
+    ]
+
+
+def _impostos():
+    return [
+            Imposto(
+                    vItem12741=Decimal('0.10'),
+                    icms=ICMS00(Orig='0', CST='00', pICMS=Decimal('18.00')),
+                    pis=PISAliq(
+                            CST='01',
+                            vBC=Decimal('1.00'),
+                            pPIS=Decimal('0.0065')),
+                    cofins=COFINSAliq(
+                            CST='01',
+                            vBC=Decimal('1.00'),
+                            pCOFINS=Decimal('0.0300'))),
+            Imposto(
+                    icms=ICMS40(Orig='1', CST='40'),
+                    pis=PISQtde(
+                            CST='03',
+                            qBCProd=Decimal('1.0000'),
+                            vAliqProd=Decimal('0.0100')),
+                    pisst=PISST(vBC=Decimal('1.00'), pPIS=Decimal('0.0065')),
+                    cofins=COFINSQtde(
+                            CST='03',
+                            qBCProd=Decimal('1.0000'),
+                            vAliqProd=Decimal('0.0100')),
+                    cofinsst=COFINSST(
+                            qBCProd=Decimal('1.0000'),
+                            vAliqProd=Decimal('0.0100'))),
+            Imposto(
+                    icms=ICMSSN900(
+                            Orig='0',
+                            CSOSN='900',
+                            pICMS=Decimal('1.00')),
+                    pis=PISNT(CST='04'),
+                    cofins=COFINSNT(CST='04')),
+            Imposto(
+                    pis=PISOutr(
+                            CST='99',
+                            qBCProd=Decimal('1.0000'),
+                            vAliqProd=Decimal('0.0100')),
+                    cofins=COFINSOutr(
+                            CST='99',
+                            vBC=Decimal('1.00'),
+                            pCOFINS=Decimal('0.0300')),
+                    issqn=ISSQN(
+                            vDeducISSQN=Decimal('10.00'),
+                            vAliq=Decimal('7.00'),
+                            cMunFG='3512345',
+                            cNatOp=constantes.U09_TRIBUTACAO_MUNICIPIO,
+                            indIncFisc=constantes.U10_NAO)),
+            Imposto(
+                    icms=ICMSSN102(Orig='0', CSOSN='500'),
+                    pis=PISSN(CST='49'),
+                    cofins=COFINSSN(CST='49')),
+        ]
+
+
+def _venda():
+    detalhamentos = []
+    for n, imposto in enumerate(_impostos()):
+        detalhamentos.append(Detalhamento(
+                produto=ProdutoServico(
+                        cProd='{:d}'.format(n),
+                        cEAN='7891234567895',
+                        xProd='Pão & <Café> "Especial" nº {:d}'.format(n),
+                        NCM='19059090',
+                        CFOP='5102',
+                        uCom='UN',
+                        qCom=Decimal('1.0000'),
+                        vUnCom=Decimal('5.75'),
+                        indRegra='A',
+                        vDesc=Decimal('0.25'),
+                        observacoes_fisco=[
+                                ObsFiscoDet(
+                                        xCampoDet='Cód. & "campo"',
+                                        xTextoDet='Ação <livre>')]),
+                imposto=imposto,
+                infAdProd='Informação\tadicional'))
+
+    return CFeVenda(
+            CNPJ='08427847000169',
+            signAC=constantes.ASSINATURA_AC_TESTE,
+            numeroCaixa=2,
+            vCFeLei12741=Decimal('1.23'),
+            emitente=Emitente(
+                    CNPJ='61099008000141',
+                    IE='111111111111',
+                    IM='12345',
+                    cRegTribISSQN=constantes.C15_SOCIEDADE_PROFISSIONAIS,
+                    indRatISSQN=constantes.C16_NAO_RATEADO),
+            destinatario=Destinatario(CPF='11122233396', xNome='João Ninguém'),
+            entrega=LocalEntrega(
+                    xLgr='Rua Armando Gulim',
+                    nro='65',
+                    xCpl='Apto 1',
+                    xBairro='Parque Glória III',
+                    xMun='Catanduva',
+                    UF='SP'),
+            detalhamentos=detalhamentos,
+            descontos_acrescimos_subtotal=DescAcrEntr(
+                    vDescSubtot=Decimal('0.50')),
+            pagamentos=[
+                    MeioPagamento(
+                            cMP=constantes.WA03_CARTAO_CREDITO,
+                            vMP=Decimal('10.00'),
+                            cAdmC='001'),
+                    MeioPagamento(
+                            cMP=constantes.WA03_DINHEIRO,
+                            vMP=Decimal('30.00'))],
+            informacoes_adicionais=InformacoesAdicionais(
+                    infCpl='Obrigado & volte sempre!\nÀ vista.'))
+
+
+def _cancelamento():
+    return CFeCancelamento(
+            chCanc='CFe13190208723218000186599000040190000740711801',
+            CNPJ='08427847000169',
+            signAC=constantes.ASSINATURA_AC_TESTE,
+            numeroCaixa=2,
+            destinatario=Destinatario(CNPJ='08427847000169'))
+
+
+def _amostras():
+    # uma ou mais instâncias (e os argumentos do documento) de cada classe
+    # de entidade, a partir das entidades que compõem uma venda completa
+    venda = _venda()
+    amostras = [
+            (venda, {}),
+            (venda.emitente, {}),
+            (venda.destinatario, {}),
+            (venda.entrega, {}),
+            (venda.descontos_acrescimos_subtotal, {}),
+            (venda.informacoes_adicionais, {}),
+            (_cancelamento(), {}),
+            (Destinatario(CNPJ='08427847000169'), {'cancelamento': True}),
+            (ConfiguracaoRede(
+                    tipoInter=constantes.REDE_TIPOINTER_ETHE,
+                    tipoLan=constantes.REDE_TIPOLAN_DHCP), {}),
+        ]
+    amostras.extend((pagamento, {}) for pagamento in venda.pagamentos)
+    for n, det in enumerate(venda.detalhamentos):
+        amostras.append((det, {'nItem': n + 1}))
+        amostras.append((det.produto, {}))
+        amostras.extend((obs, {}) for obs in det.produto.observacoes_fisco)
+        amostras.append((det.imposto, {}))
+        for nome in ('icms', 'pis', 'pisst', 'cofins', 'cofinsst', 'issqn'):
+            grupo = getattr(det.imposto, nome)
+            if grupo is not None:
+                amostras.append((grupo, {}))
+    return amostras
+
+
+def _classes_com_xml():
+    classes = [ConfiguracaoRede]
+    for nome in dir(entidades):
+        candidata = getattr(entidades, nome)
+        if isinstance(candidata, type) \
+                and issubclass(candidata, Entidade) \
+                and candidata is not Entidade \
+                and '_construir_elemento_xml' in vars(candidata):
+            classes.append(candidata)
+    return classes
+
+
+@pytest.mark.parametrize('classe', _classes_com_xml(),
+        ids=lambda classe: classe.__name__)
+def test_escrita_direta_identica_para_cada_entidade(classe):
+    amostras = [
+            (entidade, argumentos)
+            for entidade, argumentos in _amostras()
+            if type(entidade) is classe]
+    assert amostras, 'Nenhuma amostra para {}'.format(classe.__name__)
+    for entidade, argumentos in amostras:
+        for opcoes in _VARIANTES:
+            opcoes = dict(opcoes, **argumentos)
+            esperado = entidade.documento(**opcoes)
+            assert entidade.documento(direto=True, **opcoes) == esperado
+
+
+@pytest.mark.parametrize('opcoes', _VARIANTES)
+def test_cfe_venda_identico(opcoes):
+    venda = _venda()
+    esperado = venda.documento(**opcoes)
+    assert venda.documento(direto=True, **opcoes) == esperado
+
+
+def test_cfe_venda_minimo_identico():
+    venda = CFeVenda(
+            CNPJ='08427847000169',
+            signAC=constantes.ASSINATURA_AC_TESTE,
+            numeroCaixa=1,
+            emitente=Emitente(
+                    CNPJ='61099008000141',
+                    IE='111111111111',
+                    indRatISSQN=constantes.C16_NAO_RATEADO))
+    documento = venda.documento(direto=True, incluir_xml_decl=False)
+    assert '<dest /><total /><pgto />' in documento
+    assert documento == venda.documento(incluir_xml_decl=False)
+
+
+@pytest.mark.parametrize('opcoes', _VARIANTES)
+def test_cfe_cancelamento_identico(opcoes):
+    cancelamento = _cancelamento()
+    esperado = cancelamento.documento(**opcoes)
+    assert cancelamento.documento(direto=True, **opcoes) == esperado
+
+
+def test_configuracao_rede_identica():
+    conf = ConfiguracaoRede(
+            tipoInter=constantes.REDE_TIPOINTER_ETHE,
+            tipoLan=constantes.REDE_TIPOLAN_DHCP)
+    assert conf.documento(direto=True) == conf.documento()
+
+
+def test_entidade_sem_escrita_direta():
+    class _Grupo(Entidade):
+        _schema = {'texto': {'type': 'string'}}
+
+        def _construir_elemento_xml(self, *args, **kwargs):
+            grupo = ET.Element('grupo')
+            ET.SubElement(grupo, 'texto').text = self.texto
+            return grupo
+
+    grupo = _Grupo(texto='Ação & reação')
+    assert grupo.documento(direto=True) == grupo.documento()
+    assert grupo.documento(direto=True, forcar_unicode=True) == \
+        grupo.documento(forcar_unicode=True)
+
+
+def test_validacao_na_escrita_direta():
+    venda = _venda()
+    venda.emitente.IE = 'x'
+    with pytest.raises(cerberus.DocumentError):
+        venda.documento(direto=True)
+
+    with pytest.raises(cerberus.DocumentError):
+        Imposto(pis=PISSN(CST='49')).documento(direto=True)
+
+
+def test_resolver_documento_usa_escrita_direta():
+    class _Venda(CFeVenda):
+        def _escrever_xml(self, escritor, *args, **kwargs):
+            escritor.elemento('direto')
+
+    assert resolver_documento(_Venda()).endswith('<direto />')
+    assert resolver_documento(_venda()) == _venda().documento()
+
+
+def test_construcao_redefinida_prevalece_na_escrita_direta():
+    # especializações que redefinem apenas a construção do elemento através
+    # do ElementTree não são ignoradas pela escrita direta, inclusive
+    # quando aninhadas em outras entidades
+    class _Emitente(Emitente):
+        def _construir_elemento_xml(self, *args, **kwargs):
+            emit = super(_Emitente, self)._construir_elemento_xml(
+                    *args, **kwargs)
+            ET.SubElement(emit, 'redefinido')
+            return emit
+
+    class _Venda(CFeVenda):
+        def _xml(self, *args, **kwargs):
+            elemento = super(_Venda, self)._xml(*args, **kwargs)
+            ET.SubElement(elemento, 'redefinido')
+            return elemento
+
+    emitente = _Emitente(
+            CNPJ='61099008000141',
+            IE='111111111111',
+            indRatISSQN=constantes.C16_NAO_RATEADO)
+    for classe, final in (
+            (CFeVenda, '<redefinido /></emit>'),
+            (_Venda, '<redefinido /></CFe>')):
+        venda = classe(
+                CNPJ='08427847000169',
+                signAC=constantes.ASSINATURA_AC_TESTE,
+                numeroCaixa=1,
+                emitente=emitente)
+        documento = resolver_documento(venda)
+        assert final in documento
+        assert documento == venda.documento()
+
+
+def test_escritor_xml():
+    escritor = EscritorXML(transliterar=False)
+    escritor.abrir('a', [('x', '"1" & <2>\n')])
+    escritor.abrir('b')
+    escritor.fechar()
+    escritor.elemento('c', '')
+    escritor.elemento('d', 'ção & <e>')
+    escritor.fechar()
+
+    a = ET.Element('a', x='"1" & <2>\n')
+    ET.SubElement(a, 'b')
+    ET.SubElement(a, 'c').text = ''
+    ET.SubElement(a, 'd').text = 'ção & <e>'
+
+    assert escritor.texto() == ET.tostring(a, encoding='utf-8').decode('utf-8')
+
+
+def test_escritor_xml_escape():
+    escritor = EscritorXML(transliterar=False)
+    escritor.abrir('a', [('x', 'a\tb\r\nc "d" & <e>')])
+    escritor.elemento('b', '"f" \t & <g>\r\n')
+    escritor.fechar()
+    assert escritor.texto() == (
+            '<a x="a&#09;b&#13;&#10;c &quot;d&quot; &amp; &lt;e&gt;">'
+            '<b>"f" \t &amp; &lt;g&gt;\r\n</b>'
+            '</a>')
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+#
+# tests/entidades/test_lotedetalhamentos.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import timeit
+
+from decimal import Decimal
+
+import cerberus
+import pytest
+
+from satcomum import constantes
+
+from satcfe.entidades import CFeVenda
+from satcfe.entidades import COFINSAliq
+from satcfe.entidades import COFINSSN
+from satcfe.entidades import Detalhamento
+from satcfe.entidades import Emitente
+from satcfe.entidades import ICMSSN102
+from satcfe.entidades import Imposto
+from satcfe.entidades import LoteDetalhamentos
+from satcfe.entidades import MeioPagamento
+from satcfe.entidades import ObsFiscoDet
+from satcfe.entidades import PISAliq
+from satcfe.entidades import PISSN
+from satcfe.entidades import ProdutoServico
+
+
+_CAMPOS = (
+        'cProd',
+        'cEAN',
+        'xProd',
+        'CFOP',
+        'uCom',
+        'qCom',
+        'vUnCom',
+        'indRegra',
+        'vDesc',
+        'infAdProd',
+    )
+
+
+def _imposto():
+    return Imposto(
+            icms=ICMSSN102(Orig='0', CSOSN='500'),
+            pis=PISSN(CST='49'),
+            cofins=COFINSSN(CST='49'))
+
+
+def _linhas(itens):
+    return [(
+            '{:d}'.format(n),
+            '7891234567895' if n % 2 else None,
+            'Pão & <Café> nº {:d}'.format(n),
+            '5102',
+            'UN',
+            Decimal('1.0000'),
+            Decimal('5.75'),
+            'A',
+            Decimal('0.25') if n % 3 else None,
+            'Informação' if n % 5 == 0 else None,
+        ) for n in range(1, itens + 1)]
+
+
+def _venda(detalhamentos):
+    return CFeVenda(
+            CNPJ='08427847000169',
+            signAC=constantes.ASSINATURA_AC_TESTE,
+            numeroCaixa=1,
+            emitente=Emitente(
+                    CNPJ='61099008000141',
+                    IE='111111111111',
+                    indRatISSQN=constantes.C16_NAO_RATEADO),
+            detalhamentos=detalhamentos,
+            pagamentos=[
+                    MeioPagamento(
+                            cMP=constantes.WA03_DINHEIRO,
+                            vMP=Decimal('100.00'))])
+
+
+def _detalhamentos(linhas, imposto):
+    detalhamentos = []
+    for linha in linhas:
+        dados = {c: v for c, v in zip(_CAMPOS, linha) if v is not None}
+        infAdProd = dados.pop('infAdProd', None)
+        detalhamentos.append(Detalhamento(
+                produto=ProdutoServico(**dados),
+                imposto=imposto,
+                **({'infAdProd': infAdProd} if infAdProd else {})))
+    return detalhamentos
+
+
+@pytest.mark.parametrize('opcoes', [{}, {'forcar_unicode': True}])
+def test_mesmo_documento_dos_objetos(opcoes):
+    imposto = _imposto()
+    linhas = _linhas(30)
+    esperado = _venda(_detalhamentos(linhas, imposto)).documento(**opcoes)
+
+    venda = _venda(LoteDetalhamentos.de_linhas(
+            _CAMPOS, linhas, imposto=imposto))
+    assert venda.documento(direto=True, **opcoes) == esperado
+    assert venda.documento(**opcoes) == esperado  # via ElementTree
+
+
+def test_colunas_impostos_e_observacoes():
+    impostos = [
+            _imposto(),
+            Imposto(
+                    pis=PISAliq(
+                            CST='01',
+                            vBC=Decimal('1.00'),
+                            pPIS=Decimal('0.0065')),
+                    cofins=COFINSAliq(
+                            CST='01',
+                            vBC=Decimal('1.00'),
+                            pCOFINS=Decimal('0.0300')))]
+    observacoes = [
+            None,
+            [ObsFiscoDet(xCampoDet='Cód.', xTextoDet='Ação & reação')]]
+    lote = LoteDetalhamentos(
+            cProd=['1', '2'],
+            xProd=['A', 'B'],
+            CFOP=['5102', '5102'],
+            uCom=['UN', 'KG'],
+            qCom=[Decimal('1.0000'), Decimal('0.5000')],
+            vUnCom=[Decimal('5.75'), Decimal('10.00')],
+            indRegra=['A', 'T'],
+            imposto=impostos,
+            observacoes_fisco=observacoes)
+
+    assert len(lote) == 2
+    assert lote.coluna('uCom') == ('UN', 'KG')
+    assert lote.coluna('NCM') == (None, None)
+
+    detalhamentos = list(lote)
+    assert detalhamentos[1].imposto is impostos[1]
+    assert detalhamentos[1].produto.observacoes_fisco[0].xCampoDet == 'Cód.'
+    assert not hasattr(detalhamentos[0].produto, 'NCM')
+
+    assert _venda(lote).documento(direto=True) == \
+        _venda(detalhamentos).documento()
+
+
+def test_erros_por_item():
+    linhas = _linhas(4)
+    linhas[1] = linhas[1][:3] + ('x',) + linhas[1][4:]  # CFOP
+    linhas[3] = (None,) + linhas[3][1:]  # cProd
+    lote = LoteDetalhamentos.de_linhas(_CAMPOS, linhas, imposto=_imposto())
+
+    with pytest.raises(cerberus.DocumentError):
+        _venda(lote).documento(direto=True)
+
+    erros = lote.erros
+    assert sorted(erros) == [2, 4]
+    assert list(erros[2]) == ['CFOP']
+    assert list(erros[4]) == ['cProd']
+
+    # a coluna inexistente vale para todos os itens
+    lote = LoteDetalhamentos(cProd=['1', '2'], imposto=_imposto())
+    with pytest.raises(cerberus.DocumentError):
+        lote.validar()
+    assert sorted(lote.erros) == [1, 2]
+    assert 'xProd' in lote.erros[1]
+
+
+def test_colunas_invalidas():
+    with pytest.raises(AttributeError):
+        LoteDetalhamentos(desconhecido=['x'], imposto=_imposto())
+
+    with pytest.raises(ValueError):
+        LoteDetalhamentos(
+                cProd=['1', '2'],
+                xProd=['A'],
+                imposto=_imposto())
+
+    with pytest.raises(ValueError):
+        LoteDetalhamentos(cProd=['1', '2'], imposto=[_imposto()])
+
+    with pytest.raises(ValueError):
+        LoteDetalhamentos(cProd=['1'])
+
+
+def test_acrescentar_item_ao_lote():
+    imposto = _imposto()
+    linhas = _linhas(3)
+    venda = _venda(LoteDetalhamentos.de_linhas(
+            _CAMPOS, linhas, imposto=imposto))
+    venda.adicionar_detalhamento(_detalhamentos(_linhas(4)[3:], imposto)[0])
+
+    assert len(venda.detalhamentos) == 4
+    assert venda.documento(direto=True) == _venda(
+            _detalhamentos(_linhas(4), imposto)).documento()
+
+
+def test_benchmark_lote():
+    # compara o tempo para gerar o XML de uma venda com 500 itens a partir
+    # de objetos e a partir de um lote (veja o resultado executando pytest
+    # com a opção "-s")
+    imposto = _imposto()
+    linhas = _linhas(500)
+
+    def _objetos():
+        return _venda(_detalhamentos(linhas, imposto)).documento(direto=True)
+
+    def _lote():
+        return _venda(LoteDetalhamentos.de_linhas(
+                _CAMPOS, linhas, imposto=imposto)).documento(direto=True)
+
+    t_objetos = min(timeit.repeat(_objetos, number=1, repeat=3))
+    t_lote = min(timeit.repeat(_lote, number=1, repeat=3))
+
+    print((
+            '\nCF-e de venda (500 itens): objetos {:.1f}ms, '
+            'lote {:.1f}ms ({:.1f}x)'
+        ).format(t_objetos * 1e3, t_lote * 1e3, t_objetos / t_lote))
+
+    assert _lote() == _objetos()
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+#
+# tests/entidades/test_perfilterminal.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import timeit
+
+from decimal import Decimal
+
+import cerberus
+import pytest
+
+from satcomum import constantes
+
+from satcfe.entidades import CFeCancelamento
+from satcfe.entidades import CFeVenda
+from satcfe.entidades import COFINSSN
+from satcfe.entidades import Detalhamento
+from satcfe.entidades import Emitente
+from satcfe.entidades import ICMSSN102
+from satcfe.entidades import Imposto
+from satcfe.entidades import MeioPagamento
+from satcfe.entidades import PerfilTerminal
+from satcfe.entidades import PISSN
+from satcfe.entidades import ProdutoServico
+
+
+_CNPJ_AC = '08427847000169'
+
+_CHAVE = 'CFe13190208723218000186599000040190000740711801'
+
+
+def _emitente():
+    return Emitente(
+            CNPJ='61099008000141',
+            IE='111111111111',
+            IM='12345',
+            cRegTribISSQN=constantes.C15_SOCIEDADE_PROFISSIONAIS,
+            indRatISSQN=constantes.C16_NAO_RATEADO)
+
+
+def _perfil(**kwargs):
+    dados = dict(
+            CNPJ=_CNPJ_AC,
+            signAC=constantes.ASSINATURA_AC_TESTE,
+            numeroCaixa=2,
+            emitente=_emitente())
+    dados.update(kwargs)
+    return PerfilTerminal(**dados)
+
+
+def _itens():
+    return dict(
+            detalhamentos=[
+                    Detalhamento(
+                            produto=ProdutoServico(
+                                    cProd='1',
+                                    xProd='Café',
+                                    CFOP='5102',
+                                    uCom='UN',
+                                    qCom=Decimal('1.0000'),
+                                    vUnCom=Decimal('5.75'),
+                                    indRegra='A'),
+                            imposto=Imposto(
+                                    icms=ICMSSN102(Orig='0', CSOSN='500'),
+                                    pis=PISSN(CST='49'),
+                                    cofins=COFINSSN(CST='49')))],
+            pagamentos=[
+                    MeioPagamento(
+                            cMP=constantes.WA03_DINHEIRO,
+                            vMP=Decimal('10.00'))])
+
+
+def _venda_sem_perfil():
+    return CFeVenda(
+            CNPJ=_CNPJ_AC,
+            signAC=constantes.ASSINATURA_AC_TESTE,
+            numeroCaixa=2,
+            emitente=_emitente(),
+            **_itens())
+
+
+@pytest.fixture
+def validacoes(monkeypatch):
+    validadas = []
+
+    def _contar(classe):
+        validar = classe.validar
+
+        def _validar(self):
+            validadas.append(classe.__name__)
+            validar(self)
+
+        monkeypatch.setattr(classe, 'validar', _validar)
+
+    _contar(PerfilTerminal)
+    _contar(Emitente)
+    return validadas
+
+
+@pytest.mark.parametrize('opcoes', [{}, {'forcar_unicode': True}])
+def test_mesmo_documento(opcoes):
+    esperado = _venda_sem_perfil().documento(**opcoes)
+    venda = CFeVenda(perfil=_perfil(), **_itens())
+    assert venda.documento(direto=True, **opcoes) == esperado
+    assert venda.documento(**opcoes) == esperado
+
+    esperado = CFeCancelamento(
+            chCanc=_CHAVE,
+            CNPJ=_CNPJ_AC,
+            signAC=constantes.ASSINATURA_AC_TESTE,
+            numeroCaixa=2).documento(**opcoes)
+    cancelamento = CFeCancelamento(perfil=_perfil(), chCanc=_CHAVE)
+    assert cancelamento.documento(direto=True, **opcoes) == esperado
+    assert cancelamento.documento(**opcoes) == esperado
+
+
+def test_perfil_validado_uma_unica_vez(validacoes):
+    perfil = _perfil()
+    for _ in range(3):
+        CFeVenda(perfil=perfil, **_itens()).documento(direto=True)
+        CFeCancelamento(perfil=perfil, chCanc=_CHAVE).documento(direto=True)
+    assert validacoes == ['PerfilTerminal', 'Emitente']
+
+    del validacoes[:]
+    perfil.emitente.IM = '54321'
+    documento = CFeVenda(perfil=perfil, **_itens()).documento(direto=True)
+    assert '<IM>54321</IM>' in documento
+    assert validacoes == ['PerfilTerminal', 'Emitente']
+
+    del validacoes[:]
+    perfil.numeroCaixa = 3
+    documento = CFeVenda(perfil=perfil, **_itens()).documento(direto=True)
+    assert '<numeroCaixa>003</numeroCaixa>' in documento
+    assert validacoes == ['PerfilTerminal', 'Emitente']
+
+
+def test_documento_diferente_do_perfil():
+    perfil = _perfil()
+    venda = CFeVenda(perfil=perfil, **_itens())
+    venda.numeroCaixa = 1000
+    with pytest.raises(cerberus.DocumentError):
+        venda.documento(direto=True)
+    assert list(venda.erros['CFeVenda']) == ['numeroCaixa']
+
+    venda = CFeVenda(perfil=perfil, numeroCaixa=5, **_itens())
+    assert '<numeroCaixa>005</numeroCaixa>' in venda.documento(direto=True)
+
+    outro = _emitente()
+    outro.IM = '99999'
+    venda = CFeVenda(perfil=perfil, emitente=outro, **_itens())
+    assert '<IM>99999</IM>' in venda.documento(direto=True)
+
+
+@pytest.mark.parametrize('direto', [True, False])
+def test_perfil_invalido(direto):
+    perfil = _perfil(signAC='invalida')
+    with pytest.raises(cerberus.DocumentError):
+        CFeVenda(perfil=perfil, **_itens()).documento(direto=direto)
+    assert list(perfil.erros['PerfilTerminal']) == ['signAC']
+
+    perfil = _perfil(CNPJ='08427847000160')
+    with pytest.raises(cerberus.DocumentError):
+        CFeCancelamento(perfil=perfil, chCanc=_CHAVE).documento(direto=direto)
+    assert list(perfil.erros['PerfilTerminal']) == ['CNPJ']
+
+    # o cancelamento não depende do emitente
+    perfil = _perfil(emitente=None)
+    cancelamento = CFeCancelamento(perfil=perfil, chCanc=_CHAVE)
+    assert cancelamento.documento(direto=direto).endswith('</CFeCanc>')
+
+
+def test_benchmark_perfil():
+    # compara o tempo para gerar o XML de uma venda de um item com e sem
+    # o perfil do terminal (veja o resultado executando pytest com "-s")
+    perfil = _perfil()
+
+    def _sem_perfil():
+        return _venda_sem_perfil().documento(direto=True)
+
+    def _com_perfil():
+        return CFeVenda(perfil=perfil, **_itens()).documento(direto=True)
+
+    assert _com_perfil() == _sem_perfil()
+
+    t_sem = min(timeit.repeat(_sem_perfil, number=100, repeat=3))
+    t_com = min(timeit.repeat(_com_perfil, number=100, repeat=3))
+
+    print((
+            '\nCF-e de venda (1 item): sem perfil {:.2f}ms, '
+            'com perfil {:.2f}ms ({:.1f}x)'
+        ).format(t_sem * 10, t_com * 10, t_sem / t_com))
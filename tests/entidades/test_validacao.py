@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+#
+# tests/entidades/test_validacao.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import random
+import timeit
+
+from decimal import Decimal
+
+import pytest
+import cerberus
+
+from satcomum import constantes
+
+from satcfe import entidades
+from satcfe import validacao
+from satcfe.entidades import CFeVenda
+from satcfe.entidades import COFINSSN
+from satcfe.entidades import Detalhamento
+from satcfe.entidades import Emitente
+from satcfe.entidades import Entidade
+from satcfe.entidades import ExtendedValidator
+from satcfe.entidades import ICMSSN102
+from satcfe.entidades import Imposto
+from satcfe.entidades import MeioPagamento
+from satcfe.entidades import PISSN
+from satcfe.entidades import ProdutoServico
+from satcfe.rede import ConfiguracaoRede
+from satcfe.validacao import ValidadorCompilado
+
+
+def _classes_entidades():
+    classes = [ConfiguracaoRede]
+    for nome in dir(entidades):
+        candidata = getattr(entidades, nome)
+        if isinstance(candidata, type) \
+                and issubclass(candidata, Entidade) \
+                and candidata._schema:
+            classes.append(candidata)
+    return classes
+
+
+def _candidatos(regras):
+    # valores válidos e inválidos para as regras de um campo
+    candidatos = [None, 1, Decimal('-1'), '', 'x' * 61, [], ['x']]
+    candidatos.extend(regras.get('allowed', []))
+    if 'allowed' in regras:
+        candidatos.append('?')
+    for regra in ('min', 'max'):
+        if regra in regras:
+            limite = regras[regra]
+            candidatos.extend([limite, limite - 1, limite + 1])
+    for regra in ('minlength', 'maxlength'):
+        if regra in regras:
+            n = regras[regra]
+            candidatos.extend(['9' * n, '9' * (n + 1), '9' * max(0, n - 1)])
+    if regras.get('type') == 'decimal':
+        candidatos.extend([Decimal('0.00'), Decimal('1.23'), 1.23])
+    if regras.get('type') == 'integer':
+        candidatos.extend([0, 5, True])
+    check_with = regras.get('check_with')
+    if check_with == 'cnpj':
+        candidatos.extend(['08427847000169', '08427847000160'])
+    elif check_with == 'cpf':
+        candidatos.extend(['11122233396', '11122233300'])
+    elif check_with == 'uf':
+        candidatos.extend(['SP', 'XX'])
+    elif check_with == 'assinatura_ac':
+        candidatos.extend([constantes.ASSINATURA_AC_TESTE, 'a' * 344])
+    elif check_with == 'ipv4':
+        candidatos.extend(['10.0.0.1', '10.0.0.256', '10.0.0'])
+    if 'regex' in regras:
+        candidatos.extend(['1', '12', '1234', '123456789012', 'abc'])
+    return candidatos
+
+
+def _documentos(schema, quantidade, aleatorio):
+    candidatos = {campo: _candidatos(r) for campo, r in schema.items()}
+    for _ in range(quantidade):
+        documento = {}
+        for campo, valores in candidatos.items():
+            if aleatorio.random() < 0.6:
+                documento[campo] = aleatorio.choice(valores)
+        yield documento
+
+
+def _validar(validador, documento):
+    try:
+        return validador.validate(documento), validador.errors, None
+    except Exception as ex:
+        return None, None, type(ex)
+
+
+@pytest.mark.parametrize('classe', _classes_entidades(),
+        ids=lambda classe: classe.__name__)
+def test_mesmos_erros_do_cerberus(classe):
+    aleatorio = random.Random(classe.__name__)
+    referencia = classe._validator_class(classe._schema)
+    compilado = ValidadorCompilado(classe._schema, classe._validator_class)
+    for documento in _documentos(classe._schema, 300, aleatorio):
+        esperado = _validar(referencia, documento)
+        assert _validar(compilado, documento) == esperado, documento
+
+
+def test_campo_desconhecido_e_regras_genericas():
+    schema = {
+            'lista': {'allowed': ['a', 'b'], 'minlength': 1, 'nullable': True},
+            'texto': {'regex': r'^\d+', 'check_with': [lambda f, v, e: e(
+                    f, 'sempre falha')]},
+        }
+    referencia = ExtendedValidator(schema)
+    compilado = ValidadorCompilado(schema, ExtendedValidator)
+    for documento in (
+            {'lista': ['a', 'c'], 'texto': 'x1'},
+            {'lista': [], 'texto': 1, 'outro': 1},
+            {'lista': None, 'texto': '123'},
+            {'lista': 'c'}):
+        assert _validar(compilado, documento) == _validar(
+                referencia, documento)
+
+
+def test_ipv4_invalido_resulta_em_erro():
+    schema = {'ip': {'type': 'string', 'check_with': 'ipv4'}}
+    referencia = ExtendedValidator(schema)
+    compilado = ValidadorCompilado(schema, ExtendedValidator)
+    for valor in (None, '', '10.0.0', '10.0.0.x', '10.0.0.256', '1.2.3.4.5'):
+        documento = {'ip': valor}
+        resultado = _validar(compilado, documento)
+        assert resultado == _validar(referencia, documento)
+        assert resultado[0] is False
+        mensagem = 'Endereco IPv4 invalido: {!r}'.format(valor)
+        assert mensagem in resultado[1]['ip']
+
+
+def test_regra_nao_suportada():
+    with pytest.raises(ValueError):
+        ValidadorCompilado({'x': {'coerce': int}}, ExtendedValidator)
+
+
+@pytest.fixture
+def validacao_compilada():
+    Entidade.definir_validacao(validacao.COMPILADA)
+    yield
+    Entidade.definir_validacao(validacao.CERBERUS)
+
+
+def test_selecao_global(validacao_compilada):
+    produto = ProdutoServico(
+            cProd='123456',
+            xProd='BORRACHA STAEDTLER',
+            CFOP='x',
+            uCom='UN',
+            qCom=Decimal('1.0000'),
+            vUnCom=Decimal('5.75'),
+            indRegra='A')
+    assert isinstance(produto._validador()[0], ValidadorCompilado)
+
+    with pytest.raises(cerberus.DocumentError):
+        produto.validar()
+    assert list(produto.erros['ProdutoServico']) == ['CFOP']
+
+
+def test_selecao_por_entidade():
+    PISSN.definir_validacao(validacao.COMPILADA)
+    try:
+        assert isinstance(
+                PISSN(CST='49')._validador()[0],
+                ValidadorCompilado)
+        assert isinstance(
+                COFINSSN(CST='49')._validador()[0],
+                ExtendedValidator)
+    finally:
+        PISSN.definir_validacao(None)
+
+    assert '_validacao' not in PISSN.__dict__
+    assert isinstance(PISSN(CST='49')._validador()[0], ExtendedValidator)
+
+    with pytest.raises(ValueError):
+        PISSN.definir_validacao('desconhecida')
+
+
+def test_schema_nao_suportado_recorre_ao_cerberus(validacao_compilada):
+    class _Convertida(Entidade):
+        _schema = {'n': {'type': 'integer', 'coerce': int}}
+
+    assert isinstance(_Convertida(n='1')._validador()[0], ExtendedValidator)
+
+
+def _venda(itens):
+    return CFeVenda(
+            CNPJ='08427847000169',
+            signAC=constantes.ASSINATURA_AC_TESTE,
+            numeroCaixa=2,
+            emitente=Emitente(
+                    CNPJ='61099008000141',
+                    IE='111111111111',
+                    indRatISSQN='N'),
+            detalhamentos=[
+                    Detalhamento(
+                            produto=ProdutoServico(
+                                    cProd=str(i),
+                                    xProd='Produto #{:d}'.format(i),
+                                    CFOP='5102',
+                                    uCom='UN',
+                                    qCom=Decimal('1.0000'),
+                                    vUnCom=Decimal('5.75'),
+                                    indRegra='A'),
+                            imposto=Imposto(
+                                    icms=ICMSSN102(Orig='0', CSOSN='500'),
+                                    pis=PISSN(CST='49'),
+                                    cofins=COFINSSN(CST='49')))
+                    for i in range(1, itens + 1)],
+            pagamentos=[
+                    MeioPagamento(
+                            cMP=constantes.WA03_DINHEIRO,
+                            vMP=Decimal('3000.00'))])
+
+
+def test_benchmark_validacao():
+    # compara o tempo para gerar o XML de uma venda com 500 itens, validada
+    # pelo Cerberus e pela validação compilada (veja o resultado executando
+    # pytest com a opção "-s")
+    venda = _venda(500)
+
+    def _medir(tipo):
+        Entidade.definir_validacao(tipo)
+        try:
+            documento = venda.documento()  # aquece o cache de validadores
+            tempo = min(timeit.repeat(venda.documento, number=1, repeat=3))
+        finally:
+            Entidade.definir_validacao(validacao.CERBERUS)
+        return documento, tempo
+
+    doc_cerberus, t_cerberus = _medir(validacao.CERBERUS)
+    doc_compilada, t_compilada = _medir(validacao.COMPILADA)
+
+    print((
+            '\nCF-e de venda (500 itens): cerberus {:.1f}ms, '
+            'compilada {:.1f}ms ({:.1f}x)'
+        ).format(
+            t_cerberus * 1e3,
+            t_compilada * 1e3,
+            t_cerberus / t_compilada))
+
+    assert doc_compilada == doc_cerberus
+
+
+def test_memo_verificacao():
+    verificados = []
+
+    def _verificar(valor):
+        verificados.append(valor)
+        return valor.isdigit()
+
+    memo = validacao.MemoVerificacao(_verificar, capacidade=2)
+    assert memo('1') is True
+    assert memo('x') is False
+    assert memo('1') is True  # acerto; '1' passa a ser o mais recente
+    assert memo('2') is True  # descarta 'x', o menos usado recentemente
+    assert memo('x') is False
+    assert verificados == ['1', 'x', '2', 'x']
+    assert memo.estatisticas() == validacao.EstatisticasMemo(
+            acertos=1,
+            falhas=4,
+            tamanho=2,
+            capacidade=2)
+
+    memo.limpar()
+    memo.aquecer(['3', '4'])
+    assert memo('4') is True
+    assert memo.estatisticas() == (1, 0, 2, 2)
+
+    with pytest.raises(AttributeError):
+        memo(['nao', 'hashable'])  # verificado diretamente
+
+
+def test_memo_cnpj_e_cpf():
+    memo_cnpj = ExtendedValidator.memo_cnpj
+    memo_cnpj.limpar()
+    memo_cnpj.aquecer(['61099008000141'])
+
+    for _ in range(3):
+        Emitente(
+                CNPJ='61099008000141',
+                IE='111111111111',
+                indRatISSQN='N').validar()
+    assert memo_cnpj.estatisticas()[:2] == (3, 0)
+
+    emitente = Emitente(
+            CNPJ='61099008000140',
+            IE='111111111111',
+            indRatISSQN='N')
+    for _ in range(2):
+        with pytest.raises(cerberus.DocumentError):
+            emitente.validar()
+        assert 'CNPJ' in emitente.erros['Emitente']
+    assert memo_cnpj.estatisticas()[:2] == (4, 1)
@@ -352,7 +352,7 @@ char *ExtrairLogs(
             "pbUFGaW0KMjAxOTA2MjAxMjUyMTh8U0FUfGVycm98RXJybyBhbyBnZXJhciBj"\
             "ZXJ0aWZpY2Fkbw==";
 
-    static char resp[256];
+    static char resp[512];
     sprintf(
                 resp,
                 "%d|%05d|%s|%s|%s|%s",
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_bibliotecasat.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import pytest
+
+from satcfe.base import FUNCTION_PROTOTYPES
+from satcfe.base import BibliotecaSAT
+
+
+@pytest.fixture(scope='module')
+def biblioteca(request):
+    return BibliotecaSAT(
+            request.config.getoption('--lib-caminho'),
+            convencao=request.config.getoption('--lib-convencao'))
+
+
+@pytest.mark.acessa_sat
+def test_funcoes_vinculadas_na_carga(biblioteca):
+    for funcname, proto in FUNCTION_PROTOTYPES.items():
+        fptr = biblioteca.funcao(funcname)
+        assert fptr.argtypes == proto.argtypes
+        assert fptr.restype is proto.restype
+        assert biblioteca.funcao(funcname) is fptr
+
+
+@pytest.mark.acessa_sat
+def test_funcao_sem_prototipo(biblioteca):
+    with pytest.raises(ValueError):
+        biblioteca.funcao('FuncaoInexistente')
+
+
+@pytest.mark.acessa_sat
+def test_ponteiros_exclusivos(biblioteca):
+    # o ponteiro mantido em cache pela instância CDLL/WinDLL não deve ser o
+    # mesmo ponteiro vinculado pela biblioteca SAT
+    fptr = getattr(biblioteca.ref, 'ConsultarSAT')
+    assert fptr is not biblioteca.funcao('ConsultarSAT')
@@ -69,6 +69,12 @@ def test_respostas_de_sucesso(datadir):
     # foco não é testar a produção da messa de dados do QRCode;
     assert resposta.qrcode()[:9] == '351509087'
 
+    # os acessores compartilham a mesma árvore do XML
+    assert resposta.chave() == chave_consulta
+    assert resposta.valor_total() == Decimal('2.00')
+    assert resposta.quantidade_itens() == 0
+    assert resposta.arvore() is resposta.arvore()
+
 
 def test_respostas_de_falha(datadir):
     arquivo = text(datadir.join('respostas-de-falha.txt'))
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_clienteasync.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+# Clientes assíncronos requerem Python 3.6 ou superior; em versões
+# anteriores este módulo é ignorado na coleta (veja "conftest.py");
+import asyncio
+
+import pytest
+
+from satcfe.clienteasync import ClienteSATAsync
+from satcfe.clienteasync import ClienteSATHubAsync
+from satcfe.excecoes import ExcecaoRespostaSAT
+from satcfe.resposta import RespostaSAT
+
+
+class _BibliotecaSimulada(object):
+
+    def funcao(self, funcname):
+        return self._consultar_sat
+
+    def _consultar_sat(self, sessao):
+        return '{:d}|08000|SAT em Operacao||'.format(sessao).encode('utf-8')
+
+
+def _executar(corrotina):
+    # o mesmo que asyncio.run, que existe apenas a partir do Python 3.7
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(corrotina)
+    finally:
+        loop.close()
+
+
+def test_cliente_local_assincrono():
+    cliente = ClienteSATAsync(_BibliotecaSimulada())
+
+    async def _consultar():
+        consultas = [cliente.consultar_sat() for _ in range(5)]
+        return await asyncio.gather(*consultas)
+
+    try:
+        respostas = _executar(_consultar())
+    finally:
+        cliente.encerrar()
+
+    assert all(isinstance(r, RespostaSAT) for r in respostas)
+    assert all(r.EEEEE == '08000' for r in respostas)
+
+
+@pytest.mark.acessa_sat
+@pytest.mark.invoca_consultarsat
+def test_cliente_local_assincrono_biblioteca_sat(clientesatlocal):
+    cliente = ClienteSATAsync(
+            clientesatlocal.despachante,
+            codigo_ativacao=clientesatlocal.codigo_ativacao)
+    try:
+        resposta = _executar(cliente.consultar_sat())
+    finally:
+        cliente.encerrar()
+    assert resposta.EEEEE == '08000'
+
+
+def _executar_com_sathub(corrotina):
+    web = pytest.importorskip('aiohttp.web')
+
+    requisicoes = []
+
+    async def _consultarsat(request):
+        dados = await request.post()
+        requisicoes.append(dict(dados))
+        return web.json_response({
+                'retorno': '123456|08000|SAT em Operacao||',
+            })
+
+    async def _bloquearsat(request):
+        return web.json_response({'retorno': '123456|16001|Falhou||'})
+
+    async def _principal():
+        app = web.Application()
+        app.router.add_post('/hub/v1/consultarsat', _consultarsat)
+        app.router.add_post('/hub/v1/bloquearsat', _bloquearsat)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        try:
+            async with ClienteSATHubAsync('127.0.0.1', port) as cliente:
+                return await corrotina(cliente)
+        finally:
+            await runner.cleanup()
+
+    return _executar(_principal()), requisicoes
+
+
+def test_cliente_sathub_assincrono():
+
+    async def _consultar(cliente):
+        return [await cliente.consultar_sat() for _ in range(3)]
+
+    respostas, requisicoes = _executar_com_sathub(_consultar)
+
+    assert all(r.EEEEE == '08000' for r in respostas)
+    assert requisicoes == [{'numero_caixa': '1'}] * 3
+
+
+def test_cliente_sathub_assincrono_excecao():
+
+    async def _bloquear(cliente):
+        with pytest.raises(ExcecaoRespostaSAT):
+            await cliente.bloquear_sat()
+
+    _executar_com_sathub(_bloquear)
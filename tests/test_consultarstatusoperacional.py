@@ -20,6 +20,8 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import timeit
+
 from io import open
 
 from builtins import str as text
@@ -29,7 +31,9 @@ import pytest
 from satcfe.excecoes import ErroRespostaSATInvalida
 from satcfe.excecoes import ExcecaoRespostaSAT
 from satcfe.resposta import RespostaConsultarStatusOperacional
+from satcfe.resposta import RespostaSAT
 from satcfe.resposta.consultarstatusoperacional import DESBLOQUEADO
+from satcfe.resposta.padrao import SOB_DEMANDA
 from satcfe.util import as_date
 from satcfe.util import as_datetime
 
@@ -104,6 +108,65 @@ def test_respostas_invalidas(datadir):
             RespostaConsultarStatusOperacional.analisar(retorno)
 
 
+
+def _campos():
+    return [campo for campo, _ in RespostaSAT.CAMPOS] + list(
+            RespostaConsultarStatusOperacional.__slots__)
+
+
+def test_conversao_sob_demanda(datadir):
+    arquivo = text(datadir.join('respostas-de-sucesso.txt'))
+    with open(arquivo, 'r', encoding='utf-8') as f:
+        r_sucessos = f.read().splitlines()
+
+    imediatas = [RespostaConsultarStatusOperacional.analisar(retorno)
+                 for retorno in r_sucessos]
+
+    RespostaConsultarStatusOperacional.definir_conversao(SOB_DEMANDA)
+    try:
+        for retorno, imediata in zip(r_sucessos, imediatas):
+            resposta = RespostaConsultarStatusOperacional.analisar(retorno)
+            assert resposta.status == imediata.status
+            for campo in _campos():
+                assert getattr(resposta, campo) == getattr(imediata, campo)
+
+        # os campos ainda não convertidos não participam da falha
+        with pytest.raises(ExcecaoRespostaSAT):
+            RespostaConsultarStatusOperacional.analisar(
+                    r_sucessos[0].replace('|10000|', '|10098|', 1))
+    finally:
+        RespostaConsultarStatusOperacional.definir_conversao(None)
+
+
+def test_benchmark_conversao_sob_demanda(datadir):
+    # compara o tempo de uma consulta periódica que verifica apenas o
+    # estado de operação do equipamento, com a conversão imediata e sob
+    # demanda (veja o resultado executando pytest com a opção "-s")
+    arquivo = text(datadir.join('respostas-de-sucesso.txt'))
+    with open(arquivo, 'r', encoding='utf-8') as f:
+        retorno = f.read().splitlines()[0]
+
+    def _consultar():
+        resposta = RespostaConsultarStatusOperacional.analisar(retorno)
+        return resposta.ESTADO_OPERACAO == DESBLOQUEADO
+
+    t_imediata = min(timeit.repeat(_consultar, number=1000, repeat=3))
+    RespostaConsultarStatusOperacional.definir_conversao(SOB_DEMANDA)
+    try:
+        assert _consultar()
+        t_sob_demanda = min(timeit.repeat(_consultar, number=1000, repeat=3))
+    finally:
+        RespostaConsultarStatusOperacional.definir_conversao(None)
+
+    print((
+            '\nConsultarStatusOperacional: imediata {:.2f}us, '
+            'sob demanda {:.2f}us ({:.1f}x)'
+        ).format(
+                t_imediata * 1e3,
+                t_sob_demanda * 1e3,
+                t_imediata / t_sob_demanda))
+
+
 @pytest.mark.acessa_sat
 @pytest.mark.invoca_consultarstatusoperacional
 def test_funcao_consultarstatusoperacional(clientesatlocal):
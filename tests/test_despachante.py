@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_despachante.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+import time
+
+import pytest
+
+from satcfe.base import BibliotecaSAT
+from satcfe.base import DespachanteSAT
+from satcfe.base import FuncoesSAT
+from satcfe.excecoes import ErroEquipamentoSuspeito
+from satcfe.excecoes import ErroTempoEsgotado
+
+
+class _BibliotecaSimulada(object):
+    """Simula uma biblioteca SAT que responde a partir de um buffer estático,
+    registrando quantas invocações estiveram em execução simultaneamente.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.simultaneas = 0
+        self.maximo_simultaneas = 0
+        self._trava = threading.Lock()
+
+    def funcao(self, funcname):
+        return self._consultar_sat
+
+    def _consultar_sat(self, sessao):
+        with self._trava:
+            self.simultaneas += 1
+            self.maximo_simultaneas = max(
+                    self.maximo_simultaneas,
+                    self.simultaneas)
+        self.buffer[:] = '{:d}|08000|SAT em Operacao||'.format(
+                sessao).encode('utf-8')
+        time.sleep(0.001)
+        resposta = bytes(self.buffer)
+        with self._trava:
+            self.simultaneas -= 1
+        return resposta
+
+
+class _BibliotecaTravada(object):
+    """Simula uma biblioteca SAT cujas funções permanecem travadas enquanto o
+    evento ``liberar`` não for sinalizado.
+    """
+
+    def __init__(self):
+        self.liberar = threading.Event()
+        self.liberar.set()
+        self.invocadas = []
+
+    def funcao(self, funcname):
+        def _funcao(sessao, *args):
+            self.invocadas.append(funcname)
+            self.liberar.wait()
+            return '{:d}|08000|SAT em Operacao||'.format(
+                    sessao).encode('utf-8')
+        return _funcao
+
+
+def _invocar_em_threads(funcoes, total_threads=8, por_thread=10):
+    erros = []
+
+    def _trabalho(indice):
+        for n in range(por_thread):
+            sessao = 100000 + (indice * por_thread) + n
+            retorno = funcoes._invocar('ConsultarSAT', sessao)
+            if not retorno.startswith('{:d}|'.format(sessao)):
+                erros.append((sessao, retorno))
+
+    threads = [
+            threading.Thread(target=_trabalho, args=(i,))
+            for i in range(total_threads)
+        ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return erros
+
+
+def test_invocacoes_serializadas():
+    biblioteca = _BibliotecaSimulada()
+    despachante = DespachanteSAT(biblioteca)
+    funcoes = FuncoesSAT(despachante)
+
+    erros = _invocar_em_threads(funcoes)
+
+    assert not erros
+    assert biblioteca.maximo_simultaneas == 1
+    assert despachante.invocacoes == 80
+    assert despachante.aguardando == 0
+    assert despachante.espera_maxima >= despachante.espera_media >= 0
+
+
+def test_despachante_compartilhado():
+    despachante = DespachanteSAT(_BibliotecaSimulada())
+    funcoes_1 = FuncoesSAT(despachante)
+    funcoes_2 = FuncoesSAT(despachante)
+    assert funcoes_1.despachante is funcoes_2.despachante
+    assert funcoes_1.biblioteca is despachante.biblioteca
+
+
+@pytest.mark.acessa_sat
+@pytest.mark.invoca_consultarsat
+def test_invocacoes_serializadas_biblioteca_sat(request):
+    biblioteca = BibliotecaSAT(
+            request.config.getoption('--lib-caminho'),
+            convencao=request.config.getoption('--lib-convencao'))
+    funcoes = FuncoesSAT(biblioteca)
+    assert not _invocar_em_threads(funcoes)
+
+
+def test_prazo_esgotado_equipamento_suspeito():
+    biblioteca = _BibliotecaTravada()
+    despachante = DespachanteSAT(biblioteca, prazo_padrao=0.1)
+
+    biblioteca.liberar.clear()
+    with pytest.raises(ErroTempoEsgotado):
+        despachante.invocar('ExtrairLogs', 123456)
+
+    assert despachante.suspeito
+    assert despachante.tempos_esgotados == 1
+
+    # enquanto a função travada não retornar, as próximas invocações
+    # aguardam na fila e são liberadas ao final do próprio prazo
+    with pytest.raises(ErroEquipamentoSuspeito):
+        despachante.invocar('ConsultarStatusOperacional', 123457)
+
+    assert biblioteca.invocadas == ['ExtrairLogs']
+
+    # a função travada retorna; a próxima invocação sonda o equipamento
+    biblioteca.liberar.set()
+    retorno = despachante.invocar('ConsultarStatusOperacional', 123458)
+    assert retorno.startswith(b'123458|')
+    assert not despachante.suspeito
+    assert biblioteca.invocadas == [
+            'ExtrairLogs',
+            'ConsultarSAT',
+            'ConsultarStatusOperacional',
+        ]
+
+
+def test_sondagem_sem_resposta():
+    biblioteca = _BibliotecaTravada()
+    despachante = DespachanteSAT(biblioteca, prazos={
+            'ConsultarSAT': 0.1,
+            'EnviarDadosVenda': 0.1,
+        })
+
+    biblioteca.liberar.clear()
+    with pytest.raises(ErroTempoEsgotado):
+        despachante.invocar('EnviarDadosVenda', 123456)
+
+    # libera a função travada, mas trava novamente antes da sondagem
+    biblioteca.liberar.set()
+    time.sleep(0.05)
+    biblioteca.liberar.clear()
+
+    with pytest.raises(ErroEquipamentoSuspeito):
+        despachante.invocar('EnviarDadosVenda', 123457)
+
+    assert despachante.suspeito
+    assert biblioteca.invocadas == ['EnviarDadosVenda', 'ConsultarSAT']
+    biblioteca.liberar.set()
+
+
+def test_prazos_por_funcao():
+    despachante = DespachanteSAT(_BibliotecaTravada(), prazos={
+            'ExtrairLogs': 300,
+        })
+    assert despachante.prazo('ExtrairLogs') == 300
+    assert despachante.prazo('ConsultarSAT') is None
+
+
+def test_sem_prazo_invoca_na_propria_thread():
+    nomes = []
+
+    class _Biblioteca(object):
+        def funcao(self, funcname):
+            def _funcao(sessao):
+                nomes.append(threading.current_thread().name)
+                return b'123456|08000|SAT em Operacao||'
+            return _funcao
+
+    despachante = DespachanteSAT(_Biblioteca())
+    despachante.invocar('ConsultarSAT', 123456)
+    assert nomes == [threading.current_thread().name]
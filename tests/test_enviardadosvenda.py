@@ -20,19 +20,25 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import timeit
 import xml.etree.ElementTree as ET
 
 from decimal import Decimal
+from io import StringIO
 from io import open
 
 from builtins import str as text
 
 import pytest
 
+from satcomum.ersat import dados_qrcode
+
 from satcfe.excecoes import ErroRespostaSATInvalida
 from satcfe.excecoes import ExcecaoRespostaSAT
+from satcfe.clientelocal import ClienteSATLocal
 from satcfe.resposta import RespostaEnviarDadosVenda
 from satcfe.util import as_datetime
+from satcfe.util import base64_to_str
 from satcfe.util import str_to_base64
 
 
@@ -69,6 +75,92 @@ def test_respostas_de_sucesso(datadir):
     assert resposta.qrcode()[:9] == '351507087'
 
 
+def test_resposta_de_sucesso_modo_bytes(datadir):
+    arquivo_sucesso = text(datadir.join('respostas-de-sucesso.txt'))
+    arquivo_cfesat = text(datadir.join('cfe-autorizado.xml'))
+    with open(arquivo_sucesso, 'r', encoding='utf-8') as fresp, \
+            open(arquivo_cfesat, 'r', encoding='utf-8') as fxml:
+        r_sucesso = fresp.read().splitlines()[0]
+        cfe_autorizado = fxml.read()
+
+    class _Biblioteca(object):
+        def funcao(self, funcname):
+            return lambda *args: r_sucesso.encode('utf-8')
+
+    cliente = ClienteSATLocal(_Biblioteca(), modo_bytes=True)
+    resposta = cliente.enviar_dados_venda('<CFe/>')
+    esperada = RespostaEnviarDadosVenda.analisar(r_sucesso)
+
+    assert isinstance(resposta.arquivoCFeSAT, memoryview)
+    assert resposta.numeroSessao == esperada.numeroSessao
+    assert resposta.timeStamp == esperada.timeStamp
+    assert resposta.valorTotalCFe == esperada.valorTotalCFe
+    assert resposta.assinaturaQRCODE == esperada.assinaturaQRCODE
+    assert resposta.xml() == cfe_autorizado
+    assert resposta.qrcode() == esperada.qrcode()
+
+
+def test_xml_e_arvore_mantidos_na_resposta(datadir):
+    arquivo_sucesso = text(datadir.join('respostas-de-sucesso.txt'))
+    with open(arquivo_sucesso, 'r', encoding='utf-8') as fresp:
+        r_sucesso = fresp.read().splitlines()[0]
+
+    resposta = RespostaEnviarDadosVenda.analisar(r_sucesso)
+    xml = resposta.xml()
+    arvore = resposta.arvore()
+    assert resposta.xml() is xml
+    assert resposta.arvore() is arvore
+    assert resposta.qrcode() == dados_qrcode(ET.parse(StringIO(xml)))
+
+    assert resposta.chave() == resposta.chaveConsulta
+    assert resposta.valor_total() == resposta.valorTotalCFe
+    assert resposta.quantidade_itens() == 1
+
+    resposta.liberar()
+    assert resposta.xml() is not xml
+    assert resposta.xml() == xml
+    assert resposta.arvore() is not arvore
+
+
+def test_benchmark_xml_mantido(datadir):
+    # compara o tempo para obter o XML, o QRCode e alguns campos do CF-e a
+    # partir da mesma resposta, decodificando e analisando o XML a cada vez
+    # ou mantendo-o na resposta (veja o resultado executando pytest com a
+    # opção "-s")
+    arquivo_sucesso = text(datadir.join('respostas-de-sucesso.txt'))
+    with open(arquivo_sucesso, 'r', encoding='utf-8') as fresp:
+        r_sucesso = fresp.read().splitlines()[0]
+
+    resposta = RespostaEnviarDadosVenda.analisar(r_sucesso)
+
+    def _sem_manter():
+        resposta.liberar()
+        xml = base64_to_str(resposta.arquivoCFeSAT)
+        qrcode = dados_qrcode(ET.parse(StringIO(xml)))
+        infCFe = ET.parse(StringIO(xml)).getroot().find('infCFe')
+        return xml, qrcode, infCFe.attrib['Id'], len(infCFe.findall('det'))
+
+    def _mantido():
+        return (
+                resposta.xml(),
+                resposta.qrcode(),
+                resposta.chave(),
+                resposta.quantidade_itens())
+
+    assert _sem_manter() == _mantido()
+
+    t_sem_manter = min(timeit.repeat(_sem_manter, number=200, repeat=3))
+    t_mantido = min(timeit.repeat(_mantido, number=200, repeat=3))
+
+    print((
+            '\nXML, QRCode e campos do CF-e: sem manter {:.1f}us, '
+            'mantido {:.1f}us ({:.1f}x)'
+        ).format(
+                t_sem_manter / 200e-6,
+                t_mantido / 200e-6,
+                t_sem_manter / t_mantido))
+
+
 def test_respostas_de_falha(datadir):
     arquivo = text(datadir.join('respostas-de-falha.txt'))
     with open(arquivo, 'r', encoding='utf-8') as f:
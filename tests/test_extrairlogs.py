@@ -20,6 +20,11 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import base64
+import errno
+import gzip
+import io
+
 from io import open
 
 from builtins import str as text
@@ -29,6 +34,8 @@ import pytest
 from satcfe.excecoes import ErroRespostaSATInvalida
 from satcfe.excecoes import ExcecaoRespostaSAT
 from satcfe.resposta import RespostaExtrairLogs
+from satcfe.util import RetornoBytes
+from satcfe.util import str_to_base64
 
 
 def test_respostas_de_sucesso(datadir):
@@ -42,6 +49,145 @@ def test_respostas_de_sucesso(datadir):
         assert len(resposta.arquivoLog) > 0
 
 
+def test_respostas_de_sucesso_modo_bytes(datadir, tmpdir):
+    arquivo = text(datadir.join('respostas-de-sucesso.txt'))
+    with open(arquivo, 'r', encoding='utf-8') as f:
+        respostas = f.read().splitlines()
+
+    for retorno in respostas:
+        esperada = RespostaExtrairLogs.analisar(retorno)
+        resposta = RespostaExtrairLogs.analisar(
+                RetornoBytes(retorno.encode('utf-8')))
+        assert resposta.EEEEE == '15000'
+        assert isinstance(resposta.arquivoLog, memoryview)
+        assert resposta.arquivoLog.tobytes().decode('utf-8') == \
+            esperada.arquivoLog
+        assert resposta.atributos.verbatim == retorno.encode('utf-8')
+        assert resposta.conteudo() == esperada.conteudo()
+
+        destino = resposta.salvar(dir=tmpdir.strpath)
+        with open(destino, 'r', encoding='utf-8') as f:
+            assert f.read() == esperada.conteudo()
+
+
+def _resposta(conteudo, modo_bytes=False):
+    retorno = '123456|15000|Transferência completa|||{}'.format(
+            str_to_base64(conteudo))
+    if modo_bytes:
+        retorno = RetornoBytes(retorno.encode('utf-8'))
+    return RespostaExtrairLogs.analisar(retorno)
+
+
+_LOG = ''.join(
+        '20150912113321|SAT|info|Ação nº {:d} concluída\n'.format(n)
+        for n in range(2000))
+
+
+@pytest.mark.parametrize('modo_bytes', [False, True])
+def test_salvar_em_blocos(tmpdir, modo_bytes):
+    resposta = _resposta(_LOG, modo_bytes=modo_bytes)
+
+    destino = resposta.salvar(dir=tmpdir.strpath)
+    assert destino.endswith('-sat.log')
+    with open(destino, 'rb') as f:
+        assert f.read() == _LOG.encode('utf-8')
+
+    destino = resposta.salvar(
+            destino=tmpdir.join('latin1.log').strpath,
+            encoding='latin-1')
+    with open(destino, 'rb') as f:
+        assert f.read() == _LOG.encode('latin-1')
+
+    destino = resposta.salvar(dir=tmpdir.strpath, compactar=True)
+    assert destino.endswith('-sat.log.gz')
+    with gzip.open(destino, 'rb') as f:
+        assert f.read() == _LOG.encode('utf-8')
+
+    # FileExistsError em Python 3, que não existe em Python 2
+    with pytest.raises(OSError) as excinfo:
+        resposta.salvar(destino=destino)
+    assert excinfo.value.errno == errno.EEXIST
+
+
+def test_escrever_em_objeto():
+
+    class _EscritaParcial(object):
+        # escreve no máximo 1000 bytes de cada vez, como um objeto sem buffer
+
+        def __init__(self):
+            self.dados = io.BytesIO()
+
+        def write(self, dados):
+            assert isinstance(dados, bytes)
+            return self.dados.write(dados[:1000])
+
+    resposta = _resposta(_LOG)
+    destino = _EscritaParcial()
+    escritos = resposta.escrever(
+            destino,
+            encoding='cp1252',
+            tamanho_bloco=4 * 37)  # divide caracteres multibyte entre blocos
+    assert destino.dados.getvalue() == _LOG.encode('cp1252')
+    assert escritos == len(destino.dados.getvalue())
+
+    destino = io.BytesIO()
+    resposta.escrever(destino, compactar=True)
+    with gzip.GzipFile(fileobj=io.BytesIO(destino.getvalue())) as f:
+        assert f.read() == _LOG.encode('utf-8')
+
+
+def test_escrever_log_utf8_invalido():
+    # o final do log é um caractere multibyte incompleto
+    log = _LOG.encode('utf-8') + b'\xff fim \xc3'
+    retorno = '123456|15000|Transferência completa|||{}'.format(
+            base64.b64encode(log).decode('ascii'))
+    resposta = RespostaExtrairLogs.analisar(retorno)
+
+    for encoding in ('utf-8', 'latin-1'):
+        with pytest.raises(UnicodeDecodeError):
+            resposta.escrever(io.BytesIO(), encoding=encoding)
+
+    destino = io.BytesIO()
+    resposta.escrever(destino, encoding_errors='replace', tamanho_bloco=4)
+    assert destino.getvalue() == \
+        _LOG.encode('utf-8') + '\ufffd fim \ufffd'.encode('utf-8')
+
+    destino = io.BytesIO()
+    resposta.escrever(destino, encoding='latin-1', encoding_errors='ignore')
+    assert destino.getvalue() == _LOG.encode('latin-1') + b' fim '
+
+
+def test_benchmark_memoria_salvar(tmpdir):
+    # compara o pico de memória para salvar um log de 8MB decodificando todo
+    # o conteúdo (como era feito) e em blocos (veja o resultado executando
+    # pytest com a opção "-s")
+    tracemalloc = pytest.importorskip('tracemalloc')
+    log = 'A' * (8 * 1024 * 1024)
+    resposta = _resposta(log, modo_bytes=True)
+
+    def _pico(funcao):
+        tracemalloc.start()
+        try:
+            funcao()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def _conteudo_completo():
+        with open(tmpdir.join('completo.log').strpath, 'wb') as f:
+            f.write(resposta.conteudo().encode('utf-8'))
+
+    pico_completo = _pico(_conteudo_completo)
+    pico_blocos = _pico(lambda: resposta.salvar(dir=tmpdir.strpath))
+
+    print((
+            '\nSalvar log de 8MB: conteudo completo {:.1f}MB, '
+            'em blocos {:.2f}MB'
+        ).format(pico_completo / 1048576.0, pico_blocos / 1048576.0))
+
+    assert pico_blocos < 1048576
+
+
 def test_respostas_de_falha(datadir):
     arquivo = text(datadir.join('respostas-de-falha.txt'))
     with open(arquivo, 'r', encoding='utf-8') as f:
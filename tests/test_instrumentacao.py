@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_instrumentacao.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import pytest
+
+from satcfe import instrumentacao
+from satcfe.clientelocal import ClienteSATLocal
+from satcfe.excecoes import ErroRespostaSATInvalida
+from satcfe.instrumentacao import Histograma
+from satcfe.instrumentacao import HistogramaTempos
+from satcfe.resposta.padrao import analisar_retorno
+
+
+class _BibliotecaSimulada(object):
+
+    def funcao(self, funcname):
+        def _consultar_sat(sessao):
+            return '{:d}|08000|SAT em Operacao||'.format(
+                    sessao).encode('utf-8')
+        return _consultar_sat
+
+
+@pytest.fixture
+def medicoes():
+    registradas = []
+    instrumentacao.registrar(registradas.append)
+    yield registradas
+    instrumentacao.remover(registradas.append)
+    assert not instrumentacao.ativa()
+
+
+def test_sem_observadores():
+    assert not instrumentacao.ativa()
+    cliente = ClienteSATLocal(_BibliotecaSimulada())
+    assert cliente.consultar_sat().EEEEE == '08000'
+
+
+def test_etapas_cliente_local(medicoes):
+    cliente = ClienteSATLocal(
+            _BibliotecaSimulada(),
+            numerador_sessao=lambda: 123456)
+    cliente.consultar_sat()
+
+    etapas = [(m.etapa, m.funcao) for m in medicoes]
+    assert etapas == [
+            (instrumentacao.CODIFICAR, 'ConsultarSAT'),
+            (instrumentacao.INVOCAR, 'ConsultarSAT'),
+            (instrumentacao.DECODIFICAR, 'ConsultarSAT'),
+            (instrumentacao.ANALISAR, 'ConsultarSAT'),
+        ]
+
+    invocar = medicoes[1]
+    assert invocar.numero_sessao == 123456
+    assert invocar.tamanho_retorno == len('123456|08000|SAT em Operacao||')
+    assert invocar.duracao >= 0
+    assert invocar.erro is None
+
+    analisar = medicoes[-1]
+    assert analisar.numero_sessao == 123456
+    assert analisar.EEEEE == '08000'
+
+
+def test_erro_na_analise(medicoes):
+    with pytest.raises(ErroRespostaSATInvalida):
+        analisar_retorno('sem pipes', funcao='ConsultarSAT')
+    assert isinstance(medicoes[0].erro, ErroRespostaSATInvalida)
+
+
+def test_observador_com_falha_nao_interrompe(medicoes):
+    def _falhar(medicao):
+        raise RuntimeError('falhou')
+
+    instrumentacao.registrar(_falhar)
+    try:
+        resposta = analisar_retorno('1|08000|ok||', funcao='ConsultarSAT')
+    finally:
+        instrumentacao.remover(_falhar)
+
+    assert resposta.EEEEE == '08000'
+    assert len(medicoes) == 1
+
+
+def test_histograma():
+    histograma = Histograma()
+    assert histograma.percentil(50) is None
+
+    for i in range(1, 101):
+        histograma.registrar(i / 1000.0)
+
+    assert histograma.contagem == 100
+    assert histograma.maximo == pytest.approx(0.1)
+    assert histograma.percentil(50) == pytest.approx(0.050, rel=0.05)
+    assert histograma.percentil(95) == pytest.approx(0.095, rel=0.05)
+    assert histograma.percentil(99) == pytest.approx(0.099, rel=0.05)
+    assert histograma.percentil(100) == pytest.approx(0.1)
+
+
+def test_histograma_tempos():
+    tempos = HistogramaTempos()
+    instrumentacao.registrar(tempos)
+    try:
+        cliente = ClienteSATLocal(_BibliotecaSimulada())
+        for _ in range(10):
+            cliente.consultar_sat()
+    finally:
+        instrumentacao.remover(tempos)
+
+    percentis = tempos.percentis('ConsultarSAT')
+    assert sorted(percentis) == [50, 95, 99]
+    assert percentis[50] <= percentis[95] <= percentis[99]
+
+    resumo = tempos.resumo()
+    assert resumo[(instrumentacao.INVOCAR, 'ConsultarSAT')]['contagem'] == 10
+    assert (instrumentacao.ANALISAR, 'ConsultarSAT') in resumo
+
+    assert tempos.percentis('EnviarDadosVenda') == {
+            50: None, 95: None, 99: None}
+
+    tempos.limpar()
+    assert tempos.resumo() == {}
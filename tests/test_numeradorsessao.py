@@ -20,6 +20,12 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import multiprocessing
+
+import pytest
+
+from satcfe import base
+from satcfe.base import NumeroSessaoArquivo
 from satcfe.base import NumeroSessaoMemoria
 
 
@@ -49,3 +55,85 @@ def test_numerador_sessao_memoria():
             'Ao esgotar-se o tamanho máximo do numerador, o primeiro número '
             'gerado deveria ter sido descartado (first in, first out).'
         )
+
+
+def test_numerador_sessao_arquivo_persistente(tmpdir):
+    caminho = str(tmpdir.join('sessao'))
+    numerador = NumeroSessaoArquivo(caminho, tamanho=3)
+    n1 = numerador()
+    n2 = numerador()
+    numerador.fechar()
+
+    # simula o reinício da aplicação
+    numerador = NumeroSessaoArquivo(caminho, tamanho=100)
+    assert n1 in numerador
+    assert n2 in numerador
+
+    numerador()
+    n4 = numerador()
+    assert n4 in numerador
+    assert n1 not in numerador, (
+            'O tamanho registrado no arquivo deveria prevalecer, '
+            'descartando o primeiro número gerado.'
+        )
+    numerador.fechar()
+
+
+def test_numerador_sessao_arquivo_compartilhado(tmpdir, monkeypatch):
+    caminho = str(tmpdir.join('sessao'))
+    a = NumeroSessaoArquivo(caminho)
+    b = NumeroSessaoArquivo(caminho)
+
+    numeros = iter([123456, 123456, 654321])
+    monkeypatch.setattr(base.random, 'randint', lambda x, y: next(numeros))
+
+    assert a() == 123456
+    assert b() == 654321, (
+            'O número gerado através de outra instância (ou processo) não '
+            'deveria ter sido repetido.'
+        )
+
+    a.fechar()
+    b.fechar()
+
+
+def test_numerador_sessao_arquivo_invalido(tmpdir):
+    arquivo = tmpdir.join('sessao')
+    arquivo.write_binary(b'qualquer coisa')
+    with pytest.raises(ValueError):
+        NumeroSessaoArquivo(str(arquivo))
+
+
+def _gerar_numeros(caminho, quantidade, fila):
+    numerador = NumeroSessaoArquivo(caminho, tamanho=1000)
+    fila.put([numerador() for _ in range(quantidade)])
+    numerador.fechar()
+
+
+def test_numerador_sessao_arquivo_entre_processos(tmpdir):
+    caminho = str(tmpdir.join('sessao'))
+    NumeroSessaoArquivo(caminho, tamanho=1000).fechar()
+
+    fila = multiprocessing.Queue()
+    processos = [
+            multiprocessing.Process(
+                    target=_gerar_numeros,
+                    args=(caminho, 200, fila))
+            for _ in range(4)]
+
+    for processo in processos:
+        processo.start()
+
+    numeros = []
+    for _ in processos:
+        numeros.extend(fila.get(timeout=30))
+
+    for processo in processos:
+        processo.join()
+
+    assert len(numeros) == 800
+    assert len(set(numeros)) == 800
+
+    numerador = NumeroSessaoArquivo(caminho)
+    assert all(n in numerador for n in numeros)
+    numerador.fechar()
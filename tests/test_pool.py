@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_pool.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+
+import pytest
+
+from satcfe.excecoes import ErroPoolSATIndisponivel
+from satcfe.excecoes import ErroTempoEsgotado
+from satcfe.pool import PoolSAT
+from satcfe.resposta import RespostaConsultarStatusOperacional
+from satcfe.resposta.consultarstatusoperacional import BLOQUEADO_SEFAZ
+from satcfe.resposta.consultarstatusoperacional import DESBLOQUEADO
+
+
+CHAVE_900004019 = 'CFe35150908723218000186599000040190000723645630'
+
+STATUS_900004019 = (
+        '061407|10000|Resposta com sucesso|||900004019|DHCP|010.000.000.108|'
+        '30:40:03:19:19:40|255.255.255.000|010.000.000.001|010.000.000.001|'
+        '010.000.000.001|CONECTADO|ALTO|4 GB|260 MB|20150912113321|01.00.00|'
+        '00.06|35150908723218000186599000040190000723645630|'
+        '00000000000000000000000000000000000000000000|'
+        '00000000000000000000000000000000000000000000|20150912104828|'
+        '20150912113039|20150708|20200708|{:d}')
+
+
+class _Resposta(object):
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class _ClienteSimulado(object):
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.vendas = []
+        self.cancelamentos = []
+        self.estado_operacao = DESBLOQUEADO
+        self.falha = None
+        self.bloqueio = None
+
+    def enviar_dados_venda(self, dados_venda):
+        if self.bloqueio is not None:
+            self.bloqueio.wait()
+        if self.falha is not None:
+            raise self.falha
+        self.vendas.append(dados_venda)
+        return _Resposta(chaveConsulta='CFe-{}-{:d}'.format(
+                self.nome, len(self.vendas)))
+
+    def cancelar_ultima_venda(self, chave_cfe, dados_cancelamento):
+        self.cancelamentos.append(chave_cfe)
+        return _Resposta(chaveConsulta=chave_cfe)
+
+    def consultar_status_operacional(self):
+        if self.falha is not None:
+            raise self.falha
+        return RespostaConsultarStatusOperacional.analisar(
+                STATUS_900004019.format(self.estado_operacao))
+
+
+@pytest.fixture
+def clientes():
+    return [_ClienteSimulado('a'), _ClienteSimulado('b')]
+
+
+def test_pool_vazio():
+    with pytest.raises(ValueError):
+        PoolSAT([])
+
+
+def test_distribui_vendas(clientes):
+    pool = PoolSAT(clientes)
+    for i in range(6):
+        pool.enviar_dados_venda(i)
+
+    assert len(clientes[0].vendas) == 3
+    assert len(clientes[1].vendas) == 3
+    assert pool.vendas(clientes[0]) == 3
+    assert pool.ocupacao(clientes[0]) == 0
+
+
+def test_prefere_equipamento_menos_ocupado(clientes):
+    pool = PoolSAT(clientes)
+    bloqueio = threading.Event()
+    clientes[0].bloqueio = bloqueio
+
+    tarefa = threading.Thread(target=pool.enviar_dados_venda, args=('x',))
+    tarefa.start()
+    try:
+        while pool.ocupacao(clientes[0]) == 0:
+            tarefa.join(0.001)
+        clientes[0].bloqueio = None
+        for i in range(3):
+            pool.enviar_dados_venda(i)
+    finally:
+        bloqueio.set()
+        tarefa.join()
+
+    assert clientes[0].vendas == ['x']
+    assert clientes[1].vendas == [0, 1, 2]
+
+
+def test_cancelamento_encaminhado_ao_emissor(clientes):
+    pool = PoolSAT(clientes)
+    pool.enviar_dados_venda(1)
+    resposta = pool.enviar_dados_venda(2)
+
+    assert pool.emissor(resposta.chaveConsulta) is clientes[1]
+    pool.cancelar_ultima_venda(resposta.chaveConsulta, 'canc')
+    assert clientes[1].cancelamentos == [resposta.chaveConsulta]
+    assert clientes[0].cancelamentos == []
+
+    # a chave é esquecida após o cancelamento
+    assert pool.emissor(resposta.chaveConsulta) is None
+
+
+def test_cancelamento_pelo_numero_de_serie(clientes):
+    pool = PoolSAT(clientes)
+    with pytest.raises(ErroPoolSATIndisponivel):
+        pool.cancelar_ultima_venda(CHAVE_900004019, 'canc')
+
+    clientes[0].falha = ErroTempoEsgotado('ConsultarStatusOperacional', 1)
+    pool.consultar_status_operacional()
+    assert pool.emissor(CHAVE_900004019) is clientes[1]
+
+
+def test_status_operacional_retira_e_devolve(clientes):
+    pool = PoolSAT(clientes)
+    clientes[0].estado_operacao = BLOQUEADO_SEFAZ
+
+    respostas = pool.consultar_status_operacional()
+    assert respostas[0].ESTADO_OPERACAO == BLOQUEADO_SEFAZ
+    assert pool.em_rotacao == (clientes[1],)
+
+    for i in range(3):
+        pool.enviar_dados_venda(i)
+    assert clientes[0].vendas == []
+
+    clientes[0].estado_operacao = DESBLOQUEADO
+    pool.consultar_status_operacional()
+    assert pool.em_rotacao == tuple(clientes)
+
+
+def test_falha_na_venda_retira_equipamento(clientes):
+    pool = PoolSAT(clientes)
+    clientes[0].falha = ErroTempoEsgotado('EnviarDadosVenda', 1)
+
+    with pytest.raises(ErroTempoEsgotado):
+        pool.enviar_dados_venda(1)
+
+    assert pool.em_rotacao == (clientes[1],)
+    assert pool.ocupacao(clientes[0]) == 0
+
+    clientes[1].falha = IOError('sem rota')
+    with pytest.raises(IOError):
+        pool.enviar_dados_venda(2)
+
+    with pytest.raises(ErroPoolSATIndisponivel):
+        pool.enviar_dados_venda(3)
+
+    respostas = pool.consultar_status_operacional()
+    assert respostas == [None, None]
+
+
+def test_retirada_manual(clientes):
+    pool = PoolSAT(clientes)
+    pool.retirar(clientes[1])
+    pool.consultar_status_operacional()
+    assert pool.em_rotacao == (clientes[0],)
+
+    pool.restabelecer(clientes[1])
+    assert pool.em_rotacao == tuple(clientes)
+
+    with pytest.raises(ValueError):
+        pool.retirar(_ClienteSimulado('c'))
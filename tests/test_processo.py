@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_processo.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import signal
+import timeit
+
+import pytest
+
+from satcfe.base import BibliotecaSAT
+from satcfe.base import FuncoesSAT
+from satcfe.clientelocal import ClienteSATLocal
+from satcfe.excecoes import ErroTempoEsgotado
+from satcfe.processo import BibliotecaSATIsolada
+
+
+@pytest.fixture
+def biblioteca_isolada(request):
+    biblioteca = BibliotecaSATIsolada(
+            request.config.getoption('--lib-caminho'),
+            convencao=request.config.getoption('--lib-convencao'))
+    yield biblioteca
+    biblioteca.encerrar()
+
+
+@pytest.mark.acessa_sat
+@pytest.mark.invoca_consultarsat
+def test_consultarsat_processo_isolado(request, biblioteca_isolada):
+    cliente = ClienteSATLocal(
+            biblioteca_isolada,
+            codigo_ativacao=request.config.getoption('--codigo-ativacao'))
+    resposta = cliente.consultar_sat()
+    assert resposta.EEEEE == '08000'
+    assert biblioteca_isolada.pid != os.getpid()
+    assert biblioteca_isolada.verificar()
+
+
+@pytest.mark.acessa_sat
+@pytest.mark.invoca_consultarsat
+def test_reinicia_processo_terminado(biblioteca_isolada):
+    funcoes = FuncoesSAT(biblioteca_isolada)
+    assert '|08000|' in funcoes._invocar('ConsultarSAT', 123456)
+
+    pid = biblioteca_isolada.pid
+    os.kill(pid, signal.SIGKILL)
+    biblioteca_isolada._processo.join(5)
+
+    assert '|08000|' in funcoes._invocar('ConsultarSAT', 123457)
+    assert biblioteca_isolada.reinicios == 1
+    assert biblioteca_isolada.pid != pid
+
+
+@pytest.mark.acessa_sat
+@pytest.mark.invoca_consultarsat
+def test_reinicia_processo_terminado_antes_do_envio(biblioteca_isolada):
+    funcoes = FuncoesSAT(biblioteca_isolada)
+    processo = biblioteca_isolada._processo
+    pid = processo.pid
+    os.kill(pid, signal.SIGKILL)
+    assert biblioteca_isolada._conexao.poll(5)  # o pipe foi fechado
+
+    # simula o processo que termina logo após a verificação de is_alive
+    processo.is_alive = lambda: True
+
+    assert '|08000|' in funcoes._invocar('ConsultarSAT', 123457)
+    assert biblioteca_isolada.reinicios == 1
+    assert biblioteca_isolada.pid != pid
+
+
+@pytest.mark.acessa_sat
+@pytest.mark.invoca_consultarsat
+def test_tempo_esgotado(request):
+    biblioteca = BibliotecaSATIsolada(
+            request.config.getoption('--lib-caminho'),
+            convencao=request.config.getoption('--lib-convencao'),
+            timeout=0.5)
+    try:
+        # simula um equipamento travado parando o processo filho
+        os.kill(biblioteca.pid, signal.SIGSTOP)
+        with pytest.raises(ErroTempoEsgotado):
+            biblioteca.invocar('ConsultarSAT', 123456)
+        assert biblioteca.pid is None
+        assert biblioteca.verificar()
+        assert biblioteca.reinicios == 1
+    finally:
+        biblioteca.encerrar()
+
+
+@pytest.mark.acessa_sat
+@pytest.mark.invoca_consultarsat
+def test_benchmark_processo_isolado(request, biblioteca_isolada):
+    # compara o custo da invocação através do processo isolado com o custo
+    # da invocação na biblioteca carregada no próprio processo (veja o
+    # resultado executando pytest com a opção "-s")
+    numero = 500
+    em_processo = FuncoesSAT(BibliotecaSAT(
+            request.config.getoption('--lib-caminho'),
+            convencao=request.config.getoption('--lib-convencao')))
+    isolado = FuncoesSAT(biblioteca_isolada)
+
+    def _medir(funcoes):
+        return timeit.timeit(
+                lambda: funcoes._invocar('ConsultarSAT', 123456),
+                number=numero) / numero
+
+    t_processo = _medir(em_processo)
+    t_isolado = _medir(isolado)
+
+    print((
+            '\nConsultarSAT ({:d} invocacoes): em processo {:.1f}us, '
+            'processo isolado {:.1f}us ({:.1f}us de custo adicional)'
+        ).format(
+            numero,
+            t_processo * 1e6,
+            t_isolado * 1e6,
+            (t_isolado - t_processo) * 1e6))
+
+    assert t_isolado > 0
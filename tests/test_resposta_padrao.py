@@ -20,7 +20,25 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import timeit
+
+from decimal import Decimal
+
+from builtins import str as text
+
+import pytest
+
+from satcfe.excecoes import ErroRespostaSATInvalida
+from satcfe.excecoes import ExcecaoRespostaSAT
+from satcfe.resposta import RespostaEnviarDadosVenda
+from satcfe.resposta import RespostaSAT
+from satcfe.resposta import padrao
+from satcfe.resposta.padrao import AnalisadorRetorno
+from satcfe.resposta.padrao import IMEDIATA
+from satcfe.resposta.padrao import SOB_DEMANDA
 from satcfe.resposta.padrao import analisar_retorno
+from satcfe.util import RetornoBytes
+from satcfe.util import as_datetime
 
 
 def test_analisar_retorno_simples():
@@ -33,3 +51,235 @@ def test_analisar_retorno_simples():
     assert resposta.mensagemSEFAZ == ''
     assert resposta.atributos.funcao == 'ConsultarSAT'
     assert resposta.atributos.verbatim == '123456|08000|SAT em operacao||'
+
+
+_SUCESSO_VENDA = (
+        '123456|06000|0000|Emitido com sucesso|||PD94bWwgdmVyc2lvbj0iMS4wIj8+'
+        '|20150718154423|CFe35150708723218000186599000040190000215133408'
+        '|2.00||Q5DLkpdRijIRGY6YSSNsTWK1TztHL1VWCrgcnGKSoblNFd5UUdRKK6dMxNUf'
+    )
+
+
+def _analisar_dicionario(retorno, classe_resposta, campos):
+    # a análise como era feita antes dos analisadores compilados, mantida
+    # apenas como referência para a comparação (e para o benchmark)
+    partes = retorno.split('|')
+    resultado = {}
+    for indice, (campo, conversor) in enumerate(campos):
+        resultado[campo] = conversor(partes[indice])
+    resposta = classe_resposta(**resultado)
+    resposta.atributos = RespostaSAT.Atributos(verbatim=retorno)
+    return resposta
+
+
+def test_respostas_em_slots():
+    resposta = RespostaEnviarDadosVenda.analisar(_SUCESSO_VENDA)
+    assert resposta.__dict__ == {}  # todos os campos estão em __slots__
+    assert type(resposta) is RespostaEnviarDadosVenda
+    assert resposta.chaveConsulta.startswith('CFe3515')
+    assert resposta.valorTotalCFe == Decimal('2.00')
+    assert resposta.timeStamp == as_datetime('20150718154423')
+
+    # na falha, os campos de sucesso não estão presentes
+    retorno = '123456|06001|1999|Erro desconhecido||'
+    with pytest.raises(ExcecaoRespostaSAT) as excinfo:
+        RespostaEnviarDadosVenda.analisar(retorno)
+    resposta = excinfo.value.resposta
+    assert resposta.CCCC == '1999'
+    assert not hasattr(resposta, 'chaveConsulta')
+    assert resposta.atributos.verbatim == retorno
+
+
+def test_respostas_aceitam_outros_atributos():
+    resposta = RespostaSAT(numeroSessao=1, foo=2)
+    resposta.extra = 3
+    assert resposta.numeroSessao == 1
+    assert resposta.__dict__ == {'foo': 2, 'extra': 3}
+
+    resposta = analisar_retorno('1|08000|SAT em operacao||')
+    resposta.extra = 3
+    assert resposta.extra == 3
+
+
+def test_analisador_compilado_uma_unica_vez():
+    campos = RespostaSAT.CAMPOS + (('extra', int),)
+    primeira = analisar_retorno(
+            '1|08000|SAT em operacao|||42',
+            campos=campos,
+            campos_alternativos=[RespostaSAT.CAMPOS])
+    segunda = analisar_retorno(
+            '2|08000|SAT em operacao||',
+            campos=campos,
+            campos_alternativos=[RespostaSAT.CAMPOS])
+
+    # RespostaSAT não possui um slot "extra", que é mantido no __dict__
+    assert type(primeira) is type(segunda) is RespostaSAT
+    assert primeira.extra == 42
+    assert primeira.__dict__ == {'extra': 42}
+    assert not hasattr(segunda, 'extra')
+
+    with pytest.raises(ErroRespostaSATInvalida) as excinfo:
+        analisar_retorno('1|08000|SAT em operacao', campos=campos)
+    assert 'Esperados 6 campos, mas contém 3' in excinfo.value.args[0]
+
+
+def test_analisar_retorno_especificacoes():
+    # campos especificados através de listas
+    resposta = analisar_retorno(
+            '1|08000|SAT em operacao||',
+            campos=[list(campo) for campo in RespostaSAT.CAMPOS],
+            campos_alternativos=[[['numeroSessao', int], ['EEEEE', text]]])
+    assert resposta.numeroSessao == 1
+    assert resposta.mensagem == 'SAT em operacao'
+
+    # conversores criados a cada análise não acumulam analisadores
+    for _ in range(padrao._CAPACIDADE_ANALISADORES * 2):
+        resposta = analisar_retorno(
+                '1|x',
+                campos=(('numeroSessao', int), ('extra', lambda v: v * 2)))
+        assert resposta.extra == 'xx'
+    assert len(padrao._ANALISADORES) <= padrao._CAPACIDADE_ANALISADORES
+
+    # assim como antes dos analisadores compilados, os nomes dos campos não
+    # precisam ser identificadores válidos
+    resposta = analisar_retorno(
+            '1|x',
+            campos=(('numeroSessao', int), ('campo-invalido', text)))
+    assert getattr(resposta, 'campo-invalido') == 'x'
+
+
+def test_analisador_classe_com_init_e_dict():
+
+    class _Resposta(RespostaSAT):
+
+        def __init__(self, **kwargs):
+            super(_Resposta, self).__init__(**kwargs)
+            self.campos = sorted(kwargs)
+
+    analisador = AnalisadorRetorno(
+            _Resposta,
+            campos=RespostaSAT.CAMPOS + (('extra', text),))
+    resposta = analisador.analisar('1|08000|SAT em operacao|||x', funcao='F')
+    assert analisador.classe_resposta is _Resposta
+    assert resposta.extra == 'x'
+    assert resposta.campos == sorted([
+            'numeroSessao', 'EEEEE', 'mensagem', 'cod', 'mensagemSEFAZ',
+            'extra'])
+    assert resposta.atributos.funcao == 'F'
+
+
+def test_analisador_modo_bytes():
+    retorno = RetornoBytes(_SUCESSO_VENDA.encode('utf-8'))
+    resposta = RespostaEnviarDadosVenda.analisar(retorno)
+    esperada = RespostaEnviarDadosVenda.analisar(_SUCESSO_VENDA)
+    assert isinstance(resposta.arquivoCFeSAT, memoryview)
+    assert resposta.arquivoCFeSAT.tobytes() == b'PD94bWwgdmVyc2lvbj0iMS4wIj8+'
+    for campo in RespostaEnviarDadosVenda.__slots__:
+        if campo != 'arquivoCFeSAT':
+            assert getattr(resposta, campo) == getattr(esperada, campo)
+    assert resposta.atributos.verbatim == retorno.dados
+
+
+def test_benchmark_analisador():
+    # compara o tempo da análise com o analisador compilado e com a análise
+    # através de um dicionário de argumentos (veja o resultado executando
+    # pytest com a opção "-s")
+    campos = (
+            ('numeroSessao', int),
+            ('EEEEE', text),
+            ('CCCC', text),
+            ('mensagem', text),
+            ('cod', text),
+            ('mensagemSEFAZ', text),
+            ('arquivoCFeSAT', text),
+            ('timeStamp', as_datetime),
+            ('chaveConsulta', text),
+            ('valorTotalCFe', Decimal),
+            ('CPFCNPJValue', text),
+            ('assinaturaQRCODE', text),
+        )
+    # sem a conversão das datas, que é a mesma nas duas análises
+    campos = tuple((c, text if f is as_datetime else f) for c, f in campos)
+    analisador = AnalisadorRetorno(RespostaEnviarDadosVenda, campos=campos)
+
+    def _compilado():
+        return analisador.analisar(_SUCESSO_VENDA)
+
+    def _dicionario():
+        return _analisar_dicionario(
+                _SUCESSO_VENDA,
+                RespostaEnviarDadosVenda,
+                campos)
+
+    for campo, _ in campos:
+        assert getattr(_compilado(), campo) == getattr(_dicionario(), campo)
+
+    t_dicionario = min(timeit.repeat(_dicionario, number=2000, repeat=3))
+    t_compilado = min(timeit.repeat(_compilado, number=2000, repeat=3))
+
+    print((
+            '\nAnalise de retornos EnviarDadosVenda: dicionario {:.2f}us, '
+            'compilado {:.2f}us ({:.1f}x)'
+        ).format(
+                t_dicionario / 2e-3,
+                t_compilado / 2e-3,
+                t_dicionario / t_compilado))
+
+
+@pytest.fixture
+def sob_demanda():
+    RespostaSAT.definir_conversao(SOB_DEMANDA)
+    yield
+    RespostaSAT.definir_conversao(IMEDIATA)
+
+
+def test_conversao_sob_demanda(sob_demanda):
+    convertidos = []
+
+    def _convertido(conversor):
+        def _converter(valor):
+            convertidos.append(valor)
+            return conversor(valor)
+        return _converter
+
+    analisador = AnalisadorRetorno(
+            campos=tuple((c, _convertido(f)) for c, f in RespostaSAT.CAMPOS))
+    resposta = analisador.analisar('1|08000|SAT em operacao||', funcao='F')
+    assert convertidos == []
+    assert resposta.EEEEE == '08000'
+    assert resposta.EEEEE == '08000'
+    assert convertidos == ['08000']
+    assert resposta.numeroSessao == 1
+    assert convertidos == ['08000', '1']
+    assert resposta.atributos.funcao == 'F'
+    assert not hasattr(resposta, 'inexistente')
+
+    with pytest.raises(AttributeError):
+        resposta.inexistente
+
+    # conversões que falham, falham apenas no acesso ao atributo
+    resposta = analisador.analisar('x|08000|SAT em operacao||')
+    assert resposta.EEEEE == '08000'
+    with pytest.raises(ValueError):
+        resposta.numeroSessao
+
+
+def test_conversao_sob_demanda_por_classe():
+    RespostaEnviarDadosVenda.definir_conversao(SOB_DEMANDA)
+    try:
+        resposta = RespostaEnviarDadosVenda.analisar(
+                RetornoBytes(_SUCESSO_VENDA.encode('utf-8')))
+        assert resposta._pendentes is not None
+        assert isinstance(resposta.arquivoCFeSAT, memoryview)
+        assert resposta.valorTotalCFe == Decimal('2.00')
+        assert resposta.timeStamp == as_datetime('20150718154423')
+
+        # as demais respostas continuam seguindo a definição padrão
+        resposta = analisar_retorno('1|08000|SAT em operacao||')
+        assert not hasattr(resposta, '_pendentes')
+    finally:
+        RespostaEnviarDadosVenda.definir_conversao(None)
+
+    assert RespostaEnviarDadosVenda._conversao == IMEDIATA
+    with pytest.raises(ValueError):
+        RespostaSAT.definir_conversao('desconhecida')
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_submit.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+
+import pytest
+
+from satcfe.base import FuncoesSAT
+from satcfe.resposta import RespostaSAT
+
+
+class _BibliotecaSimulada(object):
+
+    def __init__(self):
+        self.threads = set()
+
+    def funcao(self, funcname):
+        return self._consultar_sat
+
+    def _consultar_sat(self, sessao):
+        self.threads.add(threading.current_thread().ident)
+        return '{:d}|08000|SAT em Operacao||'.format(sessao).encode('utf-8')
+
+
+def test_submit_resulta_em_future():
+    biblioteca = _BibliotecaSimulada()
+    funcoes = FuncoesSAT(biblioteca)
+    try:
+        futures = [funcoes.submit_consultar_sat() for _ in range(10)]
+        retornos = [f.result(timeout=5) for f in futures]
+    finally:
+        funcoes.encerrar()
+
+    assert all('|08000|' in retorno for retorno in retornos)
+    assert len(biblioteca.threads) == 1, (
+            'Todas as invocacoes submetidas deveriam ser executadas pelo '
+            'mesmo worker dedicado'
+        )
+    assert threading.current_thread().ident not in biblioteca.threads
+
+
+def test_encerrar_e_submeter_novamente():
+    funcoes = FuncoesSAT(_BibliotecaSimulada())
+    funcoes.submit_consultar_sat().result(timeout=5)
+    funcoes.encerrar()
+    funcoes.encerrar()  # não deve falhar se não houver worker
+    retorno = funcoes.submit_consultar_sat().result(timeout=5)
+    funcoes.encerrar()
+    assert '|08000|' in retorno
+
+
+def test_submit_propaga_excecao():
+    funcoes = FuncoesSAT(_BibliotecaSimulada())
+    try:
+        future = funcoes.submit_trocar_codigo_de_ativacao('')
+        with pytest.raises(ValueError):
+            future.result(timeout=5)
+    finally:
+        funcoes.encerrar()
+
+
+@pytest.mark.acessa_sat
+@pytest.mark.invoca_consultarsat
+def test_submit_consultar_sat(clientesatlocal):
+    try:
+        resposta = clientesatlocal.submit_consultar_sat().result(timeout=5)
+    finally:
+        clientesatlocal.encerrar()
+    assert isinstance(resposta, RespostaSAT)
+    assert resposta.EEEEE == '08000'
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+#
+# tests/test_totais.py
+#
+# Copyright 2015 Base4 Sistemas Ltda ME
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import decimal
+import timeit
+
+from decimal import Decimal
+
+import pytest
+
+from satcomum import constantes
+
+from satcfe import totais
+from satcfe.clientelocal import ClienteSATLocal
+from satcfe.entidades import CFeVenda
+from satcfe.entidades import COFINSSN
+from satcfe.entidades import DescAcrEntr
+from satcfe.entidades import Detalhamento
+from satcfe.entidades import Emitente
+from satcfe.entidades import ICMSSN102
+from satcfe.entidades import Imposto
+from satcfe.entidades import LoteDetalhamentos
+from satcfe.entidades import MeioPagamento
+from satcfe.entidades import PISSN
+from satcfe.entidades import ProdutoServico
+from satcfe.excecoes import ErroTotaisInconsistentes
+
+
+def _imposto():
+    return Imposto(
+            icms=ICMSSN102(Orig='0', CSOSN='500'),
+            pis=PISSN(CST='49'),
+            cofins=COFINSSN(CST='49'))
+
+
+_ITENS = [
+        (Decimal('1.0000'), Decimal('5.75'), Decimal('0.25'), None),
+        (Decimal('0.3330'), Decimal('4.99'), None, Decimal('0.10')),
+        (Decimal('2.5000'), Decimal('0.99'), None, None),
+    ]
+
+
+def _venda(detalhamentos, vMP, descontos_acrescimos=None):
+    return CFeVenda(
+            CNPJ='08427847000169',
+            signAC=constantes.ASSINATURA_AC_TESTE,
+            numeroCaixa=1,
+            emitente=Emitente(
+                    CNPJ='61099008000141',
+                    IE='111111111111',
+                    indRatISSQN=constantes.C16_NAO_RATEADO),
+            detalhamentos=detalhamentos,
+            descontos_acrescimos_subtotal=descontos_acrescimos,
+            pagamentos=[
+                    MeioPagamento(
+                            cMP=constantes.WA03_DINHEIRO,
+                            vMP=vMP)])
+
+
+def _detalhamentos(itens):
+    detalhamentos = []
+    for n, (qCom, vUnCom, vDesc, vOutro) in enumerate(itens, 1):
+        opcionais = {}
+        if vDesc is not None:
+            opcionais['vDesc'] = vDesc
+        if vOutro is not None:
+            opcionais['vOutro'] = vOutro
+        detalhamentos.append(Detalhamento(
+                produto=ProdutoServico(
+                        cProd='{:d}'.format(n),
+                        xProd='Produto {:d}'.format(n),
+                        CFOP='5102',
+                        uCom='UN',
+                        qCom=qCom,
+                        vUnCom=vUnCom,
+                        indRegra='A',
+                        **opcionais),
+                imposto=_imposto()))
+    return detalhamentos
+
+
+def test_arredondamento_meio_par():
+    # 0,3330 x 4,99 = 1,66167 -> 1,66
+    # 2,5000 x 0,99 = 2,475 -> 2,48 (o dígito anterior, 7, é ímpar)
+    # 0,5000 x 0,05 = 0,025 -> 0,02 (o dígito anterior, 2, é par)
+    resultado = totais.calcular(_ITENS + [
+            (Decimal('0.5000'), Decimal('0.05'), None, None)])
+    assert [i.vProd for i in resultado.itens] == [
+            Decimal('5.75'),
+            Decimal('1.66'),
+            Decimal('2.48'),
+            Decimal('0.02')]
+    assert [i.vItem for i in resultado.itens] == [
+            Decimal('5.50'),
+            Decimal('1.76'),
+            Decimal('2.48'),
+            Decimal('0.02')]
+    assert resultado.vProd == Decimal('9.91')
+    assert resultado.vDesc == Decimal('0.25')
+    assert resultado.vOutro == Decimal('0.10')
+    assert resultado.vCFe == Decimal('9.76')
+    assert resultado.vTroco == Decimal('-9.76')
+    assert len(resultado.inconsistencias) == 1
+
+
+def test_contexto_independente_da_thread():
+    with decimal.localcontext() as ctx:
+        ctx.rounding = decimal.ROUND_DOWN
+        ctx.prec = 3
+        resultado = totais.calcular(_ITENS, pagamentos=[Decimal('100.00')])
+    assert resultado.vCFe == Decimal('9.74')
+    assert resultado.vTroco == Decimal('90.26')
+    assert not resultado.inconsistencias
+
+    contexto = decimal.Context(rounding=decimal.ROUND_DOWN)
+    resultado = totais.calcular(
+            _ITENS,
+            pagamentos=[Decimal('100.00')],
+            contexto=contexto)
+    assert [i.vProd for i in resultado.itens] == [
+            Decimal('5.75'),
+            Decimal('1.66'),
+            Decimal('2.47')]
+
+
+def test_desconto_e_acrescimo_sobre_subtotal():
+    venda = _venda(
+            _detalhamentos(_ITENS),
+            Decimal('9.50'),
+            descontos_acrescimos=DescAcrEntr(vDescSubtot=Decimal('0.24')))
+    resultado = venda.verificar_totais()
+    assert resultado.vDescSubtot == Decimal('0.24')
+    assert resultado.vAcresSubtot == Decimal('0.00')
+    assert resultado.vCFe == Decimal('9.50')
+    assert resultado.vTroco == Decimal('0.00')
+
+    venda = _venda(
+            _detalhamentos(_ITENS),
+            Decimal('10.00'),
+            descontos_acrescimos=DescAcrEntr(vAcresSubtot=Decimal('0.26')))
+    assert venda.totais().vCFe == Decimal('10.00')
+
+    venda = _venda(
+            _detalhamentos(_ITENS),
+            Decimal('10.00'),
+            descontos_acrescimos=DescAcrEntr(vDescSubtot=Decimal('9.74')))
+    with pytest.raises(ErroTotaisInconsistentes) as excinfo:
+        venda.verificar_totais()
+    assert 'vDescSubtot=9.74' in str(excinfo.value)
+
+
+def test_inconsistencias_dos_itens():
+    resultado = totais.calcular([
+            (Decimal('1.0000'), Decimal('1.00'), Decimal('1.50'), None),
+            (None, Decimal('1.00'), None, None),
+        ], pagamentos=[Decimal('1.00')])
+    assert len(resultado.itens) == 1
+    assert resultado.inconsistencias[0].startswith('Item 1: desconto')
+    assert resultado.inconsistencias[1].startswith('Item 2: quantidade')
+
+    resultado = totais.calcular([])
+    assert resultado.inconsistencias == ['Nenhum item (det) informado']
+
+
+def test_pagamentos_insuficientes():
+    venda = _venda(_detalhamentos(_ITENS), Decimal('9.00'))
+    with pytest.raises(ErroTotaisInconsistentes) as excinfo:
+        venda.verificar_totais()
+    assert excinfo.value.totais.vCFe == Decimal('9.74')
+    assert excinfo.value.totais.vTroco == Decimal('-0.74')
+
+    with pytest.raises(ErroTotaisInconsistentes):
+        venda.documento(verificar_totais=True)
+
+    # sem a verificação, o documento é gerado normalmente
+    assert venda.documento(direto=True).endswith('</CFe>')
+
+    class _Biblioteca(object):
+        def funcao(self, funcname):
+            raise AssertionError('O equipamento SAT nao deveria ser invocado')
+
+    cliente = ClienteSATLocal(_Biblioteca(), codigo_ativacao='12345678')
+    with pytest.raises(ErroTotaisInconsistentes):
+        cliente.enviar_dados_venda(venda, verificar_totais=True)
+
+
+def test_lote_equivale_aos_objetos():
+    campos = ('cProd', 'xProd', 'CFOP', 'uCom', 'qCom', 'vUnCom',
+              'indRegra', 'vDesc', 'vOutro')
+    linhas = [(
+            '{:d}'.format(n),
+            'Produto {:d}'.format(n),
+            '5102',
+            'UN',
+            qCom,
+            vUnCom,
+            'A',
+            vDesc,
+            vOutro,
+        ) for n, (qCom, vUnCom, vDesc, vOutro) in enumerate(_ITENS, 1)]
+    lote = LoteDetalhamentos.de_linhas(campos, linhas, imposto=_imposto())
+
+    esperado = _venda(_detalhamentos(_ITENS), Decimal('20.00')).totais()
+    assert _venda(lote, Decimal('20.00')).totais() == esperado
+    assert esperado.vTroco == Decimal('10.26')
+
+
+def test_benchmark_totais():
+    # tempo para calcular localmente os totais de uma venda com 500 itens
+    # (veja o resultado executando pytest com a opção "-s")
+    venda = _venda(_detalhamentos(_ITENS * 167)[:500], Decimal('9999.99'))
+    t = min(timeit.repeat(venda.totais, number=10, repeat=3)) / 10
+    print('\nTotais do CF-e de venda (500 itens): {:.2f}ms'.format(t * 1e3))
+    assert not venda.totais().inconsistencias
@@ -20,14 +20,23 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import base64
+import binascii
 import datetime
+import timeit
 
 import pytest
+import six
 
+from satcfe import util
+from satcfe.util import RetornoBytes
 from satcfe.util import as_date
 from satcfe.util import as_date_or_none
 from satcfe.util import as_datetime
 from satcfe.util import as_datetime_or_none
+from satcfe.util import base64_to_bytes
+from satcfe.util import base64_to_chunks
+from satcfe.util import base64_to_str
 from satcfe.util import hms
 from satcfe.util import hms_humanizado
 from satcfe.util import normalizar_ip
@@ -65,6 +74,130 @@ def test_as_datetime_or_none():
     assert as_datetime_or_none(' \t \n ') is None
 
 
+_DATAS = [
+        '20150709',
+        ' 20150709\n',
+        '20000229',
+        '2015079',
+        '201579',
+        '20150230',
+        '20151301',
+        '20150001',
+        '00000101',
+        '2015070a',
+        '２０１５０７０９',
+        '',
+    ]
+
+_DATAS_HORAS = [
+        '20150709143944',
+        '20150709143944\n',
+        '20150709235959',
+        '20150709235960',
+        '20150709240000',
+        '2015070914394',
+        '201579143944',
+        '20150709 143944',
+        '2015070914394a',
+        '',
+    ]
+
+
+def _resultado(funcao, valor):
+    try:
+        return funcao(valor)
+    except Exception as ex:
+        return type(ex), str(ex)
+
+
+@pytest.mark.parametrize('valor', _DATAS)
+def test_as_date_identico_a_strptime(valor):
+    esperado = _resultado(
+            lambda v: datetime.datetime.strptime(v.strip(), '%Y%m%d').date(),
+            valor)
+    assert _resultado(as_date, valor) == esperado
+    assert _resultado(as_date, valor) == esperado  # memorizado
+    if isinstance(esperado, tuple) and esperado[0] is ValueError:
+        assert as_date_or_none(valor) is None
+
+
+@pytest.mark.parametrize('valor', _DATAS_HORAS)
+def test_as_datetime_identico_a_strptime(valor):
+    esperado = _resultado(
+            lambda v: datetime.datetime.strptime(
+                    v.strip(), '%Y%m%d%H%M%S'),
+            valor)
+    assert _resultado(as_datetime, valor) == esperado
+    assert _resultado(as_datetime, valor) == esperado  # memorizado
+    if isinstance(esperado, tuple) and esperado[0] is ValueError:
+        assert as_datetime_or_none(valor) is None
+
+
+def test_memoria_das_datas_limitada():
+    for dia in range(1, 29):
+        for mes in range(1, 13):
+            as_date('2015{:02d}{:02d}'.format(mes, dia))
+    assert 0 < len(util._DATAS) <= util._CAPACIDADE_MEMO_DATAS
+    assert as_date('20150709') is as_date('20150709')
+
+
+def test_benchmark_datas():
+    # compara o tempo da conversão de datas/horas de um retorno de
+    # ConsultarStatusOperacional através de strptime e das fatias, com e sem
+    # a memória (veja o resultado executando pytest com a opção "-s")
+    valores = ['20150912113321', '20150912104828', '20150912113039']
+    datas = ['20150708', '20200708']
+
+    def _strptime():
+        for valor in valores:
+            datetime.datetime.strptime(valor.strip(), '%Y%m%d%H%M%S')
+        for valor in datas:
+            datetime.datetime.strptime(valor.strip(), '%Y%m%d').date()
+
+    def _fatias():
+        for valor in valores:
+            util._converter_data_hora(valor)
+        for valor in datas:
+            util._converter_data(valor)
+
+    def _memorizado():
+        for valor in valores:
+            as_datetime(valor)
+        for valor in datas:
+            as_date(valor)
+
+    t_strptime = min(timeit.repeat(_strptime, number=1000, repeat=3))
+    t_fatias = min(timeit.repeat(_fatias, number=1000, repeat=3))
+    t_memorizado = min(timeit.repeat(_memorizado, number=1000, repeat=3))
+
+    print((
+            '\nDatas de ConsultarStatusOperacional: strptime {:.2f}us, '
+            'fatias {:.2f}us ({:.1f}x), memorizadas {:.2f}us ({:.1f}x)'
+        ).format(
+                t_strptime * 1e3,
+                t_fatias * 1e3,
+                t_strptime / t_fatias,
+                t_memorizado * 1e3,
+                t_strptime / t_memorizado))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 4, 77, 65536])
+def test_base64_to_chunks(chunk_size):
+    dados = bytes(bytearray(range(256))) * 40
+    codificado = base64.encodestring(dados) if six.PY2 else \
+        base64.encodebytes(dados)  # com quebras de linha a cada 76 caracteres
+    assert b'\n' in codificado
+
+    for data in (codificado, codificado.decode('ascii'),
+                 memoryview(codificado)):
+        blocos = list(base64_to_chunks(data, chunk_size=chunk_size))
+        assert b''.join(blocos) == base64_to_bytes(data) == dados
+
+    # o mesmo erro de base64.b64decode (TypeError em Python 2)
+    with pytest.raises(TypeError if six.PY2 else binascii.Error):
+        list(base64_to_chunks('QUJD' * 10 + 'QQ', chunk_size=chunk_size))
+
+
 def test_normalizar_ip():
     assert normalizar_ip('010.000.000.001') == '10.0.0.1'
     assert normalizar_ip('10.0.0.1') == '10.0.0.1'
@@ -88,3 +221,33 @@ def test_hms_humanizado():
     assert hms_humanizado(3600) == '1 hora'
     assert hms_humanizado(3602) == '1 hora e 2 segundos'
     assert hms_humanizado(3721) == '1 hora, 2 minutos e 1 segundo'
+
+
+def test_base64_to_bytes():
+    assert base64_to_bytes('w6lzdGE=') == 'ésta'.encode('utf-8')
+    assert base64_to_bytes(b'w6lzdGE=') == 'ésta'.encode('utf-8')
+    assert base64_to_bytes(memoryview(b'|w6lzdGE=|')[1:-1]) == \
+        'ésta'.encode('utf-8')
+    assert base64_to_str(memoryview(b'w6lzdGE=')) == 'ésta'
+
+
+def test_retorno_bytes():
+    retorno = RetornoBytes(
+            '123|08000|Está em operação||'.encode('latin-1'),
+            encoding='latin-1')
+    assert '|' in retorno
+    assert len(retorno) == 28
+
+    partes = retorno.partes()
+    assert len(partes) == 5
+    assert [p.tobytes() for p in partes[:2]] == [b'123', b'08000']
+    assert retorno.decodificar(partes[2]) == 'Está em operação'
+    assert retorno.decodificar(partes[4]) == ''
+    assert retorno.decodificar() == '123|08000|Está em operação||'
+
+    # os campos em Base64 são decodificados diretamente das fatias
+    partes = RetornoBytes(b'123|06000|w6lzdGE=|').partes()
+    assert isinstance(partes[2], memoryview)
+    assert base64_to_bytes(partes[2]) == 'ésta'.encode('utf-8')
+    assert b''.join(base64_to_chunks(partes[2], chunk_size=3)) == \
+        'ésta'.encode('utf-8')